@@ -1,38 +1,85 @@
 from __future__ import absolute_import
 from abc import ABC, abstractmethod
 import config.config as config
-from typing import Optional, List
+from typing import Optional, List, Sequence
 import sys
 import random
-import struct
 from backend.includes_python import metric
 import os
 import time
 import backend.includes_python.process_logging as slogger  # slog deez nuts
 import backend.includes_python.service_helper as service_helper
 from cli.start_middleware import InterfaceType, get_interface_type
+import binascii
 import enum
 import math
+import struct
+import numpy as np
 from backend.includes_python.metric import Metric
-import threading
+from backend.includes_python.device_writer import DeviceWriter
+from backend.includes_python.bit_errors import BitErrorModel
+from backend.includes_python.payload_layout import (
+    Const, Field, Flags, Float32, Int16, PayloadLayout, Padding, Switch, Text,
+    UInt16)
+from backend.includes_python.deadline_scheduler import DeadlineScheduler
+from backend.includes_python.packet_subscription import DeliveredCounter
+from backend.includes_python.perf_stats import RateCounter
 
 # This file can be imported or rain as an emulation service if __main__
 # This file is for lower level emulation. Hence some things are passed bitwise
 # If you want higher level emulation, please talk to @mcloughlan and I will
 # make a higher level emulation library so it's not repeated for each person
 
+# Noise for blocks of samples, single samples keep using random
+_NOISE_RNG = np.random.default_rng()
+# Stress mode generates this much ahead at once
+STRESS_BLOCK_S = 0.1
+STRESS_STATUS_INTERVAL_S = 10
+# TEST_UART headers by payload length, RSSI and SNR
+_UART_HEADERS = {}
+_UART_HEADER_CACHE_SIZE = 4096
+# Widest int(round()) of a 32 bit RSSI or SNR, e.g. -2147483648
+_UART_METRIC_CHARS = 11
+_UART_END = b'"\r\n'
+# TEST payloads carry a 4 byte RSSI and SNR after the 1 byte ID
+_TEST_METADATA_END = 9
+
 
 class MockPacket(ABC):
     # Name of the fake device socat has made
     _FAKE_DEVICE_NAME: Optional[str] = None
     _INITIALISED: bool = False  # Flag to check if the settings have been initialized
-    _write_lock = threading.Lock()
+    # Shared open handle on the fake device, see device_writer
+    _DEVICE_WRITER: Optional[DeviceWriter] = None
+    # Bit errors applied to the over the air bytes of every packet encoded,
+    # see enable_corruption()
+    _CORRUPTION: Optional[BitErrorModel] = None
+    # Debug mode, also build every payload through the Metric encoders so
+    # their range checks run and the compiled layout is checked against them
+    _VALIDATE_PAYLOADS: bool = False
+
+    # Packet ID, set by each packet type
+    ID: Optional[int] = None
+    # Fields after the ID and radio metadata, see payload_layout
+    BODY_LAYOUT: Sequence[Field] = ()
+    # Compiled for each packet type from BODY_LAYOUT
+    TEST_LAYOUT: Optional[PayloadLayout] = None  # ID, RSSI, SNR, body
+    EXTERNAL_LAYOUT: Optional[PayloadLayout] = None  # ID, body
 
     class _SourceDevice(enum.Enum):
         AV = enum.auto()
         GSE = enum.auto()
         GCS = enum.auto()
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.ID is not None:
+            cls.EXTERNAL_LAYOUT = PayloadLayout(
+                [Const(cls.ID), *cls.BODY_LAYOUT])
+            cls.TEST_LAYOUT = PayloadLayout(
+                [Const(cls.ID), Float32("RSSI"), Float32("SNR"),
+                 *cls.BODY_LAYOUT])
+
     @classmethod
     def initialize_settings(cls,
                             EMULATION_CONFIG: dict,
@@ -53,78 +100,317 @@ class MockPacket(ABC):
         # Set static class values
         cls._FAKE_DEVICE_NAME = FAKE_DEVICE_NAME
         cls._INITIALISED = True
+        MockPacket._DEVICE_WRITER = None if FAKE_DEVICE_NAME is None \
+            else DeviceWriter(FAKE_DEVICE_NAME, MIN_GAP_S=float(
+                EMULATION_CONFIG.get("min_write_gap_ms", 1)) / 1000)
         MockPacket._INTERFACE_TYPE = INTERFACE_TYPE
         MockPacket._NOISE_COEFFICIENT = float(
             EMULATION_CONFIG["noise_coefficient"])
         MockPacket._PACKET_LOSS = float(
             EMULATION_CONFIG["packet_loss"])  # [0-1]
+        MockPacket._VALIDATE_PAYLOADS = EMULATION_CONFIG.get(
+            "validate_payloads", "false").lower() == "true"
 
     def __init__(self):
         if not self._INITIALISED:
             raise RuntimeError(
                 "Cannot create instances of MockPacket or its subclasses before initializing class settings.")
-        self.ID: Optional[int] = None  # Packet ID
-        # High level payload builder
-        self.payload_after_id_and_meta: Optional[List[bytes]] = None
+        # Values for the payload layout, RSSI and SNR included
+        self.FIELDS: dict = {}
         self.ORIGIN_DEVICE: Optional[MockPacket._SourceDevice] = None
 
+    @property
+    def RSSI(self) -> float:
+        return self.FIELDS["RSSI"]
+
+    @property
+    def SNR(self) -> float:
+        return self.FIELDS["SNR"]
+
+    @abstractmethod
+    def metric_fragments(self) -> List[bytes]:
+        """Payload after the ID and radio metadata, built field by field with
+        the Metric encoders. Reference for BODY_LAYOUT and the debug mode"""
+
     def write_payload(self):
         """Writes payload of bytes to device"""
+        self.write_bytes(self.get_payload_bytes())
 
-        if self._FAKE_DEVICE_NAME is None:
+    @classmethod
+    def write_bytes(cls, PAYLOAD_BYTES: bytes):
+        """Writes an already built payload to the device
+
+        Each payload is its own write, spaced by min_write_gap_ms, because the
+        middleware treats every read as one packet.
+
+        Args:
+            PAYLOAD_BYTES (bytes): Output of get_payload_bytes(), or any
+                bytes-like object holding it
+        """
+        if MockPacket._DEVICE_WRITER is None:
             raise ValueError("Cannot write to device. Device name not set.")
         try:
-            payload_bytes = self.get_payload_bytes()
-            with MockPacket._write_lock:
-                with open(self._FAKE_DEVICE_NAME, 'wb') as device:
-                    device.write(payload_bytes)
+            MockPacket._DEVICE_WRITER.write(PAYLOAD_BYTES)
         except Exception as e:
             slogger.error(
-                f"Failed to write bytes to {self._FAKE_DEVICE_NAME}: {e}")
+                f"Failed to write bytes to {cls._FAKE_DEVICE_NAME}: {e}")
+            raise
+
+    @staticmethod
+    def enable_corruption(MODEL: Optional[BitErrorModel]):
+        """Corrupt the ID and payload of every packet encoded from now on,
+        None turns it off"""
+        MockPacket._CORRUPTION = MODEL
+
+    def metric_payload_bytes(self, EXTERNAL=False) -> bytes:
+        """ID, radio metadata and payload built through the Metric encoders,
+        the slow reference for the compiled layouts"""
+        output_bytes = bytearray()
+        output_bytes.extend(metric.Metric._int_to_byte_unsigned(self.ID))
+        if not EXTERNAL:
+            output_bytes.extend(metric.Metric._float32_to_bytes(self.RSSI))
+            output_bytes.extend(metric.Metric._float32_to_bytes(self.SNR))
+        for fragment in self.metric_fragments():
+            output_bytes.extend(fragment)
+        return bytes(output_bytes)
+
+    def _pack_into(self, LAYOUT: PayloadLayout, BUFFER, OFFSET: int,
+                   EXTERNAL: bool) -> int:
+        """Pack FIELDS with a compiled layout, checking it against the Metric
+        encoders in debug mode"""
+        if MockPacket._VALIDATE_PAYLOADS:
+            # Raises the Metric range errors before anything is packed
+            expected = self.metric_payload_bytes(EXTERNAL)
+        try:
+            size = LAYOUT.pack_into(BUFFER, OFFSET, self.FIELDS)
+        except (struct.error, OverflowError, TypeError, AttributeError):
+            # Something didn't fit its type. Let Metric explain what
+            self.metric_payload_bytes(EXTERNAL)
             raise
+        if MockPacket._VALIDATE_PAYLOADS:
+            packed = bytes(BUFFER[OFFSET:OFFSET + size])
+            if packed != expected:
+                raise RuntimeError(
+                    f"{type(self).__name__} layout gave {packed.hex()}, "
+                    f"Metric gave {expected.hex()}")
+        return size
+
+    @staticmethod
+    def _uart_header(LENGTH: int, RSSI: float, SNR: float) -> bytes:
+        """Lines before the hex payload, cached as RSSI and SNR only take a
+        few values once rounded"""
+        key = (LENGTH, int(round(RSSI)), int(round(SNR)))
+        header = _UART_HEADERS.get(key)
+        if header is None:
+            if len(_UART_HEADERS) >= _UART_HEADER_CACHE_SIZE:
+                _UART_HEADERS.clear()
+            header = (f"+TEST: LEN:{LENGTH}, RSSI:{key[1]}, SNR:{key[2]}\r\n"
+                      "+TEST: RX\n\"").encode('ascii')
+            _UART_HEADERS[key] = header
+        return header
+
+    @classmethod
+    def buffer_size(cls, EXTERNAL=False) -> int:
+        """Room encode_into() needs for any packet of this type in the
+        interface format
+
+        Args:
+            EXTERNAL (bool): Size for the EXTERNAL form of the TEST format
+        """
+        match MockPacket._INTERFACE_TYPE:
+            case InterfaceType.TEST:
+                layout = cls.EXTERNAL_LAYOUT if EXTERNAL else cls.TEST_LAYOUT
+                return layout.size
+            case InterfaceType.TEST_UART:
+                size = cls.EXTERNAL_LAYOUT.size
+                # Header with the widest RSSI and SNR, then the payload as hex
+                return len(cls._uart_header(size, 0, 0)) - 2 + \
+                    2 * _UART_METRIC_CHARS + 2 * size + len(_UART_END)
+
+    def _encode_uart_into(self, BUFFER, OFFSET: int) -> int:
+        # Responses looks like this
+        # ...
+        # +TEST: LEN:32, RSSI:-46, SNR:10
+        # +TEST: RX
+        # "0400FFEA0838001FFFDA0400FFC1FFEB0007FFA73C6DAABE0000000000000000"
+        # +TEST: LEN:32, RSSI:-45, SNR:10
+        # +TEST: RX
+        # "0400001908490042FFCD03F7FFCFFFC0002DFFE93C6DAABE0000000000000000"
+        # ...
+        size = self.EXTERNAL_LAYOUT.size
+        header = self._uart_header(size, self.RSSI, self.SNR)
+        hex_start = OFFSET + len(header)
+        hex_end = hex_start + 2 * size
+        end = hex_end + len(_UART_END)
+        if end > len(BUFFER):
+            raise ValueError(
+                f"{type(self).__name__} needs {end - OFFSET} bytes at offset "
+                f"{OFFSET}, buffer is {len(BUFFER)}")
+        with memoryview(BUFFER) as view:
+            # Pack the payload into the back half of where its hex goes,
+            # hexlify then spreads it over the whole span
+            self._pack_into(self.EXTERNAL_LAYOUT, view, hex_end - size, True)
+            if MockPacket._CORRUPTION is not None:
+                # Before the modem writes it out as text
+                MockPacket._CORRUPTION.corrupt_into(
+                    view, [(hex_end - size, hex_end)])
+            view[hex_start:hex_end] = binascii.hexlify(
+                view[hex_end - size:hex_end])
+            view[OFFSET:hex_start] = header
+            view[hex_end:end] = _UART_END
+        return end - OFFSET
+
+    def encode_into(self, BUFFER, OFFSET: int = 0, EXTERNAL=False) -> int:
+        """Encodes the ID, radio metadata and payload in the interface format
+        straight into a buffer, so one can be reused between packets
+
+        Args:
+            BUFFER: Writable buffer, bytearray or memoryview. buffer_size()
+                says how much room a packet type takes
+            OFFSET (int): Where the payload starts in BUFFER
+            EXTERNAL (bool): TEST format without the RSSI and SNR
 
-    def get_payload_bytes(self, EXTERNAL=False) -> bytes:
-        """Concatenates the ID and payload fragments into a single bytes object."""
-        def _format_test_payload() -> bytes:
-            output_bytes = bytearray()
-            output_bytes.extend(metric.Metric._int_to_byte_unsigned(self.ID))
-            if not EXTERNAL:
-                output_bytes.extend(metric.Metric._float32_to_bytes(self.RSSI))
-                output_bytes.extend(metric.Metric._float32_to_bytes(self.SNR))
-            for fragment in self.payload_after_id_and_meta:
-                output_bytes.extend(fragment)
-            return output_bytes
-
-        def _format_test_uart_payload() -> bytes:
-            # Responses looks like this
-            # ...
-            # +TEST: LEN:32, RSSI:-46, SNR:10
-            # +TEST: RX
-            # "0400FFEA0838001FFFDA0400FFC1FFEB0007FFA73C6DAABE0000000000000000"
-            # +TEST: LEN:32, RSSI:-45, SNR:10
-            # +TEST: RX
-            # "0400001908490042FFCD03F7FFCFFFC0002DFFE93C6DAABE0000000000000000"
-            # ...
-            CRLF = '\r\n'
-            header = f"+TEST: LEN:{len(self.payload_after_id_and_meta)+1}, RSSI:{int(round(self.RSSI))}, SNR:{int(round(self.SNR))}"+CRLF
-            header_suffix = "+TEST: RX" + "\n"
-            data_payload_bytes = bytearray()
-            data_payload_bytes.extend(
-                metric.Metric._int_to_byte_unsigned(self.ID))
-            for fragment in self.payload_after_id_and_meta:
-                data_payload_bytes.extend(fragment)
-            data_payload_hex_line = f'"{data_payload_bytes.hex()}"' + CRLF
-            output_string = header + header_suffix + data_payload_hex_line
-            return output_string.encode('ascii')
+        Raises:
+            ValueError: BUFFER has no room for the payload at OFFSET, or a
+                value is out of range
 
+        Returns:
+            int: Bytes written
+        """
         match MockPacket._INTERFACE_TYPE:
             case InterfaceType.TEST:
-                return _format_test_payload()
+                layout = self.EXTERNAL_LAYOUT if EXTERNAL else self.TEST_LAYOUT
+                if OFFSET + layout.size > len(BUFFER):
+                    raise ValueError(
+                        f"{type(self).__name__} needs {layout.size} bytes at "
+                        f"offset {OFFSET}, buffer is {len(BUFFER)}")
+                size = self._pack_into(layout, BUFFER, OFFSET, EXTERNAL)
+                if MockPacket._CORRUPTION is not None:
+                    # RSSI and SNR come from the receiving modem, not the link
+                    spans = [(OFFSET, OFFSET + size)] if EXTERNAL else \
+                        [(OFFSET, OFFSET + 1),
+                         (OFFSET + _TEST_METADATA_END, OFFSET + size)]
+                    MockPacket._CORRUPTION.corrupt_into(BUFFER, spans)
+                return size
             case InterfaceType.TEST_UART:
-                return _format_test_uart_payload()
+                return self._encode_uart_into(BUFFER, OFFSET)
+
+    def get_payload_bytes(self, EXTERNAL=False) -> bytearray:
+        """Encodes the ID, radio metadata and payload in the interface format"""
+        output_bytes = bytearray(self.buffer_size(EXTERNAL))
+        del output_bytes[self.encode_into(output_bytes, 0, EXTERNAL):]
+        return output_bytes
+
+
+# Flag bytes shared between packet types, most significant bit first
+_AV_STATE_FLAGS = Flags(
+    ("FLIGHT_STATE_", 3),
+    "DUAL_BOARD_CONNECTIVITY_STATE_FLAG",
+    "RECOVERY_CHECK_COMPLETE_AND_FLIGHT_READY",
+    "GPS_FIX_FLAG",
+    "PAYLOAD_CONNECTION_FLAG",
+    "CAMERA_CONTROLLER_CONNECTION",
+)
+_GSE_STATE_FLAGS = Flags(
+    "MANUAL_PURGED",
+    "O2_FILL_ACTIVATED",
+    "SELECTOR_SWITCH_NEUTRAL_POSITION",
+    "N2O_FILL_ACTIVATED",
+    "IGNITION_FIRED",
+    "IGNITION_SELECTED",
+    "GAS_FILL_SELECTED",
+    "SYSTEM_ACTIVATED",
+)
+_GSE_ERROR_FLAGS = Flags(
+    "IGNITION_ERROR",
+    "RELAY3_ERROR",
+    "RELAY2_ERROR",
+    "RELAY1_ERROR",
+    "THERMOCOUPLE_4_ERROR",
+    "THERMOCOUPLE_3_ERROR",
+    "THERMOCOUPLE_2_ERROR",
+    "THERMOCOUPLE_1_ERROR",
+    "LOAD_CELL_4_ERROR",
+    "LOAD_CELL_3_ERROR",
+    "LOAD_CELL_2_ERROR",
+    "LOAD_CELL_1_ERROR",
+    "TRANSDUCER_4_ERROR",
+    "TRANSDUCER_3_ERROR",
+    "TRANSDUCER_2_ERROR",
+    "TRANSDUCER_1_ERROR",
+)
+_GCS_TO_GSE_FLAG_NAMES = (
+    "MANUAL_PURGE",
+    "O2_FILL_ACTIVATE",
+    "SELECTOR_SWITCH_NEUTRAL_POSITION",
+    "N2O_FILL_ACTIVATE",
+    "IGNITION_FIRE",
+    "IGNITION_SELECTED",
+    "GAS_FILL_SELECTED",
+    "SYSTEM_ACTIVATE",
+)
+_CONTINUITY_CMD_FLAG_NAMES = (
+    (0b1010, 4),
+    "MAIN_SECONDARY_TEST",
+    "MAIN_PRIMARY_TEST",
+    "APOGEE_SECONDARY_TEST",
+    "APROGEE_PRIMARY_TEST",
+)
+
+
+def _av_state_fragment(V: dict) -> bytes:
+    return metric.Metric.StateFlags3p0(
+        V["FLIGHT_STATE_"],
+        V["DUAL_BOARD_CONNECTIVITY_STATE_FLAG"],
+        V["RECOVERY_CHECK_COMPLETE_AND_FLIGHT_READY"],
+        V["GPS_FIX_FLAG"],
+        V["PAYLOAD_CONNECTION_FLAG"],
+        V["CAMERA_CONTROLLER_CONNECTION"],
+    )
+
+
+def _gse_state_fragment(V: dict) -> bytes:
+    return metric.Metric.StateSetFlags2p1(
+        V["MANUAL_PURGED"],
+        V["O2_FILL_ACTIVATED"],
+        V["SELECTOR_SWITCH_NEUTRAL_POSITION"],
+        V["N2O_FILL_ACTIVATED"],
+        V["IGNITION_FIRED"],
+        V["IGNITION_SELECTED"],
+        V["GAS_FILL_SELECTED"],
+        V["SYSTEM_ACTIVATED"],
+    )
+
+
+def _gse_error_fragment(V: dict) -> bytes:
+    return metric.Metric.ERROR_CODE_GSE(
+        *(V[name] for name in (
+            "IGNITION_ERROR",
+            "RELAY3_ERROR",
+            "RELAY2_ERROR",
+            "RELAY1_ERROR",
+            "THERMOCOUPLE_4_ERROR",
+            "THERMOCOUPLE_3_ERROR",
+            "THERMOCOUPLE_2_ERROR",
+            "THERMOCOUPLE_1_ERROR",
+            "LOAD_CELL_4_ERROR",
+            "LOAD_CELL_3_ERROR",
+            "LOAD_CELL_2_ERROR",
+            "LOAD_CELL_1_ERROR",
+            "TRANSDUCER_4_ERROR",
+            "TRANSDUCER_3_ERROR",
+            "TRANSDUCER_2_ERROR",
+            "TRANSDUCER_1_ERROR",
+        )))
 
 
 class GCStoGSEStateCMD(MockPacket):
+    ID = 0x02
+    BODY_LAYOUT = (
+        Flags(*_GCS_TO_GSE_FLAG_NAMES),
+        Flags(*_GCS_TO_GSE_FLAG_NAMES, INVERTED=True),
+        Padding(),
+    )
 
     def __init__(
         self,
@@ -140,32 +426,37 @@ class GCStoGSEStateCMD(MockPacket):
         SYSTEM_ACTIVATE: bool = False,
     ):
         super().__init__()
-        self.ID = 0x02
-        self.RSSI = RSSI
-        self.SNR = SNR
         self.ORIGIN_DEVICE = MockPacket._SourceDevice.GCS
-        self.payload_after_id_and_meta = [
-            metric.Metric.StateSetFlags2p1(MANUAL_PURGE,
-                                           O2_FILL_ACTIVATE,
-                                           SELECTOR_SWITCH_NEUTRAL_POSITION,
-                                           N2O_FILL_ACTIVATE,
-                                           IGNITION_FIRE,
-                                           IGNITION_SELECTED,
-                                           GAS_FILL_SELECTED,
-                                           SYSTEM_ACTIVATE,),
-            metric.Metric.StateSetFlagINVERTEDs2p2(MANUAL_PURGE,
-                                                   O2_FILL_ACTIVATE,
-                                                   SELECTOR_SWITCH_NEUTRAL_POSITION,
-                                                   N2O_FILL_ACTIVATE,
-                                                   IGNITION_FIRE,
-                                                   IGNITION_SELECTED,
-                                                   GAS_FILL_SELECTED,
-                                                   SYSTEM_ACTIVATE,),
+        self.FIELDS = dict(
+            RSSI=RSSI,
+            SNR=SNR,
+            MANUAL_PURGE=MANUAL_PURGE,
+            O2_FILL_ACTIVATE=O2_FILL_ACTIVATE,
+            SELECTOR_SWITCH_NEUTRAL_POSITION=SELECTOR_SWITCH_NEUTRAL_POSITION,
+            N2O_FILL_ACTIVATE=N2O_FILL_ACTIVATE,
+            IGNITION_FIRE=IGNITION_FIRE,
+            IGNITION_SELECTED=IGNITION_SELECTED,
+            GAS_FILL_SELECTED=GAS_FILL_SELECTED,
+            SYSTEM_ACTIVATE=SYSTEM_ACTIVATE,
+        )
+
+    def metric_fragments(self) -> List[bytes]:
+        flags = [self.FIELDS[name] for name in _GCS_TO_GSE_FLAG_NAMES]
+        return [
+            metric.Metric.StateSetFlags2p1(*flags),
+            metric.Metric.StateSetFlagINVERTEDs2p2(*flags),
             metric.Metric.dummyByte()
         ]
 
 
 class GCStoAVStateCMD(MockPacket):
+    ID = 0x01
+    BODY_LAYOUT = (
+        Flags(*_CONTINUITY_CMD_FLAG_NAMES),
+        Flags(*_CONTINUITY_CMD_FLAG_NAMES, INVERTED=True),
+        Switch("BEGIN_BROADCAST", 0xFF),
+    )
+
     def __init__(
         self,
         RSSI: float = 0.0,
@@ -177,36 +468,67 @@ class GCStoAVStateCMD(MockPacket):
         BEGIN_BROADCAST: bool = False,
     ):
         super().__init__()
-        self.ID = 0x01
-        self.RSSI = RSSI
-        self.SNR = SNR
         self.ORIGIN_DEVICE = MockPacket._SourceDevice.GCS
-        self.payload_after_id_and_meta = [
-            metric.Metric.continuityCheckCMDFlags(
-                MAIN_SECONDARY_TEST,
-                MAIN_PRIMARY_TEST,
-                APOGEE_SECONDARY_TEST,
-                APROGEE_PRIMARY_TEST,
-            ),
-            metric.Metric.continuityCheckCMDFlagsINVERTED(
-                MAIN_SECONDARY_TEST,
-                MAIN_PRIMARY_TEST,
-                APOGEE_SECONDARY_TEST,
-                APROGEE_PRIMARY_TEST,
-            ),
-            metric.Metric.BroadcastBeginCMDFlags(BEGIN_BROADCAST)
+        self.FIELDS = dict(
+            RSSI=RSSI,
+            SNR=SNR,
+            MAIN_SECONDARY_TEST=MAIN_SECONDARY_TEST,
+            MAIN_PRIMARY_TEST=MAIN_PRIMARY_TEST,
+            APOGEE_SECONDARY_TEST=APOGEE_SECONDARY_TEST,
+            APROGEE_PRIMARY_TEST=APROGEE_PRIMARY_TEST,
+            BEGIN_BROADCAST=BEGIN_BROADCAST,
+        )
+
+    def metric_fragments(self) -> List[bytes]:
+        V = self.FIELDS
+        tests = (
+            V["MAIN_SECONDARY_TEST"],
+            V["MAIN_PRIMARY_TEST"],
+            V["APOGEE_SECONDARY_TEST"],
+            V["APROGEE_PRIMARY_TEST"],
+        )
+        return [
+            metric.Metric.continuityCheckCMDFlags(*tests),
+            metric.Metric.continuityCheckCMDFlagsINVERTED(*tests),
+            metric.Metric.BroadcastBeginCMDFlags(V["BEGIN_BROADCAST"])
         ]
 
 
 class GCStoGSEManualControl(GCStoGSEStateCMD):
     """Same command as GCStoGSEStateCMD but with different ID to indicate manual control"""
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.ID = 0x09
+    ID = 0x09
 
 
 class AVtoGCSData1(MockPacket):
+    ID = 0x03
+    BODY_LAYOUT = (
+        _AV_STATE_FLAGS,
+        Int16("ACCEL_LOW_X"),
+        Int16("ACCEL_LOW_Y"),
+        Int16("ACCEL_LOW_Z"),
+        Int16("ACCEL_HIGH_X"),
+        Int16("ACCEL_HIGH_Y"),
+        Int16("ACCEL_HIGH_Z"),
+        Int16("GYRO_X"),
+        Int16("GYRO_Y"),
+        Int16("GYRO_Z"),
+        Float32("ALTITUDE"),
+        Float32("VELOCITY"),
+        Flags("APOGEE_PRIMARY_TEST_COMPETE",
+              "APOGEE_SECONDARY_TEST_COMPETE",
+              (0b1010, 4),
+              "APOGEE_PRIMARY_TEST_RESULTS",
+              "APOGEE_SECONDARY_TEST_RESULTS"),
+        Flags("MAIN_PRIMARY_TEST_COMPETE",
+              "MAIN_SECONDARY_TEST_COMPETE",
+              (0b1010, 4),
+              "MAIN_PRIMARY_TEST_RESULTS",
+              "MAIN_SECONDARY_TEST_RESULTS"),
+        Switch("MOVE_TO_BROADCAST", 0b10101010),
+        # Note the dummy byte here for TBC purposes
+        Padding(),
+    )
+
     def __init__(
         self,
         RSSI: float = 0.0,
@@ -238,50 +560,84 @@ class AVtoGCSData1(MockPacket):
         MAIN_SECONDARY_TEST_RESULTS=False,
         MOVE_TO_BROADCAST=False
     ):
-        super().    __init__()
-        self.ID = 0x03
-        self.RSSI = RSSI
-        self.SNR = SNR
+        super().__init__()
         self.ORIGIN_DEVICE = MockPacket._SourceDevice.AV
-        self.payload_after_id_and_meta = [
-            metric.Metric.StateFlags3p0(
-                FLIGHT_STATE_,
-                DUAL_BOARD_CONNECTIVITY_STATE_FLAG,
-                RECOVERY_CHECK_COMPLETE_AND_FLIGHT_READY,
-                GPS_FIX_FLAG,
-                PAYLOAD_CONNECTION_FLAG,
-                CAMERA_CONTROLLER_CONNECTION,
-            ),
-            metric.Metric.ACCEL_LOW_X(ACCEL_LOW_X),
-            metric.Metric.ACCEL_LOW_Y(ACCEL_LOW_Y),
-            metric.Metric.ACCEL_LOW_Z(ACCEL_LOW_Z),
-            metric.Metric.ACCEL_HIGH_X(ACCEL_HIGH_X),
-            metric.Metric.ACCEL_HIGH_Y(ACCEL_HIGH_Y),
-            metric.Metric.ACCEL_HIGH_Z(ACCEL_HIGH_Z),
-            metric.Metric.GYRO_X(GYRO_X),
-            metric.Metric.GYRO_Y(GYRO_Y),
-            metric.Metric.GYRO_Z(GYRO_Z),
-            metric.Metric.ALTITUDE(ALTITUDE),
-            metric.Metric.VELOCITY(VELOCITY),
+        self.FIELDS = dict(
+            RSSI=RSSI,
+            SNR=SNR,
+            FLIGHT_STATE_=FLIGHT_STATE_,
+            DUAL_BOARD_CONNECTIVITY_STATE_FLAG=DUAL_BOARD_CONNECTIVITY_STATE_FLAG,
+            RECOVERY_CHECK_COMPLETE_AND_FLIGHT_READY=RECOVERY_CHECK_COMPLETE_AND_FLIGHT_READY,
+            GPS_FIX_FLAG=GPS_FIX_FLAG,
+            PAYLOAD_CONNECTION_FLAG=PAYLOAD_CONNECTION_FLAG,
+            CAMERA_CONTROLLER_CONNECTION=CAMERA_CONTROLLER_CONNECTION,
+            ACCEL_LOW_X=ACCEL_LOW_X,
+            ACCEL_LOW_Y=ACCEL_LOW_Y,
+            ACCEL_LOW_Z=ACCEL_LOW_Z,
+            ACCEL_HIGH_X=ACCEL_HIGH_X,
+            ACCEL_HIGH_Y=ACCEL_HIGH_Y,
+            ACCEL_HIGH_Z=ACCEL_HIGH_Z,
+            GYRO_X=GYRO_X,
+            GYRO_Y=GYRO_Y,
+            GYRO_Z=GYRO_Z,
+            ALTITUDE=ALTITUDE,
+            VELOCITY=VELOCITY,
+            APOGEE_PRIMARY_TEST_COMPETE=APOGEE_PRIMARY_TEST_COMPETE,
+            APOGEE_SECONDARY_TEST_COMPETE=APOGEE_SECONDARY_TEST_COMPETE,
+            APOGEE_PRIMARY_TEST_RESULTS=APOGEE_PRIMARY_TEST_RESULTS,
+            APOGEE_SECONDARY_TEST_RESULTS=APOGEE_SECONDARY_TEST_RESULTS,
+            MAIN_PRIMARY_TEST_COMPETE=MAIN_PRIMARY_TEST_COMPETE,
+            MAIN_SECONDARY_TEST_COMPETE=MAIN_SECONDARY_TEST_COMPETE,
+            MAIN_PRIMARY_TEST_RESULTS=MAIN_PRIMARY_TEST_RESULTS,
+            MAIN_SECONDARY_TEST_RESULTS=MAIN_SECONDARY_TEST_RESULTS,
+            MOVE_TO_BROADCAST=MOVE_TO_BROADCAST,
+        )
+
+    def metric_fragments(self) -> List[bytes]:
+        V = self.FIELDS
+        return [
+            _av_state_fragment(V),
+            metric.Metric.ACCEL_LOW_X(V["ACCEL_LOW_X"]),
+            metric.Metric.ACCEL_LOW_Y(V["ACCEL_LOW_Y"]),
+            metric.Metric.ACCEL_LOW_Z(V["ACCEL_LOW_Z"]),
+            metric.Metric.ACCEL_HIGH_X(V["ACCEL_HIGH_X"]),
+            metric.Metric.ACCEL_HIGH_Y(V["ACCEL_HIGH_Y"]),
+            metric.Metric.ACCEL_HIGH_Z(V["ACCEL_HIGH_Z"]),
+            metric.Metric.GYRO_X(V["GYRO_X"]),
+            metric.Metric.GYRO_Y(V["GYRO_Y"]),
+            metric.Metric.GYRO_Z(V["GYRO_Z"]),
+            metric.Metric.ALTITUDE(V["ALTITUDE"]),
+            metric.Metric.VELOCITY(V["VELOCITY"]),
             metric.Metric.continuityCheckResultsApogee(
-                APOGEE_PRIMARY_TEST_COMPETE,
-                APOGEE_SECONDARY_TEST_COMPETE,
-                APOGEE_PRIMARY_TEST_RESULTS,
-                APOGEE_SECONDARY_TEST_RESULTS,
+                V["APOGEE_PRIMARY_TEST_COMPETE"],
+                V["APOGEE_SECONDARY_TEST_COMPETE"],
+                V["APOGEE_PRIMARY_TEST_RESULTS"],
+                V["APOGEE_SECONDARY_TEST_RESULTS"],
             ),
             metric.Metric.continuityCheckResultsMain(
-                MAIN_PRIMARY_TEST_COMPETE,
-                MAIN_SECONDARY_TEST_COMPETE,
-                MAIN_PRIMARY_TEST_RESULTS,
-                MAIN_SECONDARY_TEST_RESULTS,
+                V["MAIN_PRIMARY_TEST_COMPETE"],
+                V["MAIN_SECONDARY_TEST_COMPETE"],
+                V["MAIN_PRIMARY_TEST_RESULTS"],
+                V["MAIN_SECONDARY_TEST_RESULTS"],
             ),
-            metric.Metric.MovingToBroadCastFlag(MOVE_TO_BROADCAST),
-            # Note the dummy byte here for TBC purposes
+            metric.Metric.MovingToBroadCastFlag(V["MOVE_TO_BROADCAST"]),
             metric.Metric.dummyByte()
         ]
 
 
 class AVtoGCSData2(MockPacket):
+    ID = 0x04
+    BODY_LAYOUT = (
+        _AV_STATE_FLAGS,
+        Float32("LATITUDE", LITTLE_ENDIAN=True),
+        Float32("LONGITUDE", LITTLE_ENDIAN=True),
+        Text("NAV_STATUS", 2),
+        Float32("QW", LITTLE_ENDIAN=True),
+        Float32("QX", LITTLE_ENDIAN=True),
+        Float32("QY", LITTLE_ENDIAN=True),
+        Float32("QZ", LITTLE_ENDIAN=True),
+    )
+
     def __init__(
         self,
         RSSI: float = 0.0,
@@ -301,29 +657,46 @@ class AVtoGCSData2(MockPacket):
         QZ=0.5,
     ):
         super().__init__()
-        self.ID = 0x04
-        self.RSSI = RSSI
-        self.SNR = SNR
         self.ORIGIN_DEVICE = MockPacket._SourceDevice.AV
-        self.payload_after_id_and_meta = [
-            metric.Metric.StateFlags3p0(
-                FLIGHT_STATE_,
-                DUAL_BOARD_CONNECTIVITY_STATE_FLAG,
-                RECOVERY_CHECK_COMPLETE_AND_FLIGHT_READY,
-                GPS_FIX_FLAG,
-                PAYLOAD_CONNECTION_FLAG,
-                CAMERA_CONTROLLER_CONNECTION,
-            ),
-            metric.Metric.GPS(LATITUDE, LONGITUDE),
-            metric.Metric.NAVIGATION_STATUS(NAV_STATUS),
-            metric.Metric.QUATERNION(QW),
-            metric.Metric.QUATERNION(QX),
-            metric.Metric.QUATERNION(QY),
-            metric.Metric.QUATERNION(QZ),
+        self.FIELDS = dict(
+            RSSI=RSSI,
+            SNR=SNR,
+            FLIGHT_STATE_=FLIGHT_STATE_,
+            DUAL_BOARD_CONNECTIVITY_STATE_FLAG=DUAL_BOARD_CONNECTIVITY_STATE_FLAG,
+            RECOVERY_CHECK_COMPLETE_AND_FLIGHT_READY=RECOVERY_CHECK_COMPLETE_AND_FLIGHT_READY,
+            GPS_FIX_FLAG=GPS_FIX_FLAG,
+            PAYLOAD_CONNECTION_FLAG=PAYLOAD_CONNECTION_FLAG,
+            CAMERA_CONTROLLER_CONNECTION=CAMERA_CONTROLLER_CONNECTION,
+            LATITUDE=LATITUDE,
+            LONGITUDE=LONGITUDE,
+            NAV_STATUS=NAV_STATUS,
+            QW=QW,
+            QX=QX,
+            QY=QY,
+            QZ=QZ,
+        )
+
+    def metric_fragments(self) -> List[bytes]:
+        V = self.FIELDS
+        return [
+            _av_state_fragment(V),
+            metric.Metric.GPS(V["LATITUDE"], V["LONGITUDE"]),
+            metric.Metric.NAVIGATION_STATUS(V["NAV_STATUS"]),
+            metric.Metric.QUATERNION(V["QW"]),
+            metric.Metric.QUATERNION(V["QX"]),
+            metric.Metric.QUATERNION(V["QY"]),
+            metric.Metric.QUATERNION(V["QZ"]),
         ]
 
 
 class AVtoGCSData3(MockPacket):
+    ID = 0x05
+    BODY_LAYOUT = (
+        _AV_STATE_FLAGS,
+        # TBC for rest of the bytes?
+        Padding(30),
+    )
+
     def __init__(
         self,
         RSSI: float = 0.0,
@@ -336,24 +709,37 @@ class AVtoGCSData3(MockPacket):
         CAMERA_CONTROLLER_CONNECTION=True,
     ):
         super().__init__()
-        self.ID = 0x05
-        self.RSSI = RSSI
-        self.SNR = SNR
         self.ORIGIN_DEVICE = MockPacket._SourceDevice.AV
-        self.payload_after_id_and_meta = [
-            metric.Metric.StateFlags3p0(
-                FLIGHT_STATE_,
-                DUAL_BOARD_CONNECTIVITY_STATE_FLAG,
-                RECOVERY_CHECK_COMPLETE_AND_FLIGHT_READY,
-                GPS_FIX_FLAG,
-                PAYLOAD_CONNECTION_FLAG,
-                CAMERA_CONTROLLER_CONNECTION,
-            ),
-            # TBC for rest of the bytes?
-        ] + [metric.Metric.dummyByte()]*30
+        self.FIELDS = dict(
+            RSSI=RSSI,
+            SNR=SNR,
+            FLIGHT_STATE_=FLIGHT_STATE_,
+            DUAL_BOARD_CONNECTIVITY_STATE_FLAG=DUAL_BOARD_CONNECTIVITY_STATE_FLAG,
+            RECOVERY_CHECK_COMPLETE_AND_FLIGHT_READY=RECOVERY_CHECK_COMPLETE_AND_FLIGHT_READY,
+            GPS_FIX_FLAG=GPS_FIX_FLAG,
+            PAYLOAD_CONNECTION_FLAG=PAYLOAD_CONNECTION_FLAG,
+            CAMERA_CONTROLLER_CONNECTION=CAMERA_CONTROLLER_CONNECTION,
+        )
+
+    def metric_fragments(self) -> List[bytes]:
+        return [_av_state_fragment(self.FIELDS)] + \
+            [metric.Metric.dummyByte()]*30
 
 
 class GSEtoGCSData1(MockPacket):
+    ID = 0x06
+    BODY_LAYOUT = (
+        _GSE_STATE_FLAGS,
+        Float32("TRANSDUCER1"),
+        Float32("TRANSDUCER2"),
+        Float32("TRANSDUCER3"),
+        Float32("THERMOCOUPLE1"),
+        Float32("THERMOCOUPLE2"),
+        Float32("THERMOCOUPLE3"),
+        Float32("THERMOCOUPLE4"),
+        _GSE_ERROR_FLAGS,
+    )
+
     def __init__(
         self,
         RSSI: float = 0.0,
@@ -391,50 +777,73 @@ class GSEtoGCSData1(MockPacket):
         TRANSDUCER_1_ERROR: bool = True,
     ):
         super().__init__()
-        self.ID = 0x06
-        self.RSSI = RSSI
-        self.SNR = SNR
         self.ORIGIN_DEVICE = MockPacket._SourceDevice.GSE
-        self.payload_after_id_and_meta = [
-            metric.Metric.StateSetFlags2p1(
-                MANUAL_PURGED,
-                O2_FILL_ACTIVATED,
-                SELECTOR_SWITCH_NEUTRAL_POSITION,
-                N2O_FILL_ACTIVATED,
-                IGNITION_FIRED,
-                IGNITION_SELECTED,
-                GAS_FILL_SELECTED,
-                SYSTEM_ACTIVATED,
-            ),
-            metric.Metric.TRANSDUCER(TRANSDUCER1),
-            metric.Metric.TRANSDUCER(TRANSDUCER2),
-            metric.Metric.TRANSDUCER(TRANSDUCER3),
-            metric.Metric.THERMOCOUPLE(THERMOCOUPLE1),
-            metric.Metric.THERMOCOUPLE(THERMOCOUPLE2),
-            metric.Metric.THERMOCOUPLE(THERMOCOUPLE3),
-            metric.Metric.THERMOCOUPLE(THERMOCOUPLE4),
-            metric.Metric.ERROR_CODE_GSE(
-                IGNITION_ERROR,
-                RELAY3_ERROR,
-                RELAY2_ERROR,
-                RELAY1_ERROR,
-                THERMOCOUPLE_4_ERROR,
-                THERMOCOUPLE_3_ERROR,
-                THERMOCOUPLE_2_ERROR,
-                THERMOCOUPLE_1_ERROR,
-                LOAD_CELL_4_ERROR,
-                LOAD_CELL_3_ERROR,
-                LOAD_CELL_2_ERROR,
-                LOAD_CELL_1_ERROR,
-                TRANSDUCER_4_ERROR,
-                TRANSDUCER_3_ERROR,
-                TRANSDUCER_2_ERROR,
-                TRANSDUCER_1_ERROR,
-            )
+        self.FIELDS = dict(
+            RSSI=RSSI,
+            SNR=SNR,
+            MANUAL_PURGED=MANUAL_PURGED,
+            O2_FILL_ACTIVATED=O2_FILL_ACTIVATED,
+            SELECTOR_SWITCH_NEUTRAL_POSITION=SELECTOR_SWITCH_NEUTRAL_POSITION,
+            N2O_FILL_ACTIVATED=N2O_FILL_ACTIVATED,
+            IGNITION_FIRED=IGNITION_FIRED,
+            IGNITION_SELECTED=IGNITION_SELECTED,
+            GAS_FILL_SELECTED=GAS_FILL_SELECTED,
+            SYSTEM_ACTIVATED=SYSTEM_ACTIVATED,
+            TRANSDUCER1=TRANSDUCER1,
+            TRANSDUCER2=TRANSDUCER2,
+            TRANSDUCER3=TRANSDUCER3,
+            THERMOCOUPLE1=THERMOCOUPLE1,
+            THERMOCOUPLE2=THERMOCOUPLE2,
+            THERMOCOUPLE3=THERMOCOUPLE3,
+            THERMOCOUPLE4=THERMOCOUPLE4,
+            IGNITION_ERROR=IGNITION_ERROR,
+            RELAY3_ERROR=RELAY3_ERROR,
+            RELAY2_ERROR=RELAY2_ERROR,
+            RELAY1_ERROR=RELAY1_ERROR,
+            THERMOCOUPLE_4_ERROR=THERMOCOUPLE_4_ERROR,
+            THERMOCOUPLE_3_ERROR=THERMOCOUPLE_3_ERROR,
+            THERMOCOUPLE_2_ERROR=THERMOCOUPLE_2_ERROR,
+            THERMOCOUPLE_1_ERROR=THERMOCOUPLE_1_ERROR,
+            LOAD_CELL_4_ERROR=LOAD_CELL_4_ERROR,
+            LOAD_CELL_3_ERROR=LOAD_CELL_3_ERROR,
+            LOAD_CELL_2_ERROR=LOAD_CELL_2_ERROR,
+            LOAD_CELL_1_ERROR=LOAD_CELL_1_ERROR,
+            TRANSDUCER_4_ERROR=TRANSDUCER_4_ERROR,
+            TRANSDUCER_3_ERROR=TRANSDUCER_3_ERROR,
+            TRANSDUCER_2_ERROR=TRANSDUCER_2_ERROR,
+            TRANSDUCER_1_ERROR=TRANSDUCER_1_ERROR,
+        )
+
+    def metric_fragments(self) -> List[bytes]:
+        V = self.FIELDS
+        return [
+            _gse_state_fragment(V),
+            metric.Metric.TRANSDUCER(V["TRANSDUCER1"]),
+            metric.Metric.TRANSDUCER(V["TRANSDUCER2"]),
+            metric.Metric.TRANSDUCER(V["TRANSDUCER3"]),
+            metric.Metric.THERMOCOUPLE(V["THERMOCOUPLE1"]),
+            metric.Metric.THERMOCOUPLE(V["THERMOCOUPLE2"]),
+            metric.Metric.THERMOCOUPLE(V["THERMOCOUPLE3"]),
+            metric.Metric.THERMOCOUPLE(V["THERMOCOUPLE4"]),
+            _gse_error_fragment(V),
         ]
 
 
 class GSEtoGCSData2(MockPacket):
+    ID = 0x07
+    BODY_LAYOUT = (
+        _GSE_STATE_FLAGS,
+        Float32("INTERNAL_TEMPERATURE"),
+        Float32("WIND_SPEED"),
+        UInt16("GAS_BOTTLE_WEIGHT_1"),
+        UInt16("GAS_BOTTLE_WEIGHT_2"),
+        Float32("ADDITIONAL_VA_1"),
+        Float32("ADDITIONAL_VA_2"),
+        Float32("ADDITIONAL_CURRENT_1"),
+        Float32("ADDITIONAL_CURRENT_2"),
+        _GSE_ERROR_FLAGS,
+    )
+
     def __init__(
         self,
         RSSI: float = 0.0,
@@ -473,56 +882,66 @@ class GSEtoGCSData2(MockPacket):
         TRANSDUCER_1_ERROR: bool = True,
     ):
         super().__init__()
-        self.ID = 0x07
-        self.RSSI = RSSI
-        self.SNR = SNR
         self.ORIGIN_DEVICE = MockPacket._SourceDevice.GSE
-        self.payload_after_id_and_meta = [
-            metric.Metric.StateSetFlags2p1(
-                MANUAL_PURGED,
-                O2_FILL_ACTIVATED,
-                SELECTOR_SWITCH_NEUTRAL_POSITION,
-                N2O_FILL_ACTIVATED,
-                IGNITION_FIRED,
-                IGNITION_SELECTED,
-                GAS_FILL_SELECTED,
-                SYSTEM_ACTIVATED,
-            ),
-            metric.Metric.INTERNAL_TEMP_GSE(INTERNAL_TEMPERATURE),
-            metric.Metric.WIND_SPEED_GSE(WIND_SPEED),
-            metric.Metric.GAS_BOTTLE_WEIGHT(GAS_BOTTLE_WEIGHT_1),
-            metric.Metric.GAS_BOTTLE_WEIGHT(GAS_BOTTLE_WEIGHT_2),
-            metric.Metric.ADDITIONAL_VA_INPUT(ADDITIONAL_VA_1),
-            metric.Metric.ADDITIONAL_VA_INPUT(ADDITIONAL_VA_2),
-            metric.Metric.ADDITIONAL_CURRENT_INPUT(ADDITIONAL_CURRENT_1),
-            metric.Metric.ADDITIONAL_CURRENT_INPUT(ADDITIONAL_CURRENT_2),
-            metric.Metric.ERROR_CODE_GSE(
-                IGNITION_ERROR,
-                RELAY3_ERROR,
-                RELAY2_ERROR,
-                RELAY1_ERROR,
-                THERMOCOUPLE_4_ERROR,
-                THERMOCOUPLE_3_ERROR,
-                THERMOCOUPLE_2_ERROR,
-                THERMOCOUPLE_1_ERROR,
-                LOAD_CELL_4_ERROR,
-                LOAD_CELL_3_ERROR,
-                LOAD_CELL_2_ERROR,
-                LOAD_CELL_1_ERROR,
-                TRANSDUCER_4_ERROR,
-                TRANSDUCER_3_ERROR,
-                TRANSDUCER_2_ERROR,
-                TRANSDUCER_1_ERROR,
-            )
+        self.FIELDS = dict(
+            RSSI=RSSI,
+            SNR=SNR,
+            MANUAL_PURGED=MANUAL_PURGED,
+            O2_FILL_ACTIVATED=O2_FILL_ACTIVATED,
+            SELECTOR_SWITCH_NEUTRAL_POSITION=SELECTOR_SWITCH_NEUTRAL_POSITION,
+            N2O_FILL_ACTIVATED=N2O_FILL_ACTIVATED,
+            IGNITION_FIRED=IGNITION_FIRED,
+            IGNITION_SELECTED=IGNITION_SELECTED,
+            GAS_FILL_SELECTED=GAS_FILL_SELECTED,
+            SYSTEM_ACTIVATED=SYSTEM_ACTIVATED,
+            INTERNAL_TEMPERATURE=INTERNAL_TEMPERATURE,
+            WIND_SPEED=WIND_SPEED,
+            GAS_BOTTLE_WEIGHT_1=GAS_BOTTLE_WEIGHT_1,
+            GAS_BOTTLE_WEIGHT_2=GAS_BOTTLE_WEIGHT_2,
+            ADDITIONAL_VA_1=ADDITIONAL_VA_1,
+            ADDITIONAL_VA_2=ADDITIONAL_VA_2,
+            ADDITIONAL_CURRENT_1=ADDITIONAL_CURRENT_1,
+            ADDITIONAL_CURRENT_2=ADDITIONAL_CURRENT_2,
+            IGNITION_ERROR=IGNITION_ERROR,
+            RELAY3_ERROR=RELAY3_ERROR,
+            RELAY2_ERROR=RELAY2_ERROR,
+            RELAY1_ERROR=RELAY1_ERROR,
+            THERMOCOUPLE_4_ERROR=THERMOCOUPLE_4_ERROR,
+            THERMOCOUPLE_3_ERROR=THERMOCOUPLE_3_ERROR,
+            THERMOCOUPLE_2_ERROR=THERMOCOUPLE_2_ERROR,
+            THERMOCOUPLE_1_ERROR=THERMOCOUPLE_1_ERROR,
+            LOAD_CELL_4_ERROR=LOAD_CELL_4_ERROR,
+            LOAD_CELL_3_ERROR=LOAD_CELL_3_ERROR,
+            LOAD_CELL_2_ERROR=LOAD_CELL_2_ERROR,
+            LOAD_CELL_1_ERROR=LOAD_CELL_1_ERROR,
+            TRANSDUCER_4_ERROR=TRANSDUCER_4_ERROR,
+            TRANSDUCER_3_ERROR=TRANSDUCER_3_ERROR,
+            TRANSDUCER_2_ERROR=TRANSDUCER_2_ERROR,
+            TRANSDUCER_1_ERROR=TRANSDUCER_1_ERROR,
+        )
+
+    def metric_fragments(self) -> List[bytes]:
+        V = self.FIELDS
+        return [
+            _gse_state_fragment(V),
+            metric.Metric.INTERNAL_TEMP_GSE(V["INTERNAL_TEMPERATURE"]),
+            metric.Metric.WIND_SPEED_GSE(V["WIND_SPEED"]),
+            metric.Metric.GAS_BOTTLE_WEIGHT(V["GAS_BOTTLE_WEIGHT_1"]),
+            metric.Metric.GAS_BOTTLE_WEIGHT(V["GAS_BOTTLE_WEIGHT_2"]),
+            metric.Metric.ADDITIONAL_VA_INPUT(V["ADDITIONAL_VA_1"]),
+            metric.Metric.ADDITIONAL_VA_INPUT(V["ADDITIONAL_VA_2"]),
+            metric.Metric.ADDITIONAL_CURRENT_INPUT(V["ADDITIONAL_CURRENT_1"]),
+            metric.Metric.ADDITIONAL_CURRENT_INPUT(V["ADDITIONAL_CURRENT_2"]),
+            _gse_error_fragment(V),
         ]
 
 
-def sinusoid(t: float, min: float, max: float, period: float,
-             phase: float, apply_noise: bool = True) -> float:
+def sinusoid(t, min: float, max: float, period: float,
+             phase: float, apply_noise: bool = True):
     """Generate sinusoidal value for simulation purposes
 
     Args:
-        t (float): Time in seconds
+        t (float | np.ndarray): Time in seconds, or a block of times
         min (float): Min y value
         max (float): Max y value
         period (float): Period in seconds
@@ -530,111 +949,58 @@ def sinusoid(t: float, min: float, max: float, period: float,
         apply_noise (bool, optional): Apply fake signal noise. Defaults to True.
 
     Returns:
-        float: Output value
+        float | np.ndarray: Output value for each time
     """
 
     amplitude = (max - min) / 2
     offset = (max + min) / 2
-    base = amplitude * math.sin(2 * math.pi * (t / period) + phase) + offset
+    block = isinstance(t, np.ndarray)
+    sin = np.sin if block else math.sin
+    base = amplitude * sin(2 * math.pi * (t / period) + phase) + offset
 
     if apply_noise:
         noise_range_abs = amplitude * MockPacket._NOISE_COEFFICIENT
         base *= 1-MockPacket._NOISE_COEFFICIENT  # Make space for noise
-        noise = MockPacket._NOISE_COEFFICIENT * random.random() * noise_range_abs
+        uniform = _NOISE_RNG.random(t.shape) if block else random.random()
+        noise = MockPacket._NOISE_COEFFICIENT * uniform * noise_range_abs
         return base + noise
 
     return base
 
 
-def changing_int(t: float, min: int, max: int, wait_time_s: float):
+def changing_int(t, min: int, max: int, wait_time_s: float):
     """Output an int from `min` to `max` increimenting every `wait_time_s` seconds"""
     span = max - min + 1
-    step = int(t // wait_time_s) % span
-    return min + step
+    step = t // wait_time_s
+    step = step.astype(np.int64) if isinstance(step, np.ndarray) else int(step)
+    return min + step % span
 
 
-def changing_bool(t: float, wait_time_s: float = 1):
+def changing_bool(t, wait_time_s: float = 1):
     """Bool changing every `wait_time_s` seconds"""
     return t % wait_time_s*2 > wait_time_s
 
 
-def corrupt_packet(packet: dict, corruption_chance: float = 0.01, max_corruption: float = 0.3):
-    """Corrupts data inside a packet with random bit flips
-
-    Args:
-        packet (dict): Packet data to be corrupted
-        corruption_chance (float): Chance of packet being corrupted [0, 1]
-        max_corruption (float): Max percentage of bits flipped [0, 1]
-    """
-    assert 0 <= corruption_chance <= 1, "Corruption chance must be between 0 and 1"
-    assert 0 <= max_corruption <= 1, "Max corruption must be between 0 and 1"
-
-    if random.random() <= corruption_chance:
-        corruption = max_corruption * random.random()
-
-        for key, value in packet.items():
-            data_type = type(value)
-
-            # Get packed bits of value
-            packed = None
-            if isinstance(value, bool):
-                packed = struct.pack('?', value)
-            elif isinstance(value, int):
-                packed = struct.pack('i', value)
-            elif isinstance(value, float):
-                packed = struct.pack('f', value)
-
-            # Only flip bits of supported value types
-            if packed != None:
-                binary_str = ''.join(f'{byte:08b}' for byte in packed)
-                bytes_str = bytes(int(binary_str[i:i+8], 2)
-                                  for i in range(0, len(binary_str), 8))
-
-                # Generate corruption mask to flip bits based on corruption % chance
-                binary_corrupt = ''.join(
-                    random.choices(['1', '0'],
-                                   weights=[corruption, 1 - corruption],
-                                   k=len(binary_str))
-                )
-                bytes_corrupt = bytes(
-                    int(binary_corrupt[i:i+8], 2) for i in range(0, len(binary_corrupt), 8)
-                )
-                byte_data = bytes(
-                    a ^ b for a, b in zip(bytes_str, bytes_corrupt)
-                )
-
-                # Pack bits back into a value
-                if data_type == bool:
-                    value_corrupt = struct.unpack('?', byte_data)[0]
-                elif data_type == int:
-                    value_corrupt = struct.unpack('i', byte_data)[0]
-                    value_corrupt &= (1 << value.bit_length()) - 1
-                elif data_type == float:
-                    value_corrupt = struct.unpack('f', byte_data)[0]
-                    if not Metric.is_valid_float32(value_corrupt):
-                        value_corrupt = 3.4028235e+38
-
-                # Add corrupt value to packet
-                packet[key] = value_corrupt
+def _to_int16(VALUES: np.ndarray) -> np.ndarray:
+    """int() for every value, saturating at the 16 bit range the sensors
+    report in. The peaks of the accelerometer waves land just outside it"""
+    if not isinstance(VALUES, np.ndarray):
+        return max(-32768, min(32767, int(VALUES)))
+    return np.clip(np.trunc(VALUES), -32768, 32767).astype(np.int64)
 
 
-def get_sinusoid_packets(START_TIME: float,
-                         EXPERIMENTAL: bool,
-                         CORRUPTION: bool) -> List[MockPacket]:
-    """Just generate packets with sinusoidal values over time.
-    Values ranges should cover optimal operating conditions unless specified otherwise
+def sinusoid_columns(T, EXPERIMENTAL: bool) -> List[tuple]:
+    """Evaluate every emulated channel for a block of times at once
 
     Args:
-        START_TIME (float): A constant monotonic time value in seconds since the start of the program.
+        T (float | np.ndarray): Seconds since the emulator started, one per
+            tick
         EXPERIMENTAL (bool): If True, use values that indicate erroneous operation
 
     Returns:
-        List[MockPacket]: A list of all simulated packet types
+        List[tuple]: (packet class, keyword arguments) per packet type. Each
+            argument is an array with a value per time, or one constant
     """
-
-    TIME_NOW = time.monotonic()
-    T = TIME_NOW - START_TIME
-
     ARGS_AV_COMMON = {"RSSI":  sinusoid(T, min=-50, max=0, period=10, phase=0),
                       "SNR": sinusoid(T, min=0, max=10, period=10, phase=math.pi/2),
                       "FLIGHT_STATE_": changing_int(T, 0, 0b111, 1) if EXPERIMENTAL else 0b000,
@@ -645,16 +1011,16 @@ def get_sinusoid_packets(START_TIME: float,
                       "CAMERA_CONTROLLER_CONNECTION": changing_bool(T) if EXPERIMENTAL else True}
 
     ARGS_AVtoGCSData1 = ARGS_AV_COMMON | {
-        "ACCEL_LOW_X": int(2048*sinusoid(T, min=-15.9, max=15.9, period=5, phase=2*math.pi/3)),
-        "ACCEL_LOW_Y": int(2048*sinusoid(T, min=-15.9, max=15.9, period=5, phase=4*math.pi/3)),
-        "ACCEL_LOW_Z": -int(2048*sinusoid(T, min=-15.9, max=15.9, period=5, phase=6*math.pi/3)),
-        "ACCEL_HIGH_X": -int(1024*sinusoid(T, min=-32, max=32, period=5, phase=2*math.pi/3)),
-        "ACCEL_HIGH_Y": -int(1024*sinusoid(T, min=-32, max=32, period=5, phase=4*math.pi/3)),
-        "ACCEL_HIGH_Z": int(1024*sinusoid(T, min=-32, max=32, period=5, phase=6*math.pi/3)),
+        "ACCEL_LOW_X": _to_int16(2048*sinusoid(T, min=-15.9, max=15.9, period=5, phase=2*math.pi/3)),
+        "ACCEL_LOW_Y": _to_int16(2048*sinusoid(T, min=-15.9, max=15.9, period=5, phase=4*math.pi/3)),
+        "ACCEL_LOW_Z": _to_int16(-2048*sinusoid(T, min=-15.9, max=15.9, period=5, phase=6*math.pi/3)),
+        "ACCEL_HIGH_X": _to_int16(-1024*sinusoid(T, min=-32, max=32, period=5, phase=2*math.pi/3)),
+        "ACCEL_HIGH_Y": _to_int16(-1024*sinusoid(T, min=-32, max=32, period=5, phase=4*math.pi/3)),
+        "ACCEL_HIGH_Z": _to_int16(1024*sinusoid(T, min=-32, max=32, period=5, phase=6*math.pi/3)),
         # should be [-30,30] on output
-        "GYRO_X": int(sinusoid(T, min=-245, max=245, period=5, phase=2*math.pi/3)/0.00875),
-        "GYRO_Y": int(sinusoid(T, min=-245, max=245, period=5, phase=4*math.pi/3)/0.00875),
-        "GYRO_Z": int(sinusoid(T, min=-245, max=245, period=5, phase=6*math.pi/3)/0.00875),
+        "GYRO_X": _to_int16(sinusoid(T, min=-245, max=245, period=5, phase=2*math.pi/3)/0.00875),
+        "GYRO_Y": _to_int16(sinusoid(T, min=-245, max=245, period=5, phase=4*math.pi/3)/0.00875),
+        "GYRO_Z": _to_int16(sinusoid(T, min=-245, max=245, period=5, phase=6*math.pi/3)/0.00875),
         "ALTITUDE": sinusoid(T, min=0, max=3000, period=40, phase=0),
         "VELOCITY": sinusoid(T, min=0, max=350, period=20, phase=0),
         "APOGEE_PRIMARY_TEST_COMPETE": changing_bool(T) if EXPERIMENTAL else False,
@@ -669,8 +1035,8 @@ def get_sinusoid_packets(START_TIME: float,
     }
 
     if EXPERIMENTAL:
-        nav_status = Metric.POSSIBLE_NAV_VALUES[
-            int(T/1 % len(Metric.POSSIBLE_NAV_VALUES))
+        nav_status = np.asarray(Metric.POSSIBLE_NAV_VALUES)[
+            np.asarray(T/1 % len(Metric.POSSIBLE_NAV_VALUES)).astype(np.int64)
         ]
     else:
         nav_status = "G2"
@@ -730,31 +1096,186 @@ def get_sinusoid_packets(START_TIME: float,
     ARGS_GSEtoGCSData2 = ARGS_GSE_COMMON | {
         "INTERNAL_TEMPERATURE": sinusoid(T, min=15, max=60, period=30, phase=0),
         "WIND_SPEED": sinusoid(T, min=15, max=20, period=30, phase=0),
-        "GAS_BOTTLE_WEIGHT_1": int(sinusoid(T, min=12, max=18, period=30, phase=0)),
-        "GAS_BOTTLE_WEIGHT_2": int(sinusoid(T, min=12, max=18, period=30, phase=math.pi/2)),
+        "GAS_BOTTLE_WEIGHT_1": _to_int16(sinusoid(T, min=12, max=18, period=30, phase=0)),
+        "GAS_BOTTLE_WEIGHT_2": _to_int16(sinusoid(T, min=12, max=18, period=30, phase=math.pi/2)),
         "ADDITIONAL_VA_1": sinusoid(T, min=15, max=60, period=30, phase=0),
         "ADDITIONAL_VA_2": sinusoid(T, min=2, max=5, period=10, phase=0),
         "ADDITIONAL_CURRENT_1": sinusoid(T, min=1, max=5, period=10, phase=0),
         "ADDITIONAL_CURRENT_2": sinusoid(T, min=2, max=5, period=10, phase=0),
     }
 
-    # Simulate random data corruption on packet
-    if CORRUPTION:
-        corrupt_packet(ARGS_AVtoGCSData1)
-        corrupt_packet(ARGS_AVtoGCSData2)
-        corrupt_packet(ARGS_AVtoGCSData3)
-        corrupt_packet(ARGS_GSEtoGCSData1)
-        corrupt_packet(ARGS_GSEtoGCSData2)
-
     return [
-        AVtoGCSData1(**ARGS_AVtoGCSData1),
-        AVtoGCSData2(**ARGS_AVtoGCSData2),
-        AVtoGCSData3(**ARGS_AVtoGCSData3),
-        GSEtoGCSData1(**ARGS_GSEtoGCSData1),
-        GSEtoGCSData2(**ARGS_GSEtoGCSData2)
+        (AVtoGCSData1, ARGS_AVtoGCSData1),
+        (AVtoGCSData2, ARGS_AVtoGCSData2),
+        (AVtoGCSData3, ARGS_AVtoGCSData3),
+        (GSEtoGCSData1, ARGS_GSEtoGCSData1),
+        (GSEtoGCSData2, ARGS_GSEtoGCSData2)
     ]
 
 
+def _column_rows(COLUMNS: dict, COUNT: int) -> List[dict]:
+    """Split columns into one keyword dict per time, as plain Python values"""
+    values = {}
+    for key, value in COLUMNS.items():
+        if isinstance(value, np.ndarray) and value.ndim:
+            values[key] = value.tolist()
+        else:
+            if isinstance(value, np.generic):
+                value = value.item()
+            values[key] = [value] * COUNT
+    return [{key: column[i] for key, column in values.items()}
+            for i in range(COUNT)]
+
+
+def get_sinusoid_packet_rows(T: np.ndarray,
+                             EXPERIMENTAL: bool) -> List[List[MockPacket]]:
+    """Build the sinusoid packets for a block of times
+
+    Args:
+        T (np.ndarray): Seconds since the emulator started, one per tick. A
+            single float gives a single tick
+        EXPERIMENTAL (bool): If True, use values that indicate erroneous operation
+
+    Returns:
+        List[List[MockPacket]]: Every packet type for each tick, in time order
+    """
+    single = np.ndim(T) == 0
+    # Plain float maths is much cheaper than one element arrays
+    T = float(T) if single else np.asarray(T, dtype=np.float64)
+    rows_per_type = []
+    for packet_class, columns in sinusoid_columns(T, EXPERIMENTAL):
+        rows = [columns] if single else _column_rows(columns, len(T))
+        rows_per_type.append([packet_class(**row) for row in rows])
+    return [list(tick) for tick in zip(*rows_per_type)]
+
+
+def get_sinusoid_packets(START_TIME: float,
+                         EXPERIMENTAL: bool) -> List[MockPacket]:
+    """Just generate packets with sinusoidal values over time.
+    Values ranges should cover optimal operating conditions unless specified otherwise
+
+    Args:
+        START_TIME (float): A constant monotonic time value in seconds since the start of the program.
+        EXPERIMENTAL (bool): If True, use values that indicate erroneous operation
+
+    Returns:
+        List[MockPacket]: A list of all simulated packet types
+    """
+
+    TIME_NOW = time.monotonic()
+    T = TIME_NOW - START_TIME
+    return get_sinusoid_packet_rows(T, EXPERIMENTAL)[0]
+
+
+def sinusoid_block_size(TICKS: int, EXPERIMENTAL: bool) -> int:
+    """Buffer size encode_sinusoid_block() needs for TICKS ticks"""
+    return TICKS * sum(packet_class.buffer_size() for packet_class, _
+                       in sinusoid_columns(0.0, EXPERIMENTAL))
+
+
+def encode_sinusoid_block(T: np.ndarray, EXPERIMENTAL: bool,
+                          BUFFER: Optional[bytearray] = None) -> List[tuple]:
+    """Pre-encode the sinusoid packets for a block of times
+
+    Args:
+        T (np.ndarray): Seconds since the emulator started, one per tick
+        EXPERIMENTAL (bool): If True, use values that indicate erroneous operation
+        BUFFER (bytearray, optional): Encode the payloads back to back into
+            this instead of allocating each one, see sinusoid_block_size().
+            The payloads are then views into it, only valid until it's
+            reused
+
+    Returns:
+        List[tuple]: (time, origin device, payload) in time order
+    """
+    block = []
+    view = None if BUFFER is None else memoryview(BUFFER)
+    offset = 0
+    for time_s, packets in zip(np.atleast_1d(T).tolist(),
+                               get_sinusoid_packet_rows(T, EXPERIMENTAL)):
+        for packet in packets:
+            if view is None:
+                payload = bytes(packet.get_payload_bytes())
+            else:
+                size = packet.encode_into(view, offset)
+                payload = view[offset:offset + size]
+                offset += size
+            block.append((time_s, packet.ORIGIN_DEVICE, payload))
+    return block
+
+
+def run_stress(RATE_HZ: float, EXPERIMENTAL: bool,
+               AV_LOCK_PATH: str, GSE_LOCK_PATH: str,
+               SOCKET_PATH: Optional[str] = None) -> None:
+    """Write sinusoid packets at a fixed packet rate for stress testing
+
+    Packets are generated and encoded a block at a time ahead of when
+    they're due, then each is written on its own at its due time. Writes
+    are spaced by min_write_gap_ms, which caps the rate that can be reached.
+
+    Args:
+        RATE_HZ (float): Packets per second across all packet types
+        AV_LOCK_PATH (str): AV packets are only written while this exists
+        GSE_LOCK_PATH (str): GSE packets are only written while this exists
+        SOCKET_PATH (str, optional): Middleware socket name. When given, the
+            rate the middleware publishes is reported next to the write rate
+    """
+    PACKETS_PER_TICK = len(sinusoid_columns(0.0, EXPERIMENTAL))
+    TICK_S = PACKETS_PER_TICK / RATE_HZ
+    TICKS_PER_BLOCK = max(1, int(STRESS_BLOCK_S / TICK_S))
+    LOCKS = {MockPacket._SourceDevice.AV: AV_LOCK_PATH,
+             MockPacket._SourceDevice.GSE: GSE_LOCK_PATH}
+    MIN_GAP_S = MockPacket._DEVICE_WRITER.MIN_GAP_S
+    if MIN_GAP_S > 0 and RATE_HZ > 1 / MIN_GAP_S:
+        slogger.warning(
+            f"Stress rate {RATE_HZ:g} packets/s is above the "
+            f"{1 / MIN_GAP_S:.0f} packets/s min_write_gap_ms allows, "
+            f"packets will be late")
+    # Each block is written before the next is encoded, so one buffer does
+    block_buffer = bytearray(sinusoid_block_size(TICKS_PER_BLOCK, EXPERIMENTAL))
+    rng = np.random.default_rng()
+    scheduler = DeadlineScheduler(SHOULD_STOP=service_helper.time_to_stop)
+    sent = RateCounter()
+    delivered = None if SOCKET_PATH is None else \
+        DeliveredCounter(f"ipc:///tmp/{SOCKET_PATH}_pub.sock").start()
+    last_status_time = time.monotonic()
+    slogger.info(f"Stress mode: {RATE_HZ:g} packets/s")
+
+    tick = 0
+    try:
+        while not service_helper.time_to_stop():
+            T = (tick + np.arange(TICKS_PER_BLOCK)) * TICK_S
+            # The packets of a tick share its time, but are due evenly
+            # spread so the write gap doesn't make them late
+            first_packet = tick * PACKETS_PER_TICK
+            tick += TICKS_PER_BLOCK
+            block = encode_sinusoid_block(T, EXPERIMENTAL, block_buffer)
+            kept = (rng.random(len(block)) >= MockPacket._PACKET_LOSS).tolist()
+            for index, ((_, device, payload), keep) in enumerate(
+                    zip(block, kept), first_packet):
+                if not scheduler.wait_until(index / RATE_HZ):
+                    return
+                # As a cheeky sequence emulation, only write when the lock file is PRESENT
+                if not keep or (device in LOCKS
+                                and not os.path.exists(LOCKS[device])):
+                    continue
+                MockPacket.write_bytes(payload)
+                sent.add()
+
+            now = time.monotonic()
+            if now - last_status_time >= STRESS_STATUS_INTERVAL_S:
+                status = f"Stress mode: written {sent.rate():.0f} packets/s"
+                if delivered is not None:
+                    status += f", delivered {delivered.rate():.0f} packets/s"
+                    delivered.reset()
+                slogger.info(f"{status}, {scheduler.summary()}")
+                sent.reset()
+                last_status_time = now
+    finally:
+        if delivered is not None:
+            delivered.stop()
+
+
 def main():
     slogger.debug("Emulator starting")
 
@@ -801,8 +1322,27 @@ def main():
         slogger.warning(
             "Experimental mode enabled. Values may appear nonsensical.")
 
+    if CORRUPTION:
+        corruption = BitErrorModel.from_config(CONFIG_LOADED['emulation'])
+        MockPacket.enable_corruption(corruption)
+        # Set corruption_seed to this to corrupt the same bits again
+        slogger.warning(
+            f"Corruption enabled. Bit error rate {corruption.BIT_ERROR_RATE:g}, "
+            f"burst rate {corruption.BURST_RATE:g}, seed {corruption.seed}")
+
+    if "--rate" in sys.argv:
+        RATE_HZ = float(sys.argv[sys.argv.index('--rate') + 1])
+        if RATE_HZ <= 0:
+            raise ValueError(f"Stress rate must be above 0, got {RATE_HZ}")
+        SOCKET_PATH = sys.argv[sys.argv.index('--socket-path') + 1] \
+            if '--socket-path' in sys.argv else None
+        run_stress(RATE_HZ, EXPERIMENTAL, AV_LOCK_PATH, GSE_LOCK_PATH,
+                   SOCKET_PATH)
+        slogger.debug("Emulator finished")
+        return
+
     while not service_helper.time_to_stop():
-        for packet in get_sinusoid_packets(START_TIME, EXPERIMENTAL, CORRUPTION):
+        for packet in get_sinusoid_packets(START_TIME, EXPERIMENTAL):
             device = packet.ORIGIN_DEVICE
             # As a cheeky sequence emulation, only write when the lock file is PRESENT
             if random.random() < MockPacket._PACKET_LOSS:
@@ -2,7 +2,6 @@ import datetime
 import time
 import zmq
 import os
-import csv
 import traceback
 from abc import ABC, abstractmethod
 import sys
@@ -23,6 +22,13 @@ import backend.includes_python.process_logging as slogger  # slog deez nuts
 import backend.includes_python.ansci as ansci
 from backend.includes_python.mach import Mach
 import backend.includes_python.service_helper as service_helper
+from backend.includes_python.perf_stats import RateCounter
+from backend.includes_python.pipeline import Stage
+import backend.includes_python.csv_layout as csv_layout
+from backend.includes_python.log_writer import BackgroundLogWriter, CsvLogSet, FlushPolicy
+import backend.includes_python.flight_log as flight_log
+import backend.includes_python.packet_subscription as packet_subscription
+import config.config as config
 
 # Just prints useful information from AV and saves it to csv file
 
@@ -34,6 +40,12 @@ class Packet(ABC):
     # Defined in _setup_logging
     _session_log_folder: str = None
     _CSV_FILES_WITH_HEADERS: Dict[str, str] = None
+    # Writer thread owning the open CSV files and flight log. Also defined in
+    # _setup_logging
+    _log_writer: Optional[BackgroundLogWriter] = None
+    _flush_policy: FlushPolicy = FlushPolicy()
+    _writer_queue_size: int = 4096
+    _flight_log_enabled: bool = True
 
     @classmethod
     def _setup_logging(cls):
@@ -64,179 +76,45 @@ class Packet(ABC):
 
         cls._session_log_folder = session_log_folder
 
-        # NOTE: Base these off the proto files
-        # Name each subclass after these
-        # TODO: After the proto files are finalised, update these
-        cls._CSV_FILES_WITH_HEADERS = {
-            "GCS_TO_AV_STATE_CMD": [
-                "not used"
-            ],
-            "GCS_TO_GSE_STATE_CMD": [
-                "not used"
-            ],
-            "AV_TO_GCS_DATA_1": [
-                "rssi",
-                "snr",
-                "timestamp_s_server_side",
-                "total_packet_count_av",
-                "total_packet_count_gse",
-                "FlightState",
-                "dual_board_connectivity_state_flag",
-                "recovery_checks_complete_and_flight_ready",
-                "GPS_fix_flag",
-                "payload_connection_flag",
-                "camera_controller_connection_flag",
-                "accel_low_x",
-                "accel_low_y",
-                "accel_low_z",
-                "accel_high_x",
-                "accel_high_y",
-                "accel_high_z",
-                "gyro_x",
-                "gyro_y",
-                "gyro_z",
-                "altitude",
-                "velocity",
-                "apogee_primary_test_complete",
-                "apogee_secondary_test_complete",
-                "apogee_primary_test_results",
-                "apogee_secondary_test_results",
-                "main_primary_test_complete",
-                "main_secondary_test_complete",
-                "main_primary_test_results",
-                "main_secondary_test_results",
-                "broadcast_flag"
-            ],
-            "AV_TO_GCS_DATA_2": [
-                "rssi",
-                "snr",
-                "timestamp_s_server_side",
-                "total_packet_count_av",
-                "total_packet_count_gse",
-                "FlightState",
-                "dual_board_connectivity_state_flag",
-                "recovery_checks_complete_and_flight_ready",
-                "GPS_fix_flag",
-                "payload_connection_flag",
-                "camera_controller_connection_flag",
-                "GPS_latitude",
-                "GPS_longitude",
-                "nav_status",
-                "qw",
-                "qx",
-                "qy",
-                "qz",
-            ],
-            "AV_TO_GCS_DATA_3": [
-                "rssi",
-                "snr",
-                "timestamp_s_server_side",
-                "total_packet_count_av",
-                "total_packet_count_gse",
-                "FlightState",
-                "dual_board_connectivity_state_flag",
-                "recovery_checks_complete_and_flight_ready",
-                "GPS_fix_flag",
-                "payload_connection_flag",
-                "camera_controller_connection_flag",
-                # ALL TBD
-            ],
-            "GSE_TO_GCS_DATA_1": [
-                "rssi",
-                "snr",
-                "timestamp_s_server_side",
-                "total_packet_count_av",
-                "total_packet_count_gse",
-                "manual_purge_activated",
-                "o2_fill_activated",
-                "selector_switch_neutral_position",
-                "n20_fill_activated",
-                "ignition_fired",
-                "ignition_selected",
-                "gas_fill_selected",
-                "system_activated",
-                "transducer_1",
-                "transducer_2",
-                "transducer_3",
-                "thermocouple_1",
-                "thermocouple_2",
-                "thermocouple_3",
-                "thermocouple_4",
-                "ignition_error",
-                "relay_3_error",
-                "relay_2_error",
-                "relay_1_error",
-                "thermocouple_4_error",
-                "thermocouple_3_error",
-                "thermocouple_2_error",
-                "thermocouple_1_error",
-                "load_cell_4_error",
-                "load_cell_3_error",
-                "load_cell_2_error",
-                "load_cell_1_error",
-                "transducer_4_error",
-                "transducer_3_error",
-                "transducer_2_error",
-                "transducer_1_error",
-            ],
-            "GSE_TO_GCS_DATA_2": [
-                "rssi",
-                "snr",
-                "timestamp_s_server_side",
-                "total_packet_count_av",
-                "total_packet_count_gse",
-                "manual_purge_activated",
-                "o2_fill_activated",
-                "selector_switch_neutral_position",
-                "n20_fill_activated",
-                "ignition_fired",
-                "ignition_selected",
-                "gas_fill_selected",
-                "system_activated",
-                "internal_temp",
-                "wind_speed",
-                "gas_bottle_weight_1",
-                "gas_bottle_weight_2",
-                "analog_voltage_input_1",
-                "analog_voltage_input_2",
-                "additional_current_input_1",
-                "additional_current_input_2",
-                "ignition_error",
-                "relay_3_error",
-                "relay_2_error",
-                "relay_1_error",
-                "thermocouple_4_error",
-                "thermocouple_3_error",
-                "thermocouple_2_error",
-                "thermocouple_1_error",
-                "load_cell_4_error",
-                "load_cell_3_error",
-                "load_cell_2_error",
-                "load_cell_1_error",
-                "transducer_4_error",
-                "transducer_3_error",
-                "transducer_2_error",
-                "transducer_1_error",
-            ],
-            # Unused
-            "GSE_TO_GCS_DATA_3": ["unused", "", "", "", ""],
-        }
+        cls._CSV_FILES_WITH_HEADERS = csv_layout.CSV_FILES_WITH_HEADERS
 
         # As the directory is named per instance, this should not need to be
-        # looped for name uniqueness
-        for file_name, headers in cls._CSV_FILES_WITH_HEADERS.items():
-            csv_path = os.path.join(
-                cls._session_log_folder, f"{file_name}.csv")
-            with open(csv_path, "w", newline="") as f:
-                writer = csv.writer(f)
-                writer.writerow(["timestamp_ms_log_time"] + headers)
+        # looped for name uniqueness. Files stay open until close_logs()
+        csv_files = CsvLogSet(cls._session_log_folder,
+                              cls._CSV_FILES_WITH_HEADERS,
+                              cls._flush_policy,
+                              TIME_COLUMN="timestamp_ms_log_time")
+        # Raw packets as received, for fast reloading and replay
+        flight_log_writer = None
+        if cls._flight_log_enabled:
+            flight_log_writer = flight_log.FlightLogWriter(
+                os.path.join(cls._session_log_folder,
+                             flight_log.SESSION_FILE_NAME),
+                cls._flush_policy,
+                START_UNIX_S=cls._VIEWER_STARTUP_TIMESTAMP.timestamp())
+        # Disk writes happen on their own thread so an SD card stall can't
+        # hold up the receive loop
+        cls._log_writer = BackgroundLogWriter(
+            csv_files, flight_log_writer, cls._writer_queue_size,
+            POLL_INTERVAL_S=cls._flush_policy.FLUSH_INTERVAL_S)
 
     @classmethod
     def setup(cls,
               STARTUP_TIME: datetime.datetime,
-              CREATE_LOGS: bool):
-
+              CREATE_LOGS: bool,
+              FLUSH_POLICY: Optional[FlushPolicy] = None,
+              WRITER_QUEUE_SIZE: Optional[int] = None,
+              FLIGHT_LOG: Optional[bool] = None):
+
+        if FLUSH_POLICY is not None:
+            cls._flush_policy = FLUSH_POLICY
+        if WRITER_QUEUE_SIZE is not None:
+            cls._writer_queue_size = WRITER_QUEUE_SIZE
+        if FLIGHT_LOG is not None:
+            cls._flight_log_enabled = FLIGHT_LOG
         cls._VIEWER_STARTUP_TIMESTAMP = STARTUP_TIME
+        # Log times are measured from here, immune to wall clock changes
+        cls._VIEWER_STARTUP_MONOTONIC = time.monotonic()
         cls._VIEWER_STARTUP_TIMESTAMP_STR = \
             STARTUP_TIME.strftime("%Y-%m-%d_%H-%M-%S")
 
@@ -247,6 +125,39 @@ class Packet(ABC):
 
         cls._setup = True
 
+    @classmethod
+    def log_time_s(cls) -> float:
+        """Seconds since the viewer started"""
+        return time.monotonic() - cls._VIEWER_STARTUP_MONOTONIC
+
+    @classmethod
+    def log_raw(cls, PACKET_ID: int, PAYLOAD: bytes, RECEIVED_S: float) -> None:
+        """Save a packet to the flight log exactly as it was received
+
+        Args:
+            PACKET_ID (int): Middleware packet ID
+            PAYLOAD (bytes): Serialised protobuf
+            RECEIVED_S (float): From log_time_s() when it was received
+        """
+        if cls._log_writer is not None:
+            cls._log_writer.write_frame(PACKET_ID, RECEIVED_S, PAYLOAD)
+
+    @classmethod
+    def report_log_stats(cls) -> None:
+        """Log the log writer's queue, drop and latency counters"""
+        if cls._log_writer is None:
+            return
+        summary = cls._log_writer.stats_summary()
+        if summary is not None:
+            slogger.info(summary)
+
+    @classmethod
+    def close_logs(cls) -> None:
+        """Write out queued rows then flush, sync and close every log file"""
+        if cls._log_writer is not None:
+            cls._log_writer.close()
+            cls._log_writer = None
+
     def __init__(self, packet_id, serial_data):
         self._PACKET_ID = packet_id
         self._SERIAL_DATA = serial_data
@@ -255,65 +166,46 @@ class Packet(ABC):
         if not self.__class__._setup == True:
             raise Exception("Error: Logging not set up")
 
-    def _log_to_csv(self, PROTO_DATA: List[str]):
+    def _log_to_csv(self, PROTO_DATA: PbMessage, RECEIVED_S: float):
         """Log data to the respective CSV file
 
         Args:
-            data (List[str]): A list of values to place in the row of the CSV file
+            PROTO_DATA (PbMessage): The protobuf object. One column per header,
+                unset fields are left empty
+            RECEIVED_S (float): From log_time_s() when it was received. Same
+                time as the flight log frame, however far behind decode is
 
         Raises:
             Exception: Incorrect file name
         """
-        def extract_proto_values(proto: PbMessage) -> List[Union[str, int, float, bool]]:
-            values = []
-            for field, value in proto.ListFields():
-                if field.label == field.LABEL_REPEATED:
-                    # Handle repeated fields
-                    for item in value:
-                        if field.type == field.TYPE_MESSAGE:
-                            values.extend(
-                                extract_proto_values(item))  # Recurse
-                        else:
-                            values.append(item)
-                else:
-                    if field.type == field.TYPE_MESSAGE:
-                        values.extend(extract_proto_values(value))  # Recurse
-                    else:
-                        values.append(value)
-            return values
-
         if not self.__class__._LOGGING_ENABLED:
             # slogger.error("Logging to csv disabled but attempted anyway")
             return
 
-        data = extract_proto_values(PROTO_DATA)
-
-        if self._packet_name not in self.__class__._CSV_FILES_WITH_HEADERS.keys():
+        if self._packet_name not in self.__class__._log_writer:
             raise Exception(
                 f"Error: Unknown packet name: {self._packet_name}. Please ensure sub-class is named verbatim to cls._CSV_FILES_WITH_HEADERS")
 
-        file_name = self._packet_name + ".csv"
-
-        with open(os.path.join(self.__class__._session_log_folder, file_name), "a") as f:
-            writer = csv.writer(f)
-            timestamp = datetime.datetime.now() - self.__class__._VIEWER_STARTUP_TIMESTAMP
-            writer.writerow([timestamp.total_seconds()*1000] + data)
+        data = csv_layout.row_plan(self._packet_name).row(PROTO_DATA)
+        self.__class__._log_writer.write_row(
+            self._packet_name, [RECEIVED_S*1000] + data)
 
     @abstractmethod
     # As mentioned, call super on this anyway, but impliment own mods
-    def process(self, PROTO_DATA: PbMessage) -> None:
+    def process(self, PROTO_DATA: PbMessage, RECEIVED_S: float) -> None:
         """How to handle each new packet from an event viewer perspective
         this includes logging to file and printing important information to console
 
         Args:
             PROTO_DATA (PbMessage): The protobuf object
+            RECEIVED_S (float): From log_time_s() when it was received
         """
         # `PROTO_DATA.ListFields()[0][0].name` returns the field name
         # `PROTO_DATA.ListFields()[0][1]` returns the value
         # This will just assume it's all in order of the csv headers for now.
         # Git issue #26
         # `Logging enabled` check is internal to the csv function
-        self._log_to_csv(PROTO_DATA)
+        self._log_to_csv(PROTO_DATA, RECEIVED_S)
         # Please call super on this and add printing events afterwards
 
 
@@ -397,8 +289,9 @@ class AVPacket(Packet):
     def process(self, PROTO_DATA:
                 Union[AV_TO_GCS_DATA_1_pb.AV_TO_GCS_DATA_1,
                       AV_TO_GCS_DATA_2_pb.AV_TO_GCS_DATA_2,
-                      AV_TO_GCS_DATA_3_pb.AV_TO_GCS_DATA_3]) -> None:
-        super().process(PROTO_DATA)
+                      AV_TO_GCS_DATA_3_pb.AV_TO_GCS_DATA_3],
+                RECEIVED_S: float) -> None:
+        super().process(PROTO_DATA, RECEIVED_S)
         # Useful docs: https://googleapis.dev/python/protobuf/latest/google/protobuf/descriptor.html
 
         # State Flags
@@ -604,8 +497,8 @@ class AV_TO_GCS_DATA_1(AVPacket):
 
         self._last_information_display_time = time.monotonic()
 
-    def process(self, PROTO_DATA: AV_TO_GCS_DATA_1_pb.AV_TO_GCS_DATA_1) -> None:
-        super().process(PROTO_DATA)
+    def process(self, PROTO_DATA: AV_TO_GCS_DATA_1_pb.AV_TO_GCS_DATA_1, RECEIVED_S: float) -> None:
+        super().process(PROTO_DATA, RECEIVED_S)
         # slogger.debug("AV_TO_GCS_DATA_1 packet received")
 
         # Supersonic alert
@@ -654,8 +547,8 @@ class AV_TO_GCS_DATA_2(Packet):
         self._GPS_latitude_old = 0
         self._GPS_longitude_old = 0
 
-    def process(self, PROTO_DATA: AV_TO_GCS_DATA_2_pb.AV_TO_GCS_DATA_2) -> None:
-        super().process(PROTO_DATA)
+    def process(self, PROTO_DATA: AV_TO_GCS_DATA_2_pb.AV_TO_GCS_DATA_2, RECEIVED_S: float) -> None:
+        super().process(PROTO_DATA, RECEIVED_S)
         # Output the GPS data as an ASCII QR code
         GPS_latitude = PROTO_DATA.GPS_latitude
         GPS_longitude = PROTO_DATA.GPS_longitude
@@ -704,8 +597,8 @@ class AV_TO_GCS_DATA_3(Packet):
     def __init__(self):
         super().__init__(0x05, None)
 
-    def process(self, PROTO_DATA: AV_TO_GCS_DATA_3_pb.AV_TO_GCS_DATA_3) -> None:
-        super().process(PROTO_DATA)
+    def process(self, PROTO_DATA: AV_TO_GCS_DATA_3_pb.AV_TO_GCS_DATA_3, RECEIVED_S: float) -> None:
+        super().process(PROTO_DATA, RECEIVED_S)
         # slogger.debug("AV_TO_GCS_DATA_3 packet received")
 
 # Used only for context. GCS won't ever need to read it's own packet
@@ -785,8 +678,8 @@ class GSEPacket(Packet):
             # Update historical value
             cls._last_gse_errors[error_flag_name] = error_flag_value
 
-    def process(self, PROTO_DATA):
-        super().process(PROTO_DATA)
+    def process(self, PROTO_DATA, RECEIVED_S: float):
+        super().process(PROTO_DATA, RECEIVED_S)
         GSEPacket._process_gse_state_flags(PROTO_DATA.state_flags)
         GSEPacket._process_gse_errors(PROTO_DATA.error_flags)
 
@@ -825,8 +718,8 @@ class GSE_TO_GCS_DATA_1(GSEPacket):
                 f"Thermocouple_{i+1} value: {round(thermocouple_values[0],1)} deg C")
             self._last_information_display_time = time.monotonic()
 
-    def process(self, PROTO_DATA: GSE_TO_GCS_DATA_1_pb.GSE_TO_GCS_DATA_1) -> None:
-        super().process(PROTO_DATA)
+    def process(self, PROTO_DATA: GSE_TO_GCS_DATA_1_pb.GSE_TO_GCS_DATA_1, RECEIVED_S: float) -> None:
+        super().process(PROTO_DATA, RECEIVED_S)
 
         # Regular infomation updates
         if time.monotonic() - self._last_information_display_time > GSEPacket._INFORMATION_TIMEOUT_S:
@@ -878,17 +771,57 @@ class GSE_TO_GCS_DATA_2(GSEPacket):
         self._last_information_display_time = time.monotonic()
 
     # TODO Maybe split into 2 timeouts if this information is not all important
-    def process(self, PROTO_DATA: GSE_TO_GCS_DATA_2_pb.GSE_TO_GCS_DATA_2) -> None:
-        super().process(PROTO_DATA)
+    def process(self, PROTO_DATA: GSE_TO_GCS_DATA_2_pb.GSE_TO_GCS_DATA_2, RECEIVED_S: float) -> None:
+        super().process(PROTO_DATA, RECEIVED_S)
         # Regular information updates
         if time.monotonic() - self._last_information_display_time > GSEPacket._INFORMATION_TIMEOUT_S:
             self._process_readings(PROTO_DATA)
         # slogger.debug("GSE_TO_GCS_DATA_2 packet received")
 
 
-def main(SOCKET_PATH, CREATE_LOGS):
+def decode_packet(PACKET_HANDLERS: Dict, CREATE_LOGS: bool, ITEM) -> None:
+    """Decode/analysis stage. Raw log, parse, alerts and CSV row
+
+    Args:
+        PACKET_HANDLERS (Dict): Packet ID to (handler, message type)
+        CREATE_LOGS (bool): Whether to write the raw frame to the flight log
+        ITEM (tuple): (packet ID, receive time from log_time_s(), payload)
+    """
+    packet_id, received_s, payload = ITEM
+    handler, message_type = PACKET_HANDLERS[packet_id]
+    if CREATE_LOGS:
+        Packet.log_raw(packet_id, payload, received_s)
+    try:
+        packet = message_type()
+        packet.ParseFromString(payload)
+        handler.process(packet, received_s)
+    except Exception as e:
+        slogger.error(
+            f"Error processing packet ID {packet_id}: {e}")
+        # slogger.error(traceback.format_exc())
+
+
+def report_pipeline_stats(RECEIVED: RateCounter, DECODER: Stage) -> None:
+    """Log throughput, queueing and latency of each viewer stage, then reset"""
+    if RECEIVED.count():
+        slogger.info(f"receive: {RECEIVED.count()} packets "
+                     f"({RECEIVED.rate():.0f}/s)")
+    RECEIVED.reset()
+    summary = DECODER.stats_summary()
+    if summary is not None:
+        slogger.info(summary)
+    Packet.report_log_stats()
+
+
+def main(SOCKET_PATH, CREATE_LOGS, PACKET_IDS=None):
     VIEWER_STARTUP_TIMESTAMP = datetime.datetime.now()
-    Packet.setup(VIEWER_STARTUP_TIMESTAMP, CREATE_LOGS)
+    LOGGING_CONFIG = config.load_config()['logging']
+    Packet.setup(VIEWER_STARTUP_TIMESTAMP, CREATE_LOGS,
+                 FlushPolicy.from_config(LOGGING_CONFIG),
+                 int(LOGGING_CONFIG.get('csv_queue_size', 4096)),
+                 LOGGING_CONFIG.getboolean('flight_log', True))
+    STATS_INTERVAL_S = float(LOGGING_CONFIG.get('viewer_stats_interval_s', 30))
+    DECODE_QUEUE_SIZE = int(LOGGING_CONFIG.get('viewer_decode_queue_size', 4096))
     context = zmq.Context()
     sub_socket = context.socket(zmq.SUB)
 
@@ -902,7 +835,10 @@ def main(SOCKET_PATH, CREATE_LOGS):
         slogger.error(f"Connection error: {e}")
         return
 
-    sub_socket.setsockopt_string(zmq.SUBSCRIBE, '')
+    # Packets this viewer doesn't handle are dropped by ZMQ, not here
+    subscribed = packet_subscription.subscribe(
+        sub_socket, PACKET_IDS or csv_layout.PACKET_NAMES)
+    slogger.info(f"Subscribed to packet IDs {subscribed}")
 
     # Keep "Listening for messages..." here or change the event starter callback
     slogger.info("Listening for messages...")
@@ -923,42 +859,51 @@ def main(SOCKET_PATH, CREATE_LOGS):
         7: (GSE_TO_GCS_DATA_2_handler, GSE_TO_GCS_DATA_2_pb.GSE_TO_GCS_DATA_2),
     }
 
-    while not service_helper.time_to_stop():
-        # Poll for incoming messages (timeout in ms)
-        if sub_socket.poll(500) == 0:
-            continue
-
-        message = sub_socket.recv()
-        if len(message) > 1:
-            # We've missed the ID publish message. Wait for next one
-            continue
-
-        packet_id = int.from_bytes(message, byteorder='big')
-        if sub_socket.poll(500) == 0:
-            continue
-
-        message = sub_socket.recv()
+    def decode(ITEM) -> None:
+        decode_packet(packet_handlers, CREATE_LOGS, ITEM)
 
-        if len(message) == 1:
-            # Something failed and we've got a new ID instead of the last message.
-            new_erronous_packet_id = int.from_bytes(
-                message, byteorder='big')
-            slogger.error(
-                f"Event viewer subscription did not find last message with ID: {packet_id}. Instead got new ID: {new_erronous_packet_id}")
-            continue
+    # The receive loop below only timestamps and hands frames on, so a burst
+    # at launch queues up here instead of in the ZMQ socket. Persistence is
+    # the log writer's own thread behind this one
+    decoder = Stage("decode", decode, DECODE_QUEUE_SIZE)
+    received = RateCounter()
+    next_stats_report = time.monotonic() + STATS_INTERVAL_S
 
-        if packet_id in packet_handlers:
-            handler, message_type = packet_handlers[packet_id]
+    try:
+        while not service_helper.time_to_stop():
+            if time.monotonic() >= next_stats_report:
+                report_pipeline_stats(received, decoder)
+                next_stats_report = time.monotonic() + STATS_INTERVAL_S
+            # Only wait on the socket once it's drained, a poll per message
+            # costs more than the recv during a burst
             try:
-                packet = message_type()
-                packet.ParseFromString(message)
-                handler.process(packet)
-            except Exception as e:
+                # ID and payload arrive together as one multipart message.
+                # Zero copy, the decode stage reads straight out of the frame
+                parts = sub_socket.recv_multipart(zmq.NOBLOCK, copy=False)
+            except zmq.Again:
+                # Poll for incoming messages (timeout in ms)
+                sub_socket.poll(500)
+                continue
+            received_s = Packet.log_time_s()
+
+            if len(parts) != 2 or len(parts[0]) != 1:
                 slogger.error(
-                    f"Error processing packet ID {packet_id}: {e}")
-                # slogger.error(traceback.format_exc())
-        else:
-            slogger.error(f"Unexpected packet ID: {packet_id}")
+                    f"Event viewer got a malformed message with {len(parts)} parts")
+                continue
+
+            packet_id = parts[0].bytes[0]
+            frame = parts[1]
+            if packet_id in packet_handlers:
+                received.add()
+                # Drops are counted in the decode stage stats
+                decoder.submit((packet_id, received_s, frame.buffer))
+            else:
+                slogger.error(f"Unexpected packet ID: {packet_id}")
+    finally:
+        # Finish what's been received, then don't lose buffered rows on the
+        # way out
+        decoder.close()
+        Packet.close_logs()
 
     slogger.info("Stopping viewer.")
     sub_socket.close()
@@ -978,6 +923,9 @@ if __name__ == "__main__":
         slogger.error(
             "Failed to find socket path in arguments for event viewer")
         create_logs = True
+    # Optional --packet-ids 6,7 to only follow some packet types
+    packet_ids = packet_subscription.packet_ids_from_args(
+        sys.argv, csv_layout.PACKET_NAMES)
 
-    main(SOCKET_PATH, create_logs)
+    main(SOCKET_PATH, create_logs, packet_ids)
     slogger.info("Event viewer stopped")
@@ -6,104 +6,502 @@ import backend.proto.generated.AV_TO_GCS_DATA_3_pb2 as AV_TO_GCS_DATA_3_pb
 import backend.proto.generated.AV_TO_GCS_DATA_2_pb2 as AV_TO_GCS_DATA_2_pb
 import backend.proto.generated.AV_TO_GCS_DATA_1_pb2 as AV_TO_GCS_DATA_1_pb
 import config.config as config
-from google.protobuf.json_format import MessageToDict
 import signal
 import asyncio
 import sys
 import backend.device_emulator as device_emulator
 import json
+import base64
+from google.protobuf import descriptor_pb2
 import websockets
 import zmq
 import zmq.asyncio
 import os
+import time
+from collections import deque
+from backend.includes_python.perf_stats import LatencyStats, RateCounter
+from backend.includes_python.proto_json import ProtoJsonEncoder, shortest_float
+from backend.includes_python.telemetry_store import DOWNSAMPLERS, TelemetryStore, summarise
+import backend.includes_python.packet_subscription as packet_subscription
+from typing import Dict, List, Optional, Set
+from urllib.parse import parse_qs, urlparse
 
 # Global flag for shutdown control
 shutdown_event = asyncio.Event()
 
+# Shared subscriber, created in amain
+broadcaster: Optional["TelemetryBroadcaster"] = None
+
+PACKET_HANDLERS = {
+    3: AV_TO_GCS_DATA_1_pb.AV_TO_GCS_DATA_1,
+    4: AV_TO_GCS_DATA_2_pb.AV_TO_GCS_DATA_2,
+    5: AV_TO_GCS_DATA_3_pb.AV_TO_GCS_DATA_3,
+    6: GSE_TO_GCS_DATA_1_pb.GSE_TO_GCS_DATA_1,
+    7: GSE_TO_GCS_DATA_2_pb.GSE_TO_GCS_DATA_2,
+}
+
+# Packets handled per wakeup before yielding to the websocket senders
+MAX_DRAIN_BATCH = 32
+
+# Upper limit on points returned by a history query
+MAX_HISTORY_POINTS = 5000
+
 # NOTE. if this starts getting big, consider just adding things from this into
 # the backend server output trhough protobuf anyway
 
 
-def append_data(data: dict, PACKET_ID: int) -> dict:
-    """Add data to the websocket structure that frontend uses
+def mach_number(data: AV_TO_GCS_DATA_1_pb.AV_TO_GCS_DATA_1) -> Optional[float]:
+    """Mach estimate for the frontend, from the same rounded values it sees
 
     Args:
-        data (dict): protobuf data as a dict
-        PACKET_ID (int): packet ID from the protobuf message
+        data (AV_TO_GCS_DATA_1): parsed AV packet
 
     Returns:
-        dict: updated output
+        Optional[float]: mach number, None if velocity or altitude is missing
     """
-    match PACKET_ID:
-        case 3:
-            data["mach_number"] = Mach.mach_from_alt_estimate(
-                VELOCITY_M=data["velocity"],
-                ALTITUDE_M=data["altitude"])
-    return data
+    if not (data.HasField("velocity") and data.HasField("altitude")):
+        return None
+    return Mach.mach_from_alt_estimate(
+        VELOCITY_M=shortest_float(data.velocity),
+        ALTITUDE_M=shortest_float(data.altitude))
 
 
-async def zmq_to_websocket(websocket, ZMQ_SUB_SOCKET):
-    context = zmq.asyncio.Context()
-    sub_socket = context.socket(zmq.SUB)
-    try:
-        sub_socket.connect(ZMQ_SUB_SOCKET)
-        sub_socket.setsockopt_string(zmq.SUBSCRIBE, "")
-
-        packet_handlers = {
-            3: AV_TO_GCS_DATA_1_pb.AV_TO_GCS_DATA_1,
-            4: AV_TO_GCS_DATA_2_pb.AV_TO_GCS_DATA_2,
-            5: AV_TO_GCS_DATA_3_pb.AV_TO_GCS_DATA_3,
-            6: GSE_TO_GCS_DATA_1_pb.GSE_TO_GCS_DATA_1,
-            7: GSE_TO_GCS_DATA_2_pb.GSE_TO_GCS_DATA_2,
+# Fields added to the websocket structure that frontend uses, per packet ID
+EXTRA_FIELDS = {
+    3: {"mach_number": mach_number},
+}
+
+JSON_ENCODERS = {
+    packet_id: ProtoJsonEncoder(message_class, EXTRA_FIELDS.get(packet_id))
+    for packet_id, message_class in PACKET_HANDLERS.items()
+}
+
+
+# Clients asking for this subprotocol get the packet ID byte followed by the
+# raw protobuf payload as a binary frame, instead of JSON text
+BINARY_SUBPROTOCOL = "gcs.protobuf.v1"
+
+
+def build_schema_message() -> str:
+    """One-time message for binary clients describing how to decode frames
+
+    Returns:
+        str: JSON text frame with the packet ID -> message type map and a
+            base64 FileDescriptorSet of every payload and its imports
+    """
+    descriptor_set = descriptor_pb2.FileDescriptorSet()
+    added = set()
+
+    def add_file(file_descriptor):
+        if file_descriptor.name in added:
+            return
+        # Imports first so the set can be loaded in order
+        for dependency in file_descriptor.dependencies:
+            add_file(dependency)
+        added.add(file_descriptor.name)
+        file_descriptor.CopyToProto(descriptor_set.file.add())
+
+    for message_class in PACKET_HANDLERS.values():
+        add_file(message_class.DESCRIPTOR.file)
+
+    return json.dumps({
+        "id": "schema",
+        "data": {
+            "subprotocol": BINARY_SUBPROTOCOL,
+            "packets": {str(packet_id): message_class.DESCRIPTOR.full_name
+                        for packet_id, message_class in PACKET_HANDLERS.items()},
+            "fileDescriptorSet": base64.b64encode(
+                descriptor_set.SerializeToString()).decode("ascii"),
         }
+    })
 
-        while not shutdown_event.is_set():
-            try:
-                events = await sub_socket.poll(timeout=100)
-                if events:
-                    packet_id = int.from_bytes(await sub_socket.recv(), 'big')
-                    message = await sub_socket.recv()
 
-                    if len(message) == 1:
-                        new_id = int.from_bytes(message, 'big')
-                        slogger.error(
-                            f"Message mismatch: {packet_id} vs {new_id}")
-                        continue
+SCHEMA_MESSAGE = build_schema_message()
+
+
+def parse_packet(PACKET_ID: int, PAYLOAD: bytes):
+    proto_object = PACKET_HANDLERS[PACKET_ID]()
+    proto_object.ParseFromString(PAYLOAD)
+    return proto_object
+
+
+def encode_json_frame(PACKET_ID: int, proto_object) -> str:
+    """Websocket JSON frame for a parsed packet"""
+    data = JSON_ENCODERS[PACKET_ID].encode(proto_object)
+    return f'{{"id": {PACKET_ID}, "data": {data}}}'
 
-                    if packet_id in packet_handlers:
-                        proto_object = packet_handlers[packet_id]()
-                        proto_object.ParseFromString(message)
-                        data = MessageToDict(proto_object)
-                        data = append_data(data, packet_id)
-                        output = {
-                            "id": packet_id,
-                            "data": data
-                        }
-                        try:
-                            await websocket.send(json.dumps(output))
-                        except websockets.ConnectionClosedOK:
-                            pass
-                    else:
-                        slogger.error(f"Unexpected packet ID: {packet_id}")
-                # Give event handler time to check shutdown event
-                await asyncio.sleep(0.01)
-            except websockets.ConnectionClosed:
-                if not shutdown_event.is_set():
-                    slogger.info(
-                        "WebSocket connection closed from manager trigger")
-                else:
-                    slogger.info(
-                        "WebSocket connection closed from ws client")
-                break
+
+class TelemetryFrame:
+    """One packet in the encodings the connected clients asked for.
+
+    text is the JSON frame and binary is the ID byte + protobuf payload frame.
+    Either is None until a client needs it, see build().
+    """
+    __slots__ = ("packet_id", "text", "binary", "received_s", "payload")
+
+    def __init__(self, PACKET_ID: int, TEXT: Optional[str],
+                 BINARY: Optional[bytes], RECEIVED_S: float,
+                 PAYLOAD: Optional[bytes] = None):
+        self.packet_id = PACKET_ID
+        self.text = TEXT
+        self.binary = BINARY
+        self.received_s = RECEIVED_S
+        self.payload = PAYLOAD
+
+    def build(self, BINARY: bool, proto_object=None) -> None:
+        """Fill in the encoding a client needs if it hasn't been made yet
+
+        Args:
+            BINARY (bool): Build the binary frame rather than the JSON one
+            proto_object (optional): Already parsed payload, saves a parse
+        """
+        if BINARY:
+            if self.binary is None:
+                # Payload is forwarded as is, the client decodes it
+                self.binary = bytes((self.packet_id,)) + self.payload
+        elif self.text is None:
+            if proto_object is None:
+                proto_object = parse_packet(self.packet_id, self.payload)
+            self.text = encode_json_frame(self.packet_id, proto_object)
+
+
+class ClientStream:
+    """Bounded frame queue for a single websocket client.
+
+    When the client falls behind, the oldest queued frame is dropped so the
+    newest telemetry always gets through and other clients are not stalled.
+
+    With MAX_FPS set, frames are coalesced instead of queued. Only the latest
+    frame of each packet ID is kept and they are released together at most
+    MAX_FPS times a second.
+
+    With BATCH_WINDOW_S set, JSON clients get everything released in one go
+    as a single array frame. Without coalescing, the window starts at the
+    first frame and collects whatever arrives until it closes.
+    """
+
+    def __init__(self, QUEUE_SIZE: int, BINARY: bool = False,
+                 MAX_FPS: float = 0, BATCH_WINDOW_S: float = 0):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.BINARY = BINARY
+        self.MAX_FPS = MAX_FPS
+        # Binary frames are already minimal, batching is a JSON thing
+        self.BATCH_WINDOW_S = 0 if BINARY else BATCH_WINDOW_S
+        self.dropped = 0
+        self.coalesced = 0
+        # Cached packets to send before anything live, see snapshot()
+        self.initial_frames: List[TelemetryFrame] = []
+        # Coalescing mode, latest frame per packet ID
+        self._latest: Dict[int, TelemetryFrame] = {}
+        self._latest_ready = asyncio.Event()
+        self._last_release = 0.0
+
+    def frame_data(self, frame: TelemetryFrame):
+        """The frame as this client wants it on the wire"""
+        return frame.binary if self.BINARY else frame.text
+
+    def wire_messages(self, frames: List[TelemetryFrame]) -> list:
+        """Websocket messages to send for frames released together"""
+        if self.BATCH_WINDOW_S > 0:
+            # Frames are already JSON, join them rather than re-encoding
+            return ["[" + ", ".join(frame.text for frame in frames) + "]"]
+        return [self.frame_data(frame) for frame in frames]
+
+    def offer(self, frame: TelemetryFrame) -> None:
+        """Queue a frame without blocking, dropping the oldest if full"""
+        if self.MAX_FPS > 0:
+            if self._latest.pop(frame.packet_id, None) is not None:
+                self.coalesced += 1
+            # Re-insert so frames go out in order of their latest update
+            self._latest[frame.packet_id] = frame
+            self._latest_ready.set()
+            return
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            if self.dropped % 100 == 1:
+                slogger.warning(
+                    f"Slow websocket client, dropped {self.dropped} stale frames so far")
+        self.queue.put_nowait(frame)
+
+    async def next_frames(self) -> List[TelemetryFrame]:
+        """Wait for the next frames this client should be sent"""
+        if self.MAX_FPS <= 0:
+            frames = [await self.queue.get()]
+            if self.BATCH_WINDOW_S > 0:
+                # Keep pulling from the queue so a busy window can't overflow it
+                deadline = time.monotonic() + self.BATCH_WINDOW_S
+                while (remaining := deadline - time.monotonic()) > 0:
+                    try:
+                        frames.append(await asyncio.wait_for(
+                            self.queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+            return frames
+
+        await self._latest_ready.wait()
+        # Hold until the frame window is over, anything newer replaces what
+        # is waiting. An idle client gets the first packet straight away
+        release_at = self._last_release + 1 / self.MAX_FPS
+        delay = release_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._last_release = time.monotonic()
+        frames = list(self._latest.values())
+        self._latest.clear()
+        self._latest_ready.clear()
+        return frames
+
+
+class TelemetryBroadcaster:
+    """Single ZMQ subscriber shared by every websocket client.
+
+    Each packet is parsed and serialised once, then fanned out to the
+    registered ClientStream objects.
+
+    The latest packet of every ID and the last HISTORY_SIZE packets are kept
+    so a client that connects late can be brought up to date straight away.
+    With STORE_ROWS set, the numeric fields of the last STORE_ROWS packets of
+    each ID are also kept for downsampled history queries.
+    """
+
+    def __init__(self, ZMQ_SUB_SOCKET: str, CLIENT_QUEUE_SIZE: int,
+                 STATS_INTERVAL_S: float = 10.0, MAX_FPS: float = 0,
+                 BATCH_WINDOW_S: float = 0, HISTORY_SIZE: int = 0,
+                 STORE_ROWS: int = 0, PACKET_IDS: Optional[List[int]] = None):
+        self._ZMQ_SUB_SOCKET = ZMQ_SUB_SOCKET
+        # Only these IDs are subscribed to, defaults to every handled ID
+        self._PACKET_IDS = PACKET_IDS or list(PACKET_HANDLERS)
+        self._CLIENT_QUEUE_SIZE = CLIENT_QUEUE_SIZE
+        self._MAX_FPS = MAX_FPS
+        self._BATCH_WINDOW_S = BATCH_WINDOW_S
+        self._STATS_INTERVAL_S = STATS_INTERVAL_S
+        self._clients: Set[ClientStream] = set()
+        self._last_values: Dict[int, TelemetryFrame] = {}
+        self._history: deque = deque(maxlen=HISTORY_SIZE)
+        # Column store for history queries, fed by the same subscription
+        self.store: Optional[TelemetryStore] = None
+        if STORE_ROWS > 0:
+            self.store = TelemetryStore(PACKET_HANDLERS, STORE_ROWS)
+        self.received = RateCounter()
+        self.sent = RateCounter()
+        # ZMQ receive to websocket send complete
+        self.latency = LatencyStats()
+
+    def register(self, BINARY: bool = False,
+                 MAX_FPS: Optional[float] = None,
+                 BATCH_WINDOW_S: Optional[float] = None) -> ClientStream:
+        """Add a client. MAX_FPS and BATCH_WINDOW_S override the config"""
+        if MAX_FPS is None:
+            MAX_FPS = self._MAX_FPS
+        if BATCH_WINDOW_S is None:
+            BATCH_WINDOW_S = self._BATCH_WINDOW_S
+        stream = ClientStream(
+            self._CLIENT_QUEUE_SIZE, BINARY, MAX_FPS, BATCH_WINDOW_S)
+        # Taken together with joining so nothing is missed or sent twice
+        stream.initial_frames = self.snapshot()
+        self._clients.add(stream)
+        slogger.debug(
+            f"Websocket client registered. {len(self._clients)} connected")
+        return stream
+
+    def unregister(self, stream: ClientStream) -> None:
+        self._clients.discard(stream)
+        slogger.debug(
+            f"Websocket client unregistered. {len(self._clients)} connected")
+
+    def publish(self, frame: TelemetryFrame) -> None:
+        for stream in self._clients:
+            stream.offer(frame)
+
+    def remember(self, frame: TelemetryFrame) -> None:
+        """Add a frame to the last value cache and recent history"""
+        self._last_values[frame.packet_id] = frame
+        if self._history.maxlen:
+            self._history.append(frame)
+
+    def snapshot(self) -> List[TelemetryFrame]:
+        """Cached frames in arrival order.
+
+        Latest value of packet IDs that have dropped out of the history,
+        followed by the history itself.
+        """
+        history = list(self._history)
+        in_history = set(map(id, history))
+        stale = sorted(
+            (frame for frame in self._last_values.values()
+             if id(frame) not in in_history),
+            key=lambda frame: frame.received_s)
+        return stale + history
+
+    def record_sent(self, frame: TelemetryFrame) -> None:
+        """Count a frame delivered to a client and its end-to-end latency"""
+        self.sent.add()
+        self.latency.add(time.monotonic() - frame.received_s)
+
+    def report_stats(self) -> None:
+        """Log throughput and latency since the last report, then reset"""
+        now = time.monotonic()
+        if self.received.count() or self.sent.count():
+            slogger.info(
+                f"Websocket relay: {self.received.rate(now):.0f} packets/s in, "
+                f"{self.sent.rate(now):.0f} frames/s out to "
+                f"{len(self._clients)} clients, latency {self.latency.summary_ms()}")
+        self.received.reset(now)
+        self.sent.reset(now)
+        self.latency.reset()
+
+    def _handle_packet(self, packet_id: int, message: bytes,
+                       RECEIVED_S: float) -> None:
+        if packet_id not in PACKET_HANDLERS:
+            slogger.error(f"Unexpected packet ID: {packet_id}")
+            return
+
+        frame = TelemetryFrame(packet_id, None, None, RECEIVED_S, message)
+        # Only build the encodings someone is going to receive. Cached frames
+        # get the rest built when a late joiner needs them
+        needs_json = any(not stream.BINARY for stream in self._clients)
+        if needs_json or self.store is not None:
+            proto_object = parse_packet(packet_id, message)
+            if self.store is not None:
+                self.store.append(packet_id, proto_object)
+            if needs_json:
+                frame.build(BINARY=False, proto_object=proto_object)
+        if any(stream.BINARY for stream in self._clients):
+            frame.build(BINARY=True)
+        self.remember(frame)
+        self.publish(frame)
+
+    async def _drain(self, sub_socket) -> None:
+        """Handle every packet already waiting on the socket"""
+        for _ in range(MAX_DRAIN_BATCH):
+            try:
+                parts = await sub_socket.recv_multipart(flags=zmq.NOBLOCK)
+            except zmq.Again:
+                return
+            received_s = time.monotonic()
+            if len(parts) != 2 or len(parts[0]) != 1:
+                slogger.error(
+                    f"Expected a packet ID and payload, got {len(parts)} parts")
+                continue
+            try:
+                self.received.add()
+                self._handle_packet(parts[0][0], parts[1], received_s)
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                slogger.error(f"Error fowarding data to websocket: {e}")
-                if shutdown_event.is_set():
-                    break
-    finally:
-        # Wait LINGER_TIME_MS before giving up on push request
-        LINGER_TIME_MS = 300
-        sub_socket.close(linger=LINGER_TIME_MS)
-        context.term()
+                slogger.error(f"Error decoding data for websockets: {e}")
+        # Still busy, let the websocket senders catch up before the next batch
+        await asyncio.sleep(0)
+
+    async def run(self) -> None:
+        context = zmq.asyncio.Context()
+        sub_socket = context.socket(zmq.SUB)
+        try:
+            sub_socket.connect(self._ZMQ_SUB_SOCKET)
+            packet_subscription.subscribe(sub_socket, self._PACKET_IDS)
+
+            next_report = time.monotonic() + self._STATS_INTERVAL_S
+            while not shutdown_event.is_set():
+                # Wake as soon as a packet arrives. The timeout only bounds
+                # how long a shutdown request or stats report waits
+                if await sub_socket.poll(timeout=100):
+                    await self._drain(sub_socket)
+                if time.monotonic() >= next_report:
+                    self.report_stats()
+                    next_report = time.monotonic() + self._STATS_INTERVAL_S
+        finally:
+            # Wait LINGER_TIME_MS before giving up on push request
+            LINGER_TIME_MS = 300
+            sub_socket.close(linger=LINGER_TIME_MS)
+            context.term()
+
+
+async def send_snapshot(websocket, stream: ClientStream):
+    """Send the cached packets a new client registered with"""
+    frames = []
+    for frame in stream.initial_frames:
+        try:
+            frame.build(stream.BINARY)
+            frames.append(frame)
+        except Exception as e:
+            slogger.error(f"Error decoding cached packet {frame.packet_id}: {e}")
+    stream.initial_frames = []
+    if not frames:
+        return
+    for message in stream.wire_messages(frames):
+        await websocket.send(message)
+    slogger.debug(f"Sent {len(frames)} cached packets to new websocket client")
+
+
+async def queue_to_websocket(websocket, stream: ClientStream):
+    """Forward frames from a client's queue to its websocket"""
+    try:
+        if stream.BINARY:
+            # Binary clients can't decode anything until they have the schema
+            await websocket.send(SCHEMA_MESSAGE)
+        await send_snapshot(websocket, stream)
+        while not shutdown_event.is_set():
+            frames = await stream.next_frames()
+            for message in stream.wire_messages(frames):
+                await websocket.send(message)
+            for frame in frames:
+                broadcaster.record_sent(frame)
+    except websockets.ConnectionClosed:
+        if shutdown_event.is_set():
+            slogger.info(
+                "WebSocket connection closed from manager trigger")
+        else:
+            slogger.info(
+                "WebSocket connection closed from ws client")
+    except Exception as e:
+        slogger.error(f"Error fowarding data to websocket: {e}")
+
+
+async def history_response(REQUEST) -> str:
+    """Answer a graph history query from the telemetry store
+
+    Request data: packetId, field (dotted json name e.g. "meta.rssi"),
+    optional start/end (meta.timestampS seconds), points (default 500) and
+    method ("lttb" or "m4"). requestId is echoed back if given.
+
+    Returns:
+        str: JSON text frame with id "history", times "t" and values "v",
+            or an "error" message
+    """
+    response = {}
+    try:
+        if not isinstance(REQUEST, dict):
+            raise ValueError("Missing request data")
+        if "requestId" in REQUEST:
+            response["requestId"] = REQUEST["requestId"]
+        if broadcaster is None or broadcaster.store is None:
+            raise ValueError("History store is disabled")
+        method = REQUEST.get("method", "lttb")
+        if method not in DOWNSAMPLERS:
+            raise ValueError(
+                f"Unknown method {method}. Expected one of {list(DOWNSAMPLERS)}")
+        start = REQUEST.get("start")
+        end = REQUEST.get("end")
+        points = min(max(int(REQUEST.get("points", 500)), 3),
+                     MAX_HISTORY_POINTS)
+        packet_id = int(REQUEST["packetId"])
+        field = str(REQUEST["field"])
+        # Copied here since the ring is appended to on this loop, then
+        # downsampled on a thread so a big query doesn't stall live frames
+        times, values = broadcaster.store.series(
+            packet_id, field,
+            START_S=None if start is None else float(start),
+            END_S=None if end is None else float(end))
+        response.update(await asyncio.to_thread(
+            summarise, packet_id, field, times, values, points, method))
+    except KeyError as e:
+        response["error"] = f"Unknown or missing {e}"
+    except (TypeError, ValueError) as e:
+        response["error"] = str(e)
+    if "error" in response:
+        slogger.warning(f"Bad history request: {response['error']}")
+    return json.dumps({"id": "history", "data": response})
 
 
 async def consumer(websocket):
@@ -132,6 +530,11 @@ async def consumer(websocket):
                     except json.JSONDecodeError as e:
                         slogger.error(f"Invalid JSON received: {e}")
                         continue
+                    if message_json.get("id") == "history":
+                        # Answered here, nothing goes to the server
+                        await websocket.send(
+                            await history_response(message_json.get("data")))
+                        continue
                     if message_json.get("id") not in EXPECTED_IDS:
                         slogger.error(
                             f"Invalid packet ID for TX: {message_json.get('id')}. Expected in {EXPECTED_IDS}")
@@ -212,17 +615,43 @@ def build_packet(WEBSOCKET_DATA: dict) -> device_emulator.GCStoGSEManualControl:
     return device_emulator.GCStoGSEManualControl(**states)
 
 
+def requested_option(websocket, NAME: str) -> Optional[float]:
+    """Number given in the connection URL, e.g. ws://host:1887/?max_fps=30
+
+    Returns:
+        Optional[float]: None when not given or invalid, never negative
+    """
+    try:
+        query = parse_qs(urlparse(websocket.request.path).query)
+    except AttributeError:
+        return None
+    if NAME not in query:
+        return None
+    try:
+        return max(float(query[NAME][0]), 0.0)
+    except ValueError:
+        slogger.warning(f"Ignoring invalid {NAME}: {query[NAME][0]}")
+        return None
+
+
 async def handler(websocket):
     # start both producer and consumer
+    batch_ms = requested_option(websocket, "batch_ms")
+    stream = broadcaster.register(
+        BINARY=websocket.subprotocol == BINARY_SUBPROTOCOL,
+        MAX_FPS=requested_option(websocket, "max_fps"),
+        BATCH_WINDOW_S=None if batch_ms is None else batch_ms / 1000)
     producer_task = asyncio.create_task(
-        zmq_to_websocket(websocket, IPC_ADDRESS))
+        queue_to_websocket(websocket, stream))
     consumer_task = asyncio.create_task(consumer(websocket))
+    pending = {producer_task, consumer_task}
 
     try:
-        # wait until one side throws an exception or shutdown is requested
+        # wait until one side finishes. The producer never finishes on its own
+        # so a closed socket is noticed through the consumer
         done, pending = await asyncio.wait(
             [producer_task, consumer_task],
-            return_when=asyncio.FIRST_EXCEPTION
+            return_when=asyncio.FIRST_COMPLETED
         )
 
         if shutdown_event.is_set():
@@ -230,18 +659,35 @@ async def handler(websocket):
     except Exception as e:
         slogger.error(f"Handler error: {e}")
     finally:
+        broadcaster.unregister(stream)
         for task in pending:
             task.cancel()
         await websocket.close()
 
 
+def select_subprotocol(connection, subprotocols) -> Optional[str]:
+    """Opt in to binary frames. Clients that don't ask keep getting JSON"""
+    if BINARY_SUBPROTOCOL in subprotocols:
+        return BINARY_SUBPROTOCOL
+    return None
+
+
 async def amain():
+    global broadcaster
+
     # Set up signal handlers
     loop = asyncio.get_running_loop()
     for sig in (signal.SIGINT, signal.SIGTERM):
         loop.add_signal_handler(sig, lambda: shutdown_event.set())
 
-    server = await websockets.serve(handler, WEBSOCKET_HOST, WEBSOCKET_PORT)
+    broadcaster = TelemetryBroadcaster(
+        IPC_ADDRESS, CLIENT_QUEUE_SIZE, STATS_INTERVAL_S, MAX_FPS,
+        BATCH_WINDOW_MS / 1000, HISTORY_SIZE, STORE_ROWS, PACKET_IDS)
+    broadcaster_task = asyncio.create_task(broadcaster.run())
+
+    server = await websockets.serve(
+        handler, WEBSOCKET_HOST, WEBSOCKET_PORT,
+        select_subprotocol=select_subprotocol)
     slogger.info(
         f"WebSocket server started at ws://{WEBSOCKET_HOST}:{WEBSOCKET_PORT}")
 
@@ -253,11 +699,18 @@ async def amain():
             await ws.close(code=1001, reason="Server shutdown")
         server.close()
         await server.wait_closed()
+        broadcaster_task.cancel()
+        try:
+            await broadcaster_task
+        except asyncio.CancelledError:
+            pass
         slogger.info("Server shutdown complete")
 
 
 def main():
-    global WEBSOCKET_HOST, WEBSOCKET_PORT, IPC_ADDRESS
+    global WEBSOCKET_HOST, WEBSOCKET_PORT, IPC_ADDRESS, CLIENT_QUEUE_SIZE, \
+        STATS_INTERVAL_S, MAX_FPS, BATCH_WINDOW_MS, HISTORY_SIZE, STORE_ROWS, \
+        PACKET_IDS
 
     WEBSOCKET_HOST = "0.0.0.0"
     WEBSOCKET_PORT = 1887
@@ -268,9 +721,23 @@ def main():
     else:
         slogger.error("Missing required --socket-path argument")
         sys.exit(1)
-
-    device_emulator.MockPacket.initialize_settings(
-        config.load_config()['emulation'])
+    # Optional --packet-ids 6,7 to only serve some packet types
+    PACKET_IDS = packet_subscription.packet_ids_from_args(
+        sys.argv, PACKET_HANDLERS)
+
+    CONFIG = config.load_config()
+    device_emulator.MockPacket.initialize_settings(CONFIG['emulation'])
+    # Frames buffered per websocket client before old ones are dropped
+    CLIENT_QUEUE_SIZE = int(CONFIG['frontend'].get('ws_client_queue_size', 64))
+    STATS_INTERVAL_S = float(CONFIG['frontend'].get('ws_stats_interval_s', 10))
+    # Per client frame rate limit, 0 sends every packet
+    MAX_FPS = float(CONFIG['frontend'].get('max_fps', 0))
+    # JSON array batching window, 0 sends one packet per frame
+    BATCH_WINDOW_MS = float(CONFIG['frontend'].get('ws_batch_window_ms', 0))
+    # Recent packets replayed to clients when they connect
+    HISTORY_SIZE = int(CONFIG['frontend'].get('ws_history_size', 0))
+    # Rows per packet ID kept for graph history queries
+    STORE_ROWS = int(CONFIG['frontend'].get('history_store_rows', 0))
 
     try:
         asyncio.run(amain())
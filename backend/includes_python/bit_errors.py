@@ -0,0 +1,146 @@
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Corrupts built payloads the way a noisy link would, by flipping bits in the
+# encoded bytes rather than in the values before encoding. Only the bytes that
+# go over the air should be corrupted, not what the receiving modem adds
+# around them (RSSI, SNR, the TEST_UART text framing), see corrupt_into().
+# Two error models stack:
+#   - independent flips, every bit has BIT_ERROR_RATE chance of flipping
+#   - bursts, a payload has BURST_RATE chance of a run of up to BURST_BITS
+#     bits where each bit is a coin toss, like a fade or a collision
+# Everything comes from one seeded generator, so a run with the same seed and
+# the same payloads corrupts the same bits.
+
+
+class BitErrorModel:
+    """Seedable bit error injection for payload bytes
+
+    Args:
+        BIT_ERROR_RATE (float): Chance each bit flips on its own [0, 1]
+        BURST_RATE (float): Chance each payload gets a burst [0, 1]
+        BURST_BITS (int): Longest burst in bits
+        SEED (int, optional): Generator seed, a random one is picked (and
+            kept in .seed) if not given
+
+    Raises:
+        ValueError: A rate is outside [0, 1] or BURST_BITS is below 1
+    """
+
+    def __init__(self, BIT_ERROR_RATE: float = 0.0, BURST_RATE: float = 0.0,
+                 BURST_BITS: int = 32, SEED: Optional[int] = None):
+        if not 0 <= BIT_ERROR_RATE <= 1 or not 0 <= BURST_RATE <= 1:
+            raise ValueError("Bit error and burst rates must be between 0 and 1")
+        if BURST_BITS < 1:
+            raise ValueError("Bursts must be at least 1 bit long")
+        self.BIT_ERROR_RATE = BIT_ERROR_RATE
+        self.BURST_RATE = BURST_RATE
+        self.BURST_BITS = BURST_BITS
+        self.seed = SEED if SEED is not None else \
+            int(np.random.SeedSequence().entropy % (1 << 32))
+        self._rng = np.random.default_rng(self.seed)
+        self.bits_flipped = 0
+        self.payloads_corrupted = 0
+
+    @classmethod
+    def from_config(cls, EMULATION_CONFIG) -> "BitErrorModel":
+        """Model from the corruption_* keys of the [emulation] section"""
+        seed = EMULATION_CONFIG.get("corruption_seed", "").strip()
+        return cls(
+            BIT_ERROR_RATE=float(EMULATION_CONFIG.get(
+                "corruption_bit_error_rate", 0)),
+            BURST_RATE=float(EMULATION_CONFIG.get("corruption_burst_rate", 0)),
+            BURST_BITS=int(EMULATION_CONFIG.get("corruption_burst_bits", 32)),
+            SEED=int(seed) if seed else None)
+
+    def _flip_positions(self, TOTAL_BITS: int,
+                        PAYLOAD_STARTS: np.ndarray,
+                        PAYLOAD_BITS: np.ndarray) -> np.ndarray:
+        """Bit positions to flip across payloads laid end to end"""
+        positions = []
+        if self.BIT_ERROR_RATE > 0:
+            count = self._rng.binomial(TOTAL_BITS, self.BIT_ERROR_RATE)
+            if count:
+                positions.append(self._rng.choice(
+                    TOTAL_BITS, size=count, replace=False))
+        if self.BURST_RATE > 0:
+            hit = np.flatnonzero(
+                (self._rng.random(len(PAYLOAD_BITS)) < self.BURST_RATE)
+                & (PAYLOAD_BITS > 0))
+            for i in hit.tolist():
+                length = int(self._rng.integers(
+                    1, min(self.BURST_BITS, PAYLOAD_BITS[i]) + 1))
+                start = PAYLOAD_STARTS[i] + int(self._rng.integers(
+                    0, PAYLOAD_BITS[i] - length + 1))
+                burst = np.flatnonzero(self._rng.random(length) < 0.5)
+                positions.append(start + burst)
+        if not positions:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(positions).astype(np.int64)
+
+    def corrupt(self, PAYLOAD) -> bytes:
+        """Payload with bit errors applied"""
+        return self.corrupt_many((PAYLOAD,))[0]
+
+    def corrupt_many(self, PAYLOADS: Sequence) -> List[bytes]:
+        """Apply bit errors to a batch of payloads in one pass
+
+        Args:
+            PAYLOADS (Sequence): bytes-like payloads
+
+        Returns:
+            List[bytes]: Corrupted copies, same order and lengths
+        """
+        lengths = np.fromiter((len(payload) for payload in PAYLOADS),
+                              dtype=np.int64, count=len(PAYLOADS))
+        data = np.frombuffer(b"".join(PAYLOADS), dtype=np.uint8).copy()
+        ends = np.cumsum(lengths)
+        starts = ends - lengths
+        positions = self._flip_positions(
+            len(data) * 8, starts * 8, lengths * 8)
+        if len(positions):
+            # Bursts can overlap the independent flips, so XOR in place
+            # rather than assigning a mask
+            np.bitwise_xor.at(data, positions >> 3,
+                              (1 << (positions & 7)).astype(np.uint8))
+            self.bits_flipped += len(positions)
+            self.payloads_corrupted += len(np.unique(
+                np.searchsorted(ends, positions >> 3, side="right")))
+        raw = data.tobytes()
+        return [raw[start:end] for start, end in
+                zip(starts.tolist(), ends.tolist())]
+
+    def corrupt_into(self, BUFFER, SPANS: Sequence[Tuple[int, int]]) -> int:
+        """Apply bit errors in place to the parts of a buffer holding one
+        payload
+
+        Args:
+            BUFFER: Writable buffer, bytearray or memoryview
+            SPANS (Sequence[Tuple[int, int]]): (start, end) byte ranges of
+                BUFFER that together make up the payload as sent, in order.
+                Bytes outside them are left alone
+
+        Returns:
+            int: Bits flipped
+        """
+        lengths = np.array([end - start for start, end in SPANS],
+                           dtype=np.int64)
+        total = int(lengths.sum())
+        positions = self._flip_positions(
+            total * 8, np.zeros(1, dtype=np.int64),
+            np.array([total * 8], dtype=np.int64))
+        if not len(positions):
+            return 0
+        # Positions count through the spans laid end to end, map them back
+        # onto the buffer
+        ends = np.cumsum(lengths)
+        offsets = np.array([start for start, _ in SPANS], dtype=np.int64) \
+            - (ends - lengths)
+        index = positions >> 3
+        index = index + offsets[np.searchsorted(ends, index, side="right")]
+        data = np.frombuffer(BUFFER, dtype=np.uint8)
+        np.bitwise_xor.at(data, index, (1 << (positions & 7)).astype(np.uint8))
+        self.bits_flipped += len(positions)
+        self.payloads_corrupted += 1
+        return len(positions)
@@ -0,0 +1,377 @@
+from typing import Dict, List, Tuple
+
+from google.protobuf.descriptor import Descriptor, FieldDescriptor
+
+import backend.proto.generated.AV_TO_GCS_DATA_1_pb2 as AV_TO_GCS_DATA_1_pb
+import backend.proto.generated.AV_TO_GCS_DATA_2_pb2 as AV_TO_GCS_DATA_2_pb
+import backend.proto.generated.AV_TO_GCS_DATA_3_pb2 as AV_TO_GCS_DATA_3_pb
+import backend.proto.generated.GSE_TO_GCS_DATA_1_pb2 as GSE_TO_GCS_DATA_1_pb
+import backend.proto.generated.GSE_TO_GCS_DATA_2_pb2 as GSE_TO_GCS_DATA_2_pb
+
+# The CSV layout the event viewer logs in, and how it maps onto the protobuf
+# messages the middleware publishes.
+#
+# Headers follow the proto leaf fields in field number order (nested messages
+# flattened in place), so header N is leaf field N. A few headers were named
+# before the protos were, e.g. "FlightState" is flightState and
+# "timestamp_s_server_side" is meta.timestamp_s.
+#
+# Rows are built by a RowPlan, a function generated once per message type
+# from the descriptor, the same way proto_json builds its encoders. Every
+# row has one value per header, unset fields are explicit empties.
+
+# NOTE: Base these off the proto files
+# Name each event viewer Packet subclass after these
+# TODO: After the proto files are finalised, update these
+CSV_FILES_WITH_HEADERS: Dict[str, List[str]] = {
+    "GCS_TO_AV_STATE_CMD": [
+        "not used"
+    ],
+    "GCS_TO_GSE_STATE_CMD": [
+        "not used"
+    ],
+    "AV_TO_GCS_DATA_1": [
+        "rssi",
+        "snr",
+        "timestamp_s_server_side",
+        "total_packet_count_av",
+        "total_packet_count_gse",
+        "FlightState",
+        "dual_board_connectivity_state_flag",
+        "recovery_checks_complete_and_flight_ready",
+        "GPS_fix_flag",
+        "payload_connection_flag",
+        "camera_controller_connection_flag",
+        "accel_low_x",
+        "accel_low_y",
+        "accel_low_z",
+        "accel_high_x",
+        "accel_high_y",
+        "accel_high_z",
+        "gyro_x",
+        "gyro_y",
+        "gyro_z",
+        "altitude",
+        "velocity",
+        "apogee_primary_test_complete",
+        "apogee_secondary_test_complete",
+        "apogee_primary_test_results",
+        "apogee_secondary_test_results",
+        "main_primary_test_complete",
+        "main_secondary_test_complete",
+        "main_primary_test_results",
+        "main_secondary_test_results",
+        "broadcast_flag"
+    ],
+    "AV_TO_GCS_DATA_2": [
+        "rssi",
+        "snr",
+        "timestamp_s_server_side",
+        "total_packet_count_av",
+        "total_packet_count_gse",
+        "FlightState",
+        "dual_board_connectivity_state_flag",
+        "recovery_checks_complete_and_flight_ready",
+        "GPS_fix_flag",
+        "payload_connection_flag",
+        "camera_controller_connection_flag",
+        "GPS_latitude",
+        "GPS_longitude",
+        "nav_status",
+        "qw",
+        "qx",
+        "qy",
+        "qz",
+    ],
+    "AV_TO_GCS_DATA_3": [
+        "rssi",
+        "snr",
+        "timestamp_s_server_side",
+        "total_packet_count_av",
+        "total_packet_count_gse",
+        "FlightState",
+        "dual_board_connectivity_state_flag",
+        "recovery_checks_complete_and_flight_ready",
+        "GPS_fix_flag",
+        "payload_connection_flag",
+        "camera_controller_connection_flag",
+        # ALL TBD
+    ],
+    "GSE_TO_GCS_DATA_1": [
+        "rssi",
+        "snr",
+        "timestamp_s_server_side",
+        "total_packet_count_av",
+        "total_packet_count_gse",
+        "manual_purge_activated",
+        "o2_fill_activated",
+        "selector_switch_neutral_position",
+        "n20_fill_activated",
+        "ignition_fired",
+        "ignition_selected",
+        "gas_fill_selected",
+        "system_activated",
+        "transducer_1",
+        "transducer_2",
+        "transducer_3",
+        "thermocouple_1",
+        "thermocouple_2",
+        "thermocouple_3",
+        "thermocouple_4",
+        "ignition_error",
+        "relay_3_error",
+        "relay_2_error",
+        "relay_1_error",
+        "thermocouple_4_error",
+        "thermocouple_3_error",
+        "thermocouple_2_error",
+        "thermocouple_1_error",
+        "load_cell_4_error",
+        "load_cell_3_error",
+        "load_cell_2_error",
+        "load_cell_1_error",
+        "transducer_4_error",
+        "transducer_3_error",
+        "transducer_2_error",
+        "transducer_1_error",
+    ],
+    "GSE_TO_GCS_DATA_2": [
+        "rssi",
+        "snr",
+        "timestamp_s_server_side",
+        "total_packet_count_av",
+        "total_packet_count_gse",
+        "manual_purge_activated",
+        "o2_fill_activated",
+        "selector_switch_neutral_position",
+        "n20_fill_activated",
+        "ignition_fired",
+        "ignition_selected",
+        "gas_fill_selected",
+        "system_activated",
+        "internal_temp",
+        "wind_speed",
+        "gas_bottle_weight_1",
+        "gas_bottle_weight_2",
+        "analog_voltage_input_1",
+        "analog_voltage_input_2",
+        "additional_current_input_1",
+        "additional_current_input_2",
+        "ignition_error",
+        "relay_3_error",
+        "relay_2_error",
+        "relay_1_error",
+        "thermocouple_4_error",
+        "thermocouple_3_error",
+        "thermocouple_2_error",
+        "thermocouple_1_error",
+        "load_cell_4_error",
+        "load_cell_3_error",
+        "load_cell_2_error",
+        "load_cell_1_error",
+        "transducer_4_error",
+        "transducer_3_error",
+        "transducer_2_error",
+        "transducer_1_error",
+    ],
+    # Unused
+    "GSE_TO_GCS_DATA_3": ["unused", "", "", "", ""],
+}
+
+# Middleware packet ID -> CSV file name / message class
+PACKET_NAMES: Dict[int, str] = {
+    3: "AV_TO_GCS_DATA_1",
+    4: "AV_TO_GCS_DATA_2",
+    5: "AV_TO_GCS_DATA_3",
+    6: "GSE_TO_GCS_DATA_1",
+    7: "GSE_TO_GCS_DATA_2",
+}
+PACKET_IDS: Dict[str, int] = {
+    name: packet_id for packet_id, name in PACKET_NAMES.items()}
+
+MESSAGE_CLASSES: Dict[str, type] = {
+    "AV_TO_GCS_DATA_1": AV_TO_GCS_DATA_1_pb.AV_TO_GCS_DATA_1,
+    "AV_TO_GCS_DATA_2": AV_TO_GCS_DATA_2_pb.AV_TO_GCS_DATA_2,
+    "AV_TO_GCS_DATA_3": AV_TO_GCS_DATA_3_pb.AV_TO_GCS_DATA_3,
+    "GSE_TO_GCS_DATA_1": GSE_TO_GCS_DATA_1_pb.GSE_TO_GCS_DATA_1,
+    "GSE_TO_GCS_DATA_2": GSE_TO_GCS_DATA_2_pb.GSE_TO_GCS_DATA_2,
+}
+
+
+def _leaf_fields(DESCRIPTOR: Descriptor,
+                 PREFIX: Tuple = ()) -> List[Tuple[Tuple[str, ...], FieldDescriptor]]:
+    """(attribute path, field) of every leaf in field number order"""
+    leaves = []
+    for field in sorted(DESCRIPTOR.fields, key=lambda f: f.number):
+        if field.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+            leaves.extend(_leaf_fields(field.message_type, PREFIX + (field.name,)))
+        else:
+            leaves.append((PREFIX + (field.name,), field))
+    return leaves
+
+
+_FIELD_MAPS: Dict[str, List[Tuple[str, Tuple[str, ...], FieldDescriptor]]] = {}
+
+
+def field_map(NAME: str) -> List[Tuple[str, Tuple[str, ...], FieldDescriptor]]:
+    """(header, attribute path, field) for each column of a packet's CSV
+
+    Raises:
+        KeyError: No message class for NAME
+        ValueError: The headers and proto fields have drifted apart
+    """
+    if NAME not in _FIELD_MAPS:
+        headers = CSV_FILES_WITH_HEADERS[NAME]
+        leaves = _leaf_fields(MESSAGE_CLASSES[NAME].DESCRIPTOR)
+        if len(headers) != len(leaves):
+            raise ValueError(
+                f"{NAME} has {len(headers)} CSV headers but {len(leaves)} proto fields")
+        _FIELD_MAPS[NAME] = [(header, path, field)
+                             for header, (path, field) in zip(headers, leaves)]
+    return _FIELD_MAPS[NAME]
+
+
+class RowPlan:
+    """Precompiled message -> CSV row extraction for one packet type
+
+    Args:
+        NAME (str): CSV file name of the message type
+
+    Attributes:
+        headers (List[str]): Column names, in row order
+        row (Callable): message -> list, "" for unset fields
+        row_with_defaults (Callable): message -> list, proto defaults for
+            unset fields
+    """
+
+    def __init__(self, NAME: str):
+        self.NAME = NAME
+        self.headers = CSV_FILES_WITH_HEADERS[NAME]
+        # Checks the headers against the descriptor
+        field_map(NAME)
+        descriptor = MESSAGE_CLASSES[NAME].DESCRIPTOR
+        namespace = {}
+        self.source = self._row_source(descriptor)
+        exec(self.source, namespace)
+        exec(self._defaults_source(descriptor), namespace)
+        self.row = namespace["row"]
+        self.row_with_defaults = namespace["row_with_defaults"]
+
+    def _row_source(self, DESCRIPTOR: Descriptor) -> str:
+        lines = ["def row(msg):", "    has_msg = msg.HasField"]
+        columns = self._emit_fields(DESCRIPTOR, "msg", lines, "    ", [0])
+        lines.append(f"    return [{', '.join(columns)}]")
+        return "\n".join(lines)
+
+    def _emit_fields(self, DESCRIPTOR: Descriptor, TARGET: str,
+                     LINES: List[str], INDENT: str, COUNTER: List[int]) -> List[str]:
+        """Assign one local per leaf column, returns their names in order
+
+        Expects has_<TARGET> to be TARGET's bound HasField, attribute lookups
+        are most of the cost here
+        """
+        columns = []
+        for field in sorted(DESCRIPTOR.fields, key=lambda f: f.number):
+            if field.is_repeated:
+                raise NotImplementedError(
+                    f"Repeated field {field.full_name} is not supported")
+            value = f"{TARGET}.{field.name}"
+            if field.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+                sub_target = f"m{COUNTER[0]}"
+                LINES.append(f"{INDENT}if has_{TARGET}({field.name!r}):")
+                LINES.append(f"{INDENT}    {sub_target} = {value}")
+                LINES.append(f"{INDENT}    has_{sub_target} = {sub_target}.HasField")
+                sub_columns = self._emit_fields(
+                    field.message_type, sub_target, LINES, INDENT + "    ",
+                    COUNTER)
+                if not sub_columns:
+                    LINES.append(f"{INDENT}    pass")
+                    continue
+                LINES.append(f"{INDENT}else:")
+                LINES.append(f"{INDENT}    {' = '.join(sub_columns)} = ''")
+                columns.extend(sub_columns)
+                continue
+            column = f"c{COUNTER[0]}"
+            COUNTER[0] += 1
+            if field.has_presence:
+                LINES.append(f"{INDENT}{column} = {value} "
+                             f"if has_{TARGET}({field.name!r}) else ''")
+            else:
+                LINES.append(f"{INDENT}{column} = {value}")
+            columns.append(column)
+        return columns
+
+    def _defaults_source(self, DESCRIPTOR: Descriptor) -> str:
+        values = [f"msg.{'.'.join(path)}"
+                  for path, _ in _leaf_fields(DESCRIPTOR)]
+        return f"def row_with_defaults(msg):\n    return [{', '.join(values)}]"
+
+
+_ROW_PLANS: Dict[str, RowPlan] = {}
+
+
+def row_plan(NAME: str) -> RowPlan:
+    """The cached RowPlan of a packet type
+
+    Raises:
+        KeyError: No message class for NAME
+    """
+    plan = _ROW_PLANS.get(NAME)
+    if plan is None:
+        plan = _ROW_PLANS[NAME] = RowPlan(NAME)
+    return plan
+
+
+def message_to_row(NAME: str, MESSAGE, DEFAULTS: bool = False) -> list:
+    """Values of a message in CSV header order
+
+    Args:
+        NAME (str): CSV file name of the message type
+        MESSAGE: Protobuf message
+        DEFAULTS (bool): Fill unset fields with the proto default instead of
+            leaving the column empty
+
+    Returns:
+        list: One value per header. Enums are their number
+    """
+    plan = row_plan(NAME)
+    if DEFAULTS:
+        return plan.row_with_defaults(MESSAGE)
+    return plan.row(MESSAGE)
+
+
+def _parse_value(FIELD: FieldDescriptor, VALUE: str):
+    if FIELD.cpp_type == FieldDescriptor.CPPTYPE_BOOL:
+        return VALUE.strip().lower() in ("true", "1")
+    if FIELD.cpp_type == FieldDescriptor.CPPTYPE_ENUM:
+        try:
+            return int(float(VALUE))
+        except ValueError:
+            return FIELD.enum_type.values_by_name[VALUE.strip()].number
+    if FIELD.cpp_type in (FieldDescriptor.CPPTYPE_FLOAT,
+                          FieldDescriptor.CPPTYPE_DOUBLE):
+        return float(VALUE)
+    if FIELD.cpp_type == FieldDescriptor.CPPTYPE_STRING:
+        return VALUE
+    return int(float(VALUE))
+
+
+def row_to_message(NAME: str, ROW: Dict[str, str]):
+    """Build a message from a CSV row read with csv.DictReader
+
+    Columns that are missing or empty are left unset, so rows written with
+    message_to_row() round trip.
+
+    Raises:
+        ValueError: A value can't be parsed as its field's type
+    """
+    message = MESSAGE_CLASSES[NAME]()
+    for header, path, field in field_map(NAME):
+        value = ROW.get(header)
+        if value is None or value == "":
+            continue
+        target = message
+        for attribute in path[:-1]:
+            target = getattr(target, attribute)
+        setattr(target, path[-1], _parse_value(field, value))
+    return message
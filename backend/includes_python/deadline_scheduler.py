@@ -0,0 +1,85 @@
+import time
+from typing import Callable, Optional
+
+from backend.includes_python.perf_stats import LatencyStats
+
+# Paces a stream of events against absolute monotonic deadlines. Sleeping
+# straight to a deadline overshoots by the OS timer slack, anywhere from tens
+# of microseconds to a few milliseconds on the Pi, and sleeping in relative
+# steps lets those errors add up over a long run. Instead sleep until just
+# short of the deadline then spin the rest of the way, always measuring
+# against the same start time.
+
+
+class DeadlineScheduler:
+    """Waits for deadlines measured from a fixed start time
+
+    Args:
+        SPIN_S (float): Final stretch before each deadline that's busy waited
+            instead of slept
+        MAX_SLEEP_S (float): Longest single sleep, bounds how long a stop
+            request waits to be noticed
+        SHOULD_STOP (Callable, optional): Checked between sleeps, waiting is
+            abandoned once it returns True
+        MAX_SAMPLES (int): Lateness samples kept for the percentiles
+    """
+
+    def __init__(self, SPIN_S: float = 0.002, MAX_SLEEP_S: float = 0.5,
+                 SHOULD_STOP: Optional[Callable[[], bool]] = None,
+                 MAX_SAMPLES: int = 1 << 16):
+        self._SPIN_S = SPIN_S
+        self._MAX_SLEEP_S = MAX_SLEEP_S
+        self._SHOULD_STOP = SHOULD_STOP
+        self._start = time.monotonic()
+        # How far past each deadline the wait actually returned
+        self.lateness = LatencyStats(MAX_SAMPLES)
+        self.deadlines = 0
+
+    def start(self, NOW: Optional[float] = None,
+              RESET_STATS: bool = True) -> None:
+        """Set the time deadlines are measured from
+
+        Args:
+            NOW (float, optional): Monotonic start time, defaults to now
+            RESET_STATS (bool): Clear the lateness stats, leave it off when
+                moving the start mid run
+        """
+        self._start = time.monotonic() if NOW is None else NOW
+        if RESET_STATS:
+            self.lateness.reset()
+            self.deadlines = 0
+
+    def elapsed(self) -> float:
+        """Seconds since the start"""
+        return time.monotonic() - self._start
+
+    def time_until(self, OFFSET_S: float) -> float:
+        """Seconds until OFFSET_S after the start, negative once passed"""
+        return self._start + OFFSET_S - time.monotonic()
+
+    def wait_until(self, OFFSET_S: float) -> bool:
+        """Block until OFFSET_S seconds after the start
+
+        Returns straight away if the deadline has already passed. Either way
+        the lateness is recorded.
+
+        Returns:
+            bool: False if SHOULD_STOP cut the wait short
+        """
+        deadline = self._start + OFFSET_S
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= self._SPIN_S:
+                break
+            if self._SHOULD_STOP is not None and self._SHOULD_STOP():
+                return False
+            time.sleep(min(remaining - self._SPIN_S, self._MAX_SLEEP_S))
+        while time.monotonic() < deadline:
+            pass
+        self.lateness.add(time.monotonic() - deadline)
+        self.deadlines += 1
+        return True
+
+    def summary(self) -> str:
+        """Lateness percentiles for the run so far"""
+        return f"{self.deadlines} deadlines, lateness {self.lateness.summary_ms()}"
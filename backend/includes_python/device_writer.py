@@ -0,0 +1,102 @@
+import errno
+import os
+import threading
+import time
+from typing import Optional
+
+import backend.includes_python.process_logging as slogger
+
+# Opening the socat PTY costs far more than writing a packet to it, so keep it
+# open between writes. When socat restarts the old descriptor starts failing
+# with EIO, at which point the device path is opened again and the write
+# retried once.
+#
+# The middleware doesn't frame what it reads, every read() is taken to be one
+# packet. Packets written back to back can arrive in the same read and all but
+# the first are lost, so each packet gets its own write() and writes are kept
+# at least MIN_GAP_S apart. Don't batch packets into one write until the
+# middleware splits reads into packets itself.
+
+# Errors that mean the other end of the device went away
+_RECONNECT_ERRORS = {errno.EIO, errno.ENXIO, errno.EBADF, errno.ENODEV,
+                     errno.ENOENT, errno.EPIPE}
+# Final stretch of a gap that's busy waited instead of slept
+_SPIN_S = 0.002
+
+
+class DeviceWriter:
+    """Writes payloads to a fake serial device through one open descriptor
+
+    Safe to share between threads, each payload goes out whole.
+
+    Args:
+        DEVICE_PATH (str): Device socat made, e.g. /dev/pts/4
+        MIN_GAP_S (float): Shortest time from the end of one write to the
+            start of the next, so the middleware reads each packet on its own
+    """
+
+    def __init__(self, DEVICE_PATH: str, MIN_GAP_S: float = 0.0):
+        self.DEVICE_PATH = DEVICE_PATH
+        self.MIN_GAP_S = MIN_GAP_S
+        self._fd: Optional[int] = None
+        self._lock = threading.Lock()
+        self._last_write = float("-inf")
+        self.reconnects = 0
+
+    def _open(self) -> int:
+        if self._fd is None:
+            self._fd = os.open(self.DEVICE_PATH,
+                               os.O_WRONLY | getattr(os, "O_NOCTTY", 0))
+        return self._fd
+
+    def _close(self) -> None:
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
+
+    def _write_all(self, PAYLOAD) -> None:
+        fd = self._open()
+        view = memoryview(PAYLOAD).cast("B")
+        # The PTY buffer can take part of a payload, finish the rest
+        while view:
+            view = view[os.write(fd, view):]
+
+    def write(self, PAYLOAD) -> None:
+        """Write one payload, waiting out MIN_GAP_S since the last one
+
+        Args:
+            PAYLOAD: bytes-like payload
+
+        Raises:
+            OSError: The device couldn't be written even after reopening it
+        """
+        with self._lock:
+            ready = self._last_write + self.MIN_GAP_S
+            # Gaps are a millisecond or so, sleeping would overshoot most of
+            # them by as much again, so only the bulk of a long wait is slept
+            wait = ready - time.monotonic() - _SPIN_S
+            if wait > 0:
+                time.sleep(wait)
+            while time.monotonic() < ready:
+                pass
+            try:
+                self._write_all(PAYLOAD)
+            except OSError as e:
+                if e.errno not in _RECONNECT_ERRORS:
+                    raise
+                # socat may have restarted, the device path gets a new PTY.
+                # Whatever reached the old one is gone, so send it again
+                slogger.warning(
+                    f"Lost {self.DEVICE_PATH} ({os.strerror(e.errno)}), reopening")
+                self._close()
+                self.reconnects += 1
+                self._write_all(PAYLOAD)
+            finally:
+                self._last_write = time.monotonic()
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
@@ -0,0 +1,310 @@
+import bisect
+import csv
+import heapq
+import os
+import struct
+import time
+from typing import Iterator, List, Optional, Tuple
+
+import backend.includes_python.csv_layout as csv_layout
+from backend.includes_python.log_writer import BufferedFile, FlushPolicy
+
+# Append-only binary flight log of the raw protobuf packets the middleware
+# publishes, with their receive times.
+#
+# Layout, all little endian:
+#   file header   magic "GCSFLOG\0", u16 version, 6 pad bytes,
+#                 f64 unix time the log was started
+#   records       u8 kind, u8 packet ID, f64 seconds since the log started,
+#                 u32 payload length, payload
+#   trailer       u64 offset of the last index record, magic "GCSFEND\0"
+#                 (only present when the log was closed cleanly)
+#
+# Frame records (kind "F") carry a serialised protobuf. Every INDEX_INTERVAL
+# frames an index record (kind "I", packet ID 0, time of the first frame it
+# covers) is written with payload u64 offset of the previous index record
+# (0 for none), u64 offset of the first frame it covers and u32 frame count.
+# Readers walk the index chain back from the trailer to seek without reading
+# every frame. A log cut short by a crash has no trailer and is scanned
+# instead, any partial record at the end is ignored.
+
+MAGIC = b"GCSFLOG\x00"
+END_MAGIC = b"GCSFEND\x00"
+VERSION = 1
+# What the event viewer names the log in each session folder. Replay looks
+# for the same name in mission folders
+SESSION_FILE_NAME = "flight_log.flog"
+
+_FILE_HEADER = struct.Struct("<8sH6xd")
+_RECORD_HEADER = struct.Struct("<BBdI")
+_INDEX_BODY = struct.Struct("<QQI")
+_TRAILER = struct.Struct("<Q8s")
+
+FRAME = ord("F")
+INDEX = ord("I")
+
+
+class FlightLogWriter(BufferedFile):
+    """Writes a flight log under the same flush/fsync policy as the CSV logs
+
+    Args:
+        PATH (str): File to create. An existing file is overwritten
+        POLICY (FlushPolicy): Flush and fsync policy
+        INDEX_INTERVAL (int): Frames between index records
+        START_UNIX_S (float, optional): Wall clock time frame times are
+            relative to. Defaults to now
+    """
+
+    def __init__(self, PATH: str, POLICY: FlushPolicy,
+                 INDEX_INTERVAL: int = 256,
+                 START_UNIX_S: Optional[float] = None):
+        super().__init__(PATH, POLICY, BINARY=True)
+        self.START_UNIX_S = time.time() if START_UNIX_S is None else START_UNIX_S
+        self._INDEX_INTERVAL = max(INDEX_INTERVAL, 1)
+        self._file.write(_FILE_HEADER.pack(MAGIC, VERSION, self.START_UNIX_S))
+        self._offset = _FILE_HEADER.size
+        self._last_index = 0
+        # First frame (offset, time) and count since the last index record
+        self._block_offset = 0
+        self._block_time_s = 0.0
+        self._block_frames = 0
+        self.flush(FSYNC=True)
+
+    def write_frame(self, PACKET_ID: int, TIME_S: float, PAYLOAD: bytes,
+                    NOW: Optional[float] = None) -> None:
+        """Append one packet
+
+        Args:
+            PACKET_ID (int): Middleware packet ID
+            TIME_S (float): Receive time, seconds since START_UNIX_S
+            PAYLOAD (bytes): Serialised protobuf
+        """
+        if self._block_frames == 0:
+            self._block_offset = self._offset
+            self._block_time_s = TIME_S
+        self._write_record(FRAME, PACKET_ID, TIME_S, PAYLOAD)
+        self._block_frames += 1
+        if self._block_frames >= self._INDEX_INTERVAL:
+            self._write_index()
+        self._record_written(NOW)
+
+    def _write_record(self, KIND: int, PACKET_ID: int, TIME_S: float,
+                      PAYLOAD: bytes) -> None:
+        self._file.write(_RECORD_HEADER.pack(
+            KIND, PACKET_ID, TIME_S, len(PAYLOAD)))
+        self._file.write(PAYLOAD)
+        self._offset += _RECORD_HEADER.size + len(PAYLOAD)
+
+    def _write_index(self) -> None:
+        offset = self._offset
+        self._write_record(INDEX, 0, self._block_time_s, _INDEX_BODY.pack(
+            self._last_index, self._block_offset, self._block_frames))
+        self._last_index = offset
+        self._block_frames = 0
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        if self._block_frames:
+            self._write_index()
+        self._file.write(_TRAILER.pack(self._last_index, END_MAGIC))
+        super().close()
+
+
+class FlightLogReader:
+    """Reads frames back out of a flight log
+
+    Args:
+        PATH (str): Flight log to open
+
+    Raises:
+        ValueError: Not a flight log, or a newer version than this reader
+    """
+
+    def __init__(self, PATH: str):
+        self.PATH = PATH
+        self._file = open(PATH, "rb")
+        header = self._file.read(_FILE_HEADER.size)
+        if len(header) < _FILE_HEADER.size:
+            raise ValueError(f"{PATH} is not a flight log")
+        magic, version, self.START_UNIX_S = _FILE_HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{PATH} is not a flight log")
+        if version > VERSION:
+            raise ValueError(
+                f"{PATH} is flight log version {version}, only {VERSION} is supported")
+        size = os.fstat(self._file.fileno()).st_size
+        # Records stop at the trailer, or the end of the file if there isn't one
+        self._last_index: Optional[int] = None
+        self._end = size
+        if size >= _FILE_HEADER.size + _TRAILER.size:
+            self._file.seek(size - _TRAILER.size)
+            last_index, magic = _TRAILER.unpack(self._file.read(_TRAILER.size))
+            if magic == END_MAGIC:
+                self._last_index = last_index
+                self._end = size - _TRAILER.size
+        self._index: Optional[List[Tuple[float, int]]] = None
+
+    def __enter__(self) -> "FlightLogReader":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def _records(self, OFFSET: int, HEADERS_ONLY: bool = False
+                 ) -> Iterator[Tuple[int, int, int, float, Optional[bytes]]]:
+        """(offset, kind, packet ID, time, payload) of each complete record"""
+        self._file.seek(OFFSET)
+        offset = OFFSET
+        while True:
+            if offset >= self._end:
+                return
+            header = self._file.read(_RECORD_HEADER.size)
+            if len(header) < _RECORD_HEADER.size or header[0] not in (FRAME, INDEX):
+                # End of the records or a partial write
+                return
+            kind, packet_id, time_s, length = _RECORD_HEADER.unpack(header)
+            end = offset + _RECORD_HEADER.size + length
+            if end > self._end:
+                return
+            if HEADERS_ONLY and kind == FRAME:
+                payload = None
+                self._file.seek(length, os.SEEK_CUR)
+            else:
+                payload = self._file.read(length)
+            yield offset, kind, packet_id, time_s, payload
+            offset = end
+
+    def index(self) -> List[Tuple[float, int]]:
+        """(time, offset) of the first frame of each index block, in file
+        order. Built from the index chain if the log was closed cleanly,
+        otherwise by scanning the record headers
+        """
+        if self._index is None:
+            self._index = self._index_from_trailer()
+            if self._index is None:
+                self._index = [
+                    (time_s, offset) for offset, kind, _, time_s, _
+                    in self._records(_FILE_HEADER.size, HEADERS_ONLY=True)
+                    if kind == FRAME]
+        return self._index
+
+    def _index_from_trailer(self) -> Optional[List[Tuple[float, int]]]:
+        if self._last_index is None:
+            return None
+        blocks = []
+        offset = self._last_index
+        while offset:
+            if offset + _RECORD_HEADER.size + _INDEX_BODY.size > self._end:
+                return None
+            self._file.seek(offset)
+            kind, _, time_s, length = _RECORD_HEADER.unpack(
+                self._file.read(_RECORD_HEADER.size))
+            if kind != INDEX or length != _INDEX_BODY.size:
+                return None
+            previous, first_frame, _ = _INDEX_BODY.unpack(
+                self._file.read(_INDEX_BODY.size))
+            blocks.append((time_s, first_frame))
+            offset = previous
+        blocks.reverse()
+        return blocks
+
+    def frames(self, START_S: Optional[float] = None
+               ) -> Iterator[Tuple[int, float, bytes]]:
+        """(packet ID, time, payload) of each frame in file order
+
+        Args:
+            START_S (float, optional): Skip frames received before this.
+                Assumes receive times only go forwards
+        """
+        offset = _FILE_HEADER.size
+        if START_S is not None:
+            index = self.index()
+            position = bisect.bisect_right(index, (START_S, float("inf"))) - 1
+            if position > 0:
+                offset = index[position][1]
+        for _, kind, packet_id, time_s, payload in self._records(offset):
+            if kind != FRAME:
+                continue
+            if START_S is not None and time_s < START_S:
+                continue
+            yield packet_id, time_s, payload
+
+
+def flight_log_to_csv(LOG_PATH: str, CSV_DIR: str) -> int:
+    """Write a flight log out in the event viewer's CSV layout
+
+    Creates one <name>.csv per entry in csv_layout.CSV_FILES_WITH_HEADERS in
+    CSV_DIR. Unknown packet IDs are skipped.
+
+    Returns:
+        int: Rows written
+    """
+    os.makedirs(CSV_DIR, exist_ok=True)
+    files = {}
+    writers = {}
+    rows = 0
+    try:
+        for name, headers in csv_layout.CSV_FILES_WITH_HEADERS.items():
+            files[name] = open(os.path.join(CSV_DIR, f"{name}.csv"), "w",
+                               newline="")
+            writers[name] = csv.writer(files[name])
+            writers[name].writerow(["timestamp_ms_log_time"] + headers)
+        with FlightLogReader(LOG_PATH) as reader:
+            for packet_id, time_s, payload in reader.frames():
+                name = csv_layout.PACKET_NAMES.get(packet_id)
+                if name is None:
+                    continue
+                message = csv_layout.MESSAGE_CLASSES[name].FromString(payload)
+                writers[name].writerow(
+                    [time_s * 1000] + csv_layout.message_to_row(name, message))
+                rows += 1
+    finally:
+        for f in files.values():
+            f.close()
+    return rows
+
+
+def _csv_frames(CSV_DIR: str, NAME: str) -> Iterator[Tuple[float, int, bytes]]:
+    path = os.path.join(CSV_DIR, f"{NAME}.csv")
+    if not os.path.exists(path):
+        return
+    packet_id = csv_layout.PACKET_IDS[NAME]
+    # Mission data is saved with a BOM
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            # Event viewer logs vs mission data
+            timestamp_ms = row.get("timestamp_ms_log_time", row.get("timestamp_ms"))
+            if not timestamp_ms:
+                continue
+            message = csv_layout.row_to_message(NAME, row)
+            yield float(timestamp_ms) / 1000, packet_id, message.SerializeToString()
+
+
+def csv_to_flight_log(CSV_DIR: str, LOG_PATH: str,
+                      INDEX_INTERVAL: int = 256) -> int:
+    """Pack a directory of CSVs into a flight log
+
+    Reads both event viewer logs (timestamp_ms_log_time) and replay mission
+    data (timestamp_ms). Rows of all packet types are merged in time order.
+
+    Returns:
+        int: Frames written
+    """
+    streams = [_csv_frames(CSV_DIR, name) for name in csv_layout.PACKET_IDS]
+    writer = FlightLogWriter(LOG_PATH, FlushPolicy(FLUSH_ROWS=1 << 16,
+                                                   FLUSH_INTERVAL_S=3600,
+                                                   FSYNC_INTERVAL_S=3600),
+                             INDEX_INTERVAL, START_UNIX_S=0.0)
+    frames = 0
+    try:
+        for time_s, packet_id, payload in heapq.merge(*streams,
+                                                      key=lambda f: f[0]):
+            writer.write_frame(packet_id, time_s, payload)
+            frames += 1
+    finally:
+        writer.close()
+    return frames
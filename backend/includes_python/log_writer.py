@@ -0,0 +1,231 @@
+import csv
+import os
+import time
+from typing import Dict, List, Optional
+
+import backend.includes_python.process_logging as slogger
+from backend.includes_python.pipeline import Stage
+
+# Buffered CSV logging for long running services.
+#
+# Each log keeps its file open for the whole session. Rows go into the file's
+# write buffer and are pushed to the OS every FLUSH_ROWS rows or
+# FLUSH_INTERVAL_S seconds, and fsync'd to the card at least every
+# FSYNC_INTERVAL_S seconds. poll() has to be called regularly (even when no
+# rows arrive) for the time based policies to hold.
+#
+# BackgroundLogWriter moves all of that onto its own thread behind a bounded
+# queue so a stalled SD card never blocks the caller.
+
+
+class FlushPolicy:
+    """When buffered rows are pushed to the OS and synced to disk
+
+    Args:
+        FLUSH_ROWS (int): Flush after this many buffered rows
+        FLUSH_INTERVAL_S (float): Flush rows older than this
+        FSYNC_INTERVAL_S (float): fsync rows older than this. This bounds what
+            a power cut can lose
+    """
+
+    def __init__(self, FLUSH_ROWS: int = 50, FLUSH_INTERVAL_S: float = 0.2,
+                 FSYNC_INTERVAL_S: float = 1.0):
+        self.FLUSH_ROWS = max(FLUSH_ROWS, 1)
+        self.FLUSH_INTERVAL_S = FLUSH_INTERVAL_S
+        self.FSYNC_INTERVAL_S = max(FSYNC_INTERVAL_S, FLUSH_INTERVAL_S)
+
+    @classmethod
+    def from_config(cls, LOGGING_CONFIG) -> "FlushPolicy":
+        """Build from the [logging] section of config.ini"""
+        return cls(
+            FLUSH_ROWS=int(LOGGING_CONFIG.get('csv_flush_rows', 50)),
+            FLUSH_INTERVAL_S=float(
+                LOGGING_CONFIG.get('csv_flush_interval_ms', 200)) / 1000,
+            FSYNC_INTERVAL_S=float(
+                LOGGING_CONFIG.get('csv_fsync_interval_ms', 1000)) / 1000)
+
+
+class BufferedFile:
+    """A file held open for buffered appends under a FlushPolicy
+
+    Subclasses write records to self._file then call _record_written().
+
+    Args:
+        PATH (str): File to create. An existing file is overwritten
+        POLICY (FlushPolicy): Flush and fsync policy
+        BINARY (bool): Open in binary mode instead of text
+    """
+
+    # Big enough that only the flush policy decides when we hit the card
+    _BUFFER_SIZE = 1 << 16
+
+    def __init__(self, PATH: str, POLICY: FlushPolicy, BINARY: bool = False):
+        self.PATH = PATH
+        self._POLICY = POLICY
+        if BINARY:
+            self._file = open(PATH, "wb", buffering=self._BUFFER_SIZE)
+        else:
+            self._file = open(PATH, "w", newline="",
+                              buffering=self._BUFFER_SIZE)
+        self._pending_rows = 0
+        # Times of the oldest row not yet flushed / not yet synced
+        self._unflushed_since: Optional[float] = None
+        self._unsynced_since: Optional[float] = None
+
+    def _record_written(self, NOW: Optional[float] = None) -> None:
+        now = time.monotonic() if NOW is None else NOW
+        self._pending_rows += 1
+        if self._unflushed_since is None:
+            self._unflushed_since = now
+        if self._unsynced_since is None:
+            self._unsynced_since = now
+        self.poll(now)
+
+    def poll(self, NOW: Optional[float] = None) -> None:
+        """Flush and/or fsync if the policy says it's time"""
+        if self._unsynced_since is None:
+            return
+        now = time.monotonic() if NOW is None else NOW
+        if now - self._unsynced_since >= self._POLICY.FSYNC_INTERVAL_S:
+            self.flush(FSYNC=True)
+        elif (self._pending_rows >= self._POLICY.FLUSH_ROWS or
+              (self._unflushed_since is not None and
+               now - self._unflushed_since >= self._POLICY.FLUSH_INTERVAL_S)):
+            self.flush()
+
+    def flush(self, FSYNC: bool = False) -> None:
+        if self._file.closed:
+            return
+        self._file.flush()
+        self._pending_rows = 0
+        self._unflushed_since = None
+        if FSYNC:
+            os.fsync(self._file.fileno())
+            self._unsynced_since = None
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self.flush(FSYNC=True)
+        self._file.close()
+
+
+class BufferedCsvFile(BufferedFile):
+    """One CSV file held open for buffered appends
+
+    Args:
+        PATH (str): File to create. An existing file is overwritten
+        HEADER (List[str]): First row of the file
+        POLICY (FlushPolicy): Flush and fsync policy
+    """
+
+    def __init__(self, PATH: str, HEADER: List[str], POLICY: FlushPolicy):
+        super().__init__(PATH, POLICY)
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(HEADER)
+        self.flush(FSYNC=True)
+
+    def write_row(self, ROW: list, NOW: Optional[float] = None) -> None:
+        self._writer.writerow(ROW)
+        self._record_written(NOW)
+
+
+class CsvLogSet:
+    """Named BufferedCsvFile objects sharing one folder and policy
+
+    Args:
+        FOLDER (str): Existing directory to create the files in
+        FILES_WITH_HEADERS (Dict[str, List[str]]): name -> header. Each file
+            is created as <name>.csv
+        POLICY (FlushPolicy): Flush and fsync policy
+        TIME_COLUMN (str, optional): Extra first header column
+    """
+
+    def __init__(self, FOLDER: str, FILES_WITH_HEADERS: Dict[str, List[str]],
+                 POLICY: FlushPolicy, TIME_COLUMN: Optional[str] = None):
+        prefix = [TIME_COLUMN] if TIME_COLUMN else []
+        self._files = {
+            name: BufferedCsvFile(
+                os.path.join(FOLDER, f"{name}.csv"), prefix + headers, POLICY)
+            for name, headers in FILES_WITH_HEADERS.items()
+        }
+
+    def __contains__(self, NAME: str) -> bool:
+        return NAME in self._files
+
+    def write_row(self, NAME: str, ROW: list) -> None:
+        self._files[NAME].write_row(ROW)
+
+    def poll(self) -> None:
+        now = time.monotonic()
+        for log_file in self._files.values():
+            log_file.poll(now)
+
+    def close(self) -> None:
+        for log_file in self._files.values():
+            log_file.close()
+
+
+class BackgroundLogWriter(Stage):
+    """Writes CSV rows and flight log frames from a dedicated thread
+
+    write_row() and write_frame() never block. If the queue is full the
+    record is dropped and counted instead. The thread also runs the files'
+    time based flush policy, so the caller doesn't need to poll.
+
+    Args:
+        LOGS (CsvLogSet, optional): CSV files to write rows to
+        FLIGHT_LOG (optional): FlightLogWriter to write raw frames to
+        QUEUE_SIZE (int): Records held before new ones are dropped
+        POLL_INTERVAL_S (float): How often the flush policy is checked when
+            idle. Should be no more than the policy's flush interval
+
+    Both logs are owned by the writer thread from now on, and closed by close()
+    """
+
+    def __init__(self, LOGS: Optional[CsvLogSet] = None, FLIGHT_LOG=None,
+                 QUEUE_SIZE: int = 4096, POLL_INTERVAL_S: float = 0.1):
+        self._logs = LOGS
+        self._flight_log = FLIGHT_LOG
+        self._sinks = [log for log in (LOGS, FLIGHT_LOG) if log is not None]
+        super().__init__("log writer", self._write, QUEUE_SIZE,
+                         POLL=self._poll, POLL_INTERVAL_S=POLL_INTERVAL_S,
+                         ON_STOP=self._close_sinks)
+
+    def __contains__(self, NAME: str) -> bool:
+        return self._logs is not None and NAME in self._logs
+
+    def write_row(self, NAME: str, ROW: list) -> bool:
+        """Queue a CSV row for writing
+
+        Returns:
+            bool: False if the queue was full and the row was dropped
+        """
+        return self.submit((self._logs.write_row, (NAME, ROW)))
+
+    def write_frame(self, PACKET_ID: int, TIME_S: float, PAYLOAD: bytes) -> bool:
+        """Queue a raw packet for the flight log
+
+        Returns:
+            bool: False if the queue was full and the frame was dropped
+        """
+        if self._flight_log is None:
+            return False
+        return self.submit(
+            (self._flight_log.write_frame, (PACKET_ID, TIME_S, PAYLOAD)))
+
+    @staticmethod
+    def _write(ITEM: tuple) -> None:
+        write, args = ITEM
+        write(*args)
+
+    def _poll(self) -> None:
+        for sink in self._sinks:
+            sink.poll()
+
+    def _close_sinks(self) -> None:
+        for sink in self._sinks:
+            try:
+                sink.close()
+            except Exception as e:
+                slogger.error(f"Failed to close log: {e}")
@@ -0,0 +1,133 @@
+import threading
+from typing import Iterable, List, Optional
+
+import zmq
+
+from backend.includes_python.perf_stats import RateCounter
+
+# The middleware publishes every packet as a multipart message with the 1 byte
+# packet ID as its first frame, which ZMQ matches subscription prefixes
+# against. Subscribing to just the IDs a consumer handles has libzmq throw the
+# rest away before they reach Python.
+
+
+def topic(PACKET_ID: int) -> bytes:
+    """Subscription prefix for one packet ID"""
+    return bytes([PACKET_ID])
+
+
+def subscribe(SOCKET: zmq.Socket, PACKET_IDS: Iterable[int]) -> List[int]:
+    """Subscribe a SUB socket to each of the given packet IDs
+
+    Raises:
+        ValueError: No IDs given. An empty subscription list receives nothing,
+            use an empty topic explicitly if everything is wanted
+
+    Returns:
+        List[int]: The IDs subscribed to, sorted
+    """
+    packet_ids = sorted(set(PACKET_IDS))
+    if not packet_ids:
+        raise ValueError("No packet IDs to subscribe to")
+    for packet_id in packet_ids:
+        SOCKET.setsockopt(zmq.SUBSCRIBE, topic(packet_id))
+    return packet_ids
+
+
+def packet_ids_from_args(ARGV: List[str], HANDLED: Iterable[int]
+                         ) -> List[int]:
+    """Packet IDs to subscribe to from an optional --packet-ids 6,7 argument
+
+    Args:
+        ARGV (List[str]): Command line arguments
+        HANDLED (Iterable[int]): IDs the consumer can handle, used when the
+            argument isn't given
+
+    Raises:
+        ValueError: The argument is malformed or names an ID the consumer
+            doesn't handle
+    """
+    handled = sorted(set(HANDLED))
+    if '--packet-ids' not in ARGV:
+        return handled
+    position = ARGV.index('--packet-ids') + 1
+    if position >= len(ARGV):
+        raise ValueError("--packet-ids needs a comma separated list of IDs")
+    selection = ARGV[position]
+    try:
+        packet_ids = sorted({int(part) for part in selection.split(',')})
+    except ValueError:
+        raise ValueError(f"Invalid --packet-ids list: {selection}")
+    unknown = [packet_id for packet_id in packet_ids if packet_id not in handled]
+    if unknown:
+        raise ValueError(
+            f"Packet IDs {unknown} are not handled, expected some of {handled}")
+    return packet_ids
+
+
+class DeliveredCounter:
+    """Counts the packets the middleware publishes, from a background thread
+
+    What a source writes to the fake device isn't what comes out the other
+    end when reads merge or packets fail to parse, so rate tests should
+    report this next to their write rate.
+
+    Args:
+        ADDRESS (str): Middleware PUB address, e.g. ipc:///tmp/gcs_rocket_pub.sock
+        CONTEXT (zmq.Context, optional): Context to make the socket in,
+            defaults to the shared instance
+    """
+
+    _POLL_MS = 100
+
+    def __init__(self, ADDRESS: str, CONTEXT: Optional[zmq.Context] = None):
+        self.ADDRESS = ADDRESS
+        self._context = CONTEXT or zmq.Context.instance()
+        self._counter = RateCounter()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="delivered-counter", daemon=True)
+
+    def start(self) -> "DeliveredCounter":
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        socket = self._context.socket(zmq.SUB)
+        socket.setsockopt(zmq.SUBSCRIBE, b"")
+        socket.connect(self.ADDRESS)
+        try:
+            while not self._stopping.is_set():
+                if not socket.poll(self._POLL_MS):
+                    continue
+                received = 0
+                while True:
+                    try:
+                        socket.recv_multipart(zmq.NOBLOCK)
+                    except zmq.Again:
+                        break
+                    received += 1
+                with self._lock:
+                    self._counter.add(received)
+        finally:
+            socket.close(0)
+
+    @property
+    def total(self) -> int:
+        with self._lock:
+            return self._counter.total
+
+    def rate(self) -> float:
+        """Packets per second published since the last reset"""
+        with self._lock:
+            return self._counter.rate()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counter.reset()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread.is_alive():
+            self._thread.join()
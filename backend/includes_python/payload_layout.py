@@ -0,0 +1,229 @@
+import struct
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+# Precompiled struct layouts for emulator payloads.
+#
+# Building a payload through Metric costs one call per field, each with its own
+# range check, to_bytes() and list append, and the fragments are then joined
+# into a bytearray. The layouts never change, so each packet type describes its
+# fields once, they're compiled into one struct.Struct per byte order run and a
+# generated function packs the whole payload with pack_into(). Most packets
+# are a single big endian run, AV_TO_GCS_DATA_2 has a little endian tail.
+#
+# Flag bytes are bitfields given most significant bit first, like the Metric
+# encoders build them:
+#   - "NAME" is a 1 bit flag
+#   - ("NAME", 3) is a 3 bit number
+#   - (0b1010, 4) is a fixed filler value
+# No range checks happen here, struct still refuses values that don't fit
+# their type. Metric is the reference encoder, see MockPacket for the debug
+# mode that runs both.
+
+# Width of a bitfield part, name or fixed value
+BitPart = Union[str, Tuple[Union[str, int], int]]
+
+
+class Field:
+    """One struct item of a payload layout
+
+    FORMAT is the struct code, ENDIAN the byte order it needs ('>' or '<'),
+    None for single bytes and strings that read the same either way
+    """
+    FORMAT = ""
+    ENDIAN: Optional[str] = None
+
+    def expression(self) -> Optional[str]:
+        """Python expression for the packed value, reading the values mapping
+        as V. None for pad bytes"""
+        raise NotImplementedError
+
+
+class Const(Field):
+    """Fixed unsigned byte, e.g. the packet ID"""
+    FORMAT = "B"
+
+    def __init__(self, VALUE: int):
+        if not 0 <= VALUE <= 0xFF:
+            raise ValueError(f"Constant byte out of range: {VALUE}")
+        self.VALUE = VALUE
+
+    def expression(self) -> str:
+        return repr(self.VALUE)
+
+
+class Padding(Field):
+    """Zero bytes, dummy and TBC bytes"""
+
+    def __init__(self, COUNT: int = 1):
+        self.FORMAT = f"{COUNT}x"
+
+    def expression(self) -> None:
+        return None
+
+
+class _Value(Field):
+    def __init__(self, NAME: str):
+        self.NAME = NAME
+
+    def expression(self) -> str:
+        return f"V[{self.NAME!r}]"
+
+
+class Int16(_Value):
+    FORMAT = "h"
+    ENDIAN = ">"
+
+
+class UInt16(_Value):
+    FORMAT = "H"
+    ENDIAN = ">"
+
+
+class Float32(_Value):
+    """32 bit float, big endian unless LITTLE_ENDIAN"""
+    FORMAT = "f"
+
+    def __init__(self, NAME: str, LITTLE_ENDIAN: bool = False):
+        super().__init__(NAME)
+        self.ENDIAN = "<" if LITTLE_ENDIAN else ">"
+
+
+class Text(_Value):
+    """Fixed length UTF-8 string"""
+
+    def __init__(self, NAME: str, LENGTH: int):
+        super().__init__(NAME)
+        self.FORMAT = f"{LENGTH}s"
+
+    def expression(self) -> str:
+        return f"V[{self.NAME!r}].encode('utf-8')"
+
+
+class Switch(_Value):
+    """Byte that is ON_VALUE when the flag is set, 0 otherwise"""
+    FORMAT = "B"
+
+    def __init__(self, NAME: str, ON_VALUE: int):
+        super().__init__(NAME)
+        self.ON_VALUE = ON_VALUE
+
+    def expression(self) -> str:
+        return f"({self.ON_VALUE} if V[{self.NAME!r}] else 0)"
+
+
+class Flags(Field):
+    """Bitfield of 8 or 16 bits, most significant bit first
+
+    Args:
+        *BITS: "NAME", ("NAME", width) or (fixed value, width)
+        INVERTED (bool): Pack the complement, for the inverted command bytes
+    """
+
+    def __init__(self, *BITS: BitPart, INVERTED: bool = False):
+        parts = [(part, 1) if isinstance(part, str) else part
+                 for part in BITS]
+        width = sum(bits for _, bits in parts)
+        if width not in (8, 16):
+            raise ValueError(f"Flags must fill 8 or 16 bits, got {width}")
+        self.FORMAT = "B" if width == 8 else "H"
+        self.ENDIAN = None if width == 8 else ">"
+        self.INVERTED = INVERTED
+        self._width = width
+        self._parts = parts
+
+    def expression(self) -> str:
+        terms = []
+        fixed = 0
+        shift = self._width
+        for source, bits in self._parts:
+            shift -= bits
+            mask = (1 << bits) - 1
+            if isinstance(source, str):
+                term = f"(V[{source!r}] & {mask})"
+                terms.append(f"{term} << {shift}" if shift else term)
+            else:
+                fixed |= (source & mask) << shift
+        if fixed:
+            terms.append(str(fixed))
+        expression = " | ".join(terms) if terms else "0"
+        if self.INVERTED:
+            expression = f"({expression}) ^ {(1 << self._width) - 1}"
+        return f"({expression})"
+
+
+class PayloadLayout:
+    """A payload compiled to struct runs and one generated pack function
+
+    Args:
+        FIELDS (Sequence[Field]): Payload items in wire order
+
+    Attributes:
+        size (int): Payload length in bytes
+        structs (List[struct.Struct]): One per byte order run
+    """
+
+    def __init__(self, FIELDS: Sequence[Field]):
+        self.FIELDS = list(FIELDS)
+        self.structs: List[struct.Struct] = []
+        self._namespace = {}
+        self.source = self._compile()
+        self._pack_into: Callable = self._namespace["pack_into"]
+        self.size = sum(item.size for item in self.structs)
+
+    def _runs(self) -> List[Tuple[str, List[Field]]]:
+        """Group fields into runs that share a byte order"""
+        runs: List[Tuple[str, List[Field]]] = []
+        for field in self.FIELDS:
+            if runs and field.ENDIAN in (None, runs[-1][0]):
+                runs[-1][1].append(field)
+            elif runs and runs[-1][0] is None:
+                # Leading single bytes take the order of what follows
+                runs[-1] = (field.ENDIAN, runs[-1][1] + [field])
+            else:
+                runs.append((field.ENDIAN, [field]))
+        return [(endian or ">", fields) for endian, fields in runs]
+
+    def _compile(self) -> str:
+        lines = ["def pack_into(BUFFER, OFFSET, V):"]
+        offset = 0
+        for index, (endian, fields) in enumerate(self._runs()):
+            run = struct.Struct(
+                endian + "".join(field.FORMAT for field in fields))
+            self.structs.append(run)
+            name = f"_pack_{index}"
+            self._namespace[name] = run.pack_into
+            arguments = [expression for expression in
+                         (field.expression() for field in fields)
+                         if expression is not None]
+            lines.append(f"    {name}(BUFFER, OFFSET + {offset},")
+            lines.extend(f"        {argument}," for argument in arguments)
+            lines.append("    )")
+            offset += run.size
+        if len(lines) == 1:
+            lines.append("    pass")
+        source = "\n".join(lines)
+        exec(source, self._namespace)
+        return source
+
+    def pack_into(self, BUFFER, OFFSET: int, VALUES) -> int:
+        """Pack a whole payload into BUFFER
+
+        Args:
+            BUFFER: Writable buffer, bytearray or memoryview
+            OFFSET (int): Where the payload starts in BUFFER
+            VALUES (Mapping): Field name -> value
+
+        Raises:
+            struct.error: A value doesn't fit its type, or BUFFER is too small
+
+        Returns:
+            int: Bytes written
+        """
+        self._pack_into(BUFFER, OFFSET, VALUES)
+        return self.size
+
+    def pack(self, VALUES) -> bytearray:
+        """Pack a whole payload into a new bytearray"""
+        output = bytearray(self.size)
+        self._pack_into(output, 0, VALUES)
+        return output
@@ -0,0 +1,82 @@
+import time
+from collections import deque
+from typing import Optional
+
+# Lightweight counters for services that want to report throughput and
+# latency through the process logger. Nothing here is thread safe, keep one
+# instance per thread/task or guard it yourself.
+
+
+class RateCounter:
+    """Counts events and reports the average rate since the last reset"""
+
+    def __init__(self):
+        self.total = 0
+        self._count = 0
+        self._window_start = time.monotonic()
+
+    def add(self, COUNT: int = 1) -> None:
+        self._count += COUNT
+        self.total += COUNT
+
+    def rate(self, NOW: Optional[float] = None) -> float:
+        """Events per second since the last reset"""
+        now = time.monotonic() if NOW is None else NOW
+        elapsed = now - self._window_start
+        if elapsed <= 0:
+            return 0.0
+        return self._count / elapsed
+
+    def count(self) -> int:
+        """Events since the last reset"""
+        return self._count
+
+    def reset(self, NOW: Optional[float] = None) -> None:
+        self._count = 0
+        self._window_start = time.monotonic() if NOW is None else NOW
+
+
+class LatencyStats:
+    """Keeps the most recent latency samples and reports percentiles.
+
+    Args:
+        MAX_SAMPLES (int): Samples kept for the percentile calculation.
+            Older samples are discarded first
+    """
+
+    def __init__(self, MAX_SAMPLES: int = 4096):
+        self._samples = deque(maxlen=MAX_SAMPLES)
+        self.max_s = 0.0
+
+    def add(self, LATENCY_S: float) -> None:
+        self._samples.append(LATENCY_S)
+        if LATENCY_S > self.max_s:
+            self.max_s = LATENCY_S
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, PERCENT: float) -> float:
+        """Nearest rank percentile of the stored samples
+
+        Args:
+            PERCENT (float): 0 - 100
+
+        Returns:
+            float: Latency in seconds, 0.0 if there are no samples
+        """
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        index = round(PERCENT / 100 * (len(ordered) - 1))
+        return ordered[min(max(index, 0), len(ordered) - 1)]
+
+    def summary_ms(self) -> str:
+        """p50/p99/max summary string in milliseconds"""
+        return (f"p50 {self.percentile(50) * 1e3:.2f} ms, "
+                f"p99 {self.percentile(99) * 1e3:.2f} ms, "
+                f"max {self.max_s * 1e3:.2f} ms")
+
+    def reset(self) -> None:
+        self._samples.clear()
+        self.max_s = 0.0
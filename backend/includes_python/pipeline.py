@@ -0,0 +1,139 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional
+
+import backend.includes_python.process_logging as slogger
+from backend.includes_python.perf_stats import LatencyStats, RateCounter
+
+# Worker threads joined by bounded queues, for splitting a service loop into
+# stages that can't hold each other up.
+#
+# Items are passed by reference, so a zmq.Frame buffer or bytes object handed
+# to submit() reaches the handler without being copied. Threads rather than
+# processes for exactly that reason: the heavy lifting (socket I/O, protobuf
+# parsing, disk writes) happens in C with the GIL released.
+
+
+class Stage:
+    """One worker thread fed by a bounded queue
+
+    submit() never blocks. If the queue is full the item is dropped and
+    counted instead.
+
+    Args:
+        NAME (str): Used in the stats summary and thread name
+        HANDLER (Callable): Called with each item on the worker thread.
+            Exceptions are logged and the stage keeps going
+        QUEUE_SIZE (int): Items held before new ones are dropped
+        POLL (Callable, optional): Called after every item, and at least every
+            POLL_INTERVAL_S while idle
+        POLL_INTERVAL_S (float): See POLL
+        ON_STOP (Callable, optional): Called on the worker thread once the
+            queue has been drained by close()
+    """
+
+    _STOP = object()
+
+    def __init__(self, NAME: str, HANDLER: Callable[[Any], None],
+                 QUEUE_SIZE: int = 4096, POLL: Optional[Callable] = None,
+                 POLL_INTERVAL_S: float = 0.1,
+                 ON_STOP: Optional[Callable] = None):
+        self.NAME = NAME
+        self._HANDLER = HANDLER
+        self._POLL = POLL
+        self._POLL_INTERVAL_S = POLL_INTERVAL_S if POLL else None
+        self._ON_STOP = ON_STOP
+        self._QUEUE_SIZE = QUEUE_SIZE
+        self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+        # Stats are written by both threads, guarded by _stats_lock
+        self._stats_lock = threading.Lock()
+        self._processed = RateCounter()
+        # Submit to finished, so queueing time is included
+        self._latency = LatencyStats()
+        self._dropped = 0
+        self._max_depth = 0
+        self.dropped_total = 0
+        self._thread = threading.Thread(
+            target=self._run, name=NAME, daemon=True)
+        self._thread.start()
+
+    def submit(self, ITEM) -> bool:
+        """Queue an item for the worker
+
+        Returns:
+            bool: False if the queue was full and the item was dropped
+        """
+        try:
+            self._queue.put_nowait((time.perf_counter(), ITEM))
+        except queue.Full:
+            with self._stats_lock:
+                self._dropped += 1
+                self.dropped_total += 1
+            return False
+        depth = self._queue.qsize()
+        if depth > self._max_depth:
+            with self._stats_lock:
+                self._max_depth = max(self._max_depth, depth)
+        return True
+
+    def _run(self) -> None:
+        while True:
+            try:
+                entry = self._queue.get(timeout=self._POLL_INTERVAL_S)
+            except queue.Empty:
+                entry = None
+            if entry is self._STOP:
+                break
+            try:
+                if entry is not None:
+                    self._HANDLER(entry[1])
+                if self._POLL is not None:
+                    self._POLL()
+            except Exception as e:
+                slogger.error(f"{self.NAME} failed: {e}")
+            if entry is not None:
+                latency = time.perf_counter() - entry[0]
+                with self._stats_lock:
+                    self._latency.add(latency)
+                    self._processed.add()
+        if self._ON_STOP is not None:
+            try:
+                self._ON_STOP()
+            except Exception as e:
+                slogger.error(f"{self.NAME} failed to stop cleanly: {e}")
+
+    def stats_summary(self) -> Optional[str]:
+        """Counters since the last call, then reset them
+
+        Returns:
+            Optional[str]: None if nothing was processed or dropped
+        """
+        with self._stats_lock:
+            depth = self._queue.qsize()
+            processed = self._processed.count()
+            if not (processed or self._dropped or depth):
+                self._processed.reset()
+                return None
+            summary = (f"{self.NAME}: {processed} processed "
+                       f"({self._processed.rate():.0f}/s), queue depth "
+                       f"{depth}/{self._QUEUE_SIZE} (max {self._max_depth}), "
+                       f"{self._dropped} dropped ({self.dropped_total} total), "
+                       f"latency {self._latency.summary_ms()}")
+            self._processed.reset()
+            self._latency.reset()
+            self._dropped = 0
+            self._max_depth = 0
+        return summary
+
+    def close(self, TIMEOUT_S: Optional[float] = 5.0) -> None:
+        """Finish everything queued, then stop the worker"""
+        if not self._thread.is_alive():
+            return
+        try:
+            # Waits while the queue is full, the worker is still draining it
+            self._queue.put(self._STOP, timeout=TIMEOUT_S)
+        except queue.Full:
+            slogger.error(f"{self.NAME} did not drain in time, items may be lost")
+            return
+        self._thread.join(TIMEOUT_S)
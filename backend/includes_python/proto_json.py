@@ -0,0 +1,150 @@
+import json
+import math
+import struct
+from typing import Callable, Dict, Optional
+
+from google.protobuf.descriptor import Descriptor, FieldDescriptor
+
+# Precompiled protobuf -> JSON encoders.
+#
+# MessageToDict walks the descriptor through reflection for every message and
+# json.dumps then walks the resulting dict again. Our payloads are small, flat
+# and fixed, so we generate one Python function per message type from the
+# descriptor once and then just run it. Output is byte for byte what
+# json.dumps(MessageToDict(message)) gives:
+#   - json_name keys (camelCase), in field number order, present fields only
+#   - enums as their names, int64 as strings
+#   - float fields as the shortest decimal that round trips through float32
+
+_FLOAT32 = struct.Struct('<f')
+_NON_FINITE = {'nan': '"NaN"', 'inf': '"Infinity"', '-inf': '"-Infinity"'}
+_INT64_TYPES = (FieldDescriptor.CPPTYPE_INT64, FieldDescriptor.CPPTYPE_UINT64)
+
+
+# float32 needs at most 9 significant digits to round trip
+_PRECISION_FORMATS = ('%.6g', '%.7g', '%.8g', '%.9g')
+
+
+def shortest_float(VALUE: float) -> float:
+    """Shortest decimal float that packs back into the same float32
+
+    Same result as the protobuf json_format printer, without going through
+    its internal module.
+    """
+    if not math.isfinite(VALUE):
+        return VALUE
+    pack = _FLOAT32.pack
+    unpack = _FLOAT32.unpack
+    for precision_format in _PRECISION_FORMATS:
+        rounded = float(precision_format % VALUE)
+        if unpack(pack(rounded))[0] == VALUE:
+            return rounded
+    # Not a float32 to begin with (double field or extra value)
+    return VALUE
+
+
+def _float32_json(VALUE: float) -> str:
+    if math.isfinite(VALUE):
+        return repr(shortest_float(VALUE))
+    return _NON_FINITE[repr(VALUE)]
+
+
+def _double_json(VALUE: float) -> str:
+    if math.isfinite(VALUE):
+        return repr(VALUE)
+    return _NON_FINITE[repr(VALUE)]
+
+
+def _enum_json(NAMES: Dict[int, str]) -> Callable[[int], str]:
+    def _encode(VALUE: int) -> str:
+        # Unknown values fall back to the number like json_format does
+        return NAMES.get(VALUE) or str(VALUE)
+    return _encode
+
+
+class ProtoJsonEncoder:
+    """Encodes one protobuf message type straight to a JSON object string.
+
+    Args:
+        MESSAGE_CLASS: Generated protobuf message class
+        EXTRA_FIELDS (dict, optional): json key -> function(message) appended
+            after the protobuf fields. A function returning None skips the key
+    """
+
+    def __init__(self, MESSAGE_CLASS,
+                 EXTRA_FIELDS: Optional[Dict[str, Callable]] = None):
+        self._namespace = {
+            "_float32_json": _float32_json,
+            "_double_json": _double_json,
+            "_json_dumps": json.dumps,
+        }
+        self._compiled: Dict[str, str] = {}
+        root = self._compile(MESSAGE_CLASS.DESCRIPTOR, EXTRA_FIELDS or {})
+        self.encode: Callable = self._namespace[root]
+
+    def _compile(self, DESCRIPTOR: Descriptor, EXTRA_FIELDS: dict) -> str:
+        """Generate the encoder for DESCRIPTOR and its sub messages
+
+        Returns:
+            str: Name of the generated function in self._namespace
+        """
+        func_name = "_encode_" + DESCRIPTOR.full_name.replace(".", "_")
+        if EXTRA_FIELDS:
+            func_name += "_extra"
+        if func_name in self._compiled:
+            return func_name
+
+        lines = [f"def {func_name}(msg):", "    out = []"]
+        for field in sorted(DESCRIPTOR.fields, key=lambda f: f.number):
+            if field.is_repeated:
+                raise NotImplementedError(
+                    f"Repeated field {field.full_name} is not supported")
+            key = json.dumps(field.json_name) + ": "
+            value = f"msg.{field.name}"
+            cpp_type = field.cpp_type
+            if cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+                sub_name = self._compile(field.message_type, {})
+                expression = f"{sub_name}({value})"
+            elif cpp_type == FieldDescriptor.CPPTYPE_ENUM:
+                enum_name = "_enum_" + \
+                    field.enum_type.full_name.replace(".", "_")
+                self._namespace[enum_name] = _enum_json(
+                    {v.number: json.dumps(v.name)
+                     for v in field.enum_type.values})
+                expression = f"{enum_name}({value})"
+            elif cpp_type == FieldDescriptor.CPPTYPE_BOOL:
+                expression = f"('true' if {value} else 'false')"
+            elif cpp_type == FieldDescriptor.CPPTYPE_FLOAT:
+                expression = f"_float32_json({value})"
+            elif cpp_type == FieldDescriptor.CPPTYPE_DOUBLE:
+                expression = f"_double_json({value})"
+            elif cpp_type in _INT64_TYPES:
+                expression = f"'\"' + str({value}) + '\"'"
+            elif cpp_type == FieldDescriptor.CPPTYPE_STRING:
+                if field.type == FieldDescriptor.TYPE_BYTES:
+                    raise NotImplementedError(
+                        f"Bytes field {field.full_name} is not supported")
+                expression = f"_json_dumps({value})"
+            else:
+                expression = f"str({value})"
+
+            if field.has_presence:
+                lines.append(f"    if msg.HasField({field.name!r}):")
+                lines.append(f"        out.append({key!r} + {expression})")
+            else:
+                # proto3 implicit presence, default values are left out
+                lines.append(f"    if {value}:")
+                lines.append(f"        out.append({key!r} + {expression})")
+
+        for index, (key, function) in enumerate(EXTRA_FIELDS.items()):
+            extra_name = f"{func_name}_{index}"
+            self._namespace[extra_name] = function
+            key = json.dumps(key) + ": "
+            lines.append(f"    extra = {extra_name}(msg)")
+            lines.append("    if extra is not None:")
+            lines.append(f"        out.append({key!r} + _json_dumps(extra))")
+
+        lines.append("    return '{' + ', '.join(out) + '}'")
+        exec("\n".join(lines), self._namespace)
+        self._compiled[func_name] = "\n".join(lines)
+        return func_name
@@ -0,0 +1,244 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from google.protobuf.descriptor import Descriptor, FieldDescriptor
+
+from backend.includes_python.proto_json import shortest_float
+
+# Columnar ring buffers of recent telemetry for server side graph history.
+#
+# Every numeric leaf of a packet (floats, ints, bools, enums) gets its own
+# fixed size column, keyed by the same dotted json names the frontend sees
+# e.g. "altitude" or "meta.rssi". Missing fields are stored as NaN.
+# Queries slice a time range out of a column and downsample it so the browser
+# only ever receives a bounded number of points.
+
+_NUMERIC_TYPES = (
+    FieldDescriptor.CPPTYPE_FLOAT, FieldDescriptor.CPPTYPE_DOUBLE,
+    FieldDescriptor.CPPTYPE_INT32, FieldDescriptor.CPPTYPE_INT64,
+    FieldDescriptor.CPPTYPE_UINT32, FieldDescriptor.CPPTYPE_UINT64,
+    FieldDescriptor.CPPTYPE_BOOL, FieldDescriptor.CPPTYPE_ENUM,
+)
+
+
+def _leaf_fields(DESCRIPTOR: Descriptor, PREFIX: Tuple = ()) -> List[Tuple]:
+    """(json path, attribute path) of every numeric leaf, in field order"""
+    leaves = []
+    for field in sorted(DESCRIPTOR.fields, key=lambda f: f.number):
+        if field.is_repeated:
+            continue
+        path = PREFIX + ((field.json_name, field.name),)
+        if field.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+            leaves.extend(_leaf_fields(field.message_type, path))
+        elif field.cpp_type in _NUMERIC_TYPES:
+            leaves.append((".".join(p[0] for p in path),
+                           tuple(p[1] for p in path)))
+    return leaves
+
+
+class ColumnarRing:
+    """Fixed capacity column store for one message type.
+
+    Args:
+        MESSAGE_CLASS: Generated protobuf message class
+        CAPACITY (int): Rows kept. The oldest rows are overwritten
+    """
+
+    def __init__(self, MESSAGE_CLASS, CAPACITY: int):
+        self.CAPACITY = CAPACITY
+        self._leaves = _leaf_fields(MESSAGE_CLASS.DESCRIPTOR)
+        self.fields = [name for name, _ in self._leaves]
+        self._index = {name: i for i, name in enumerate(self.fields)}
+        # float32 is all the payloads carry, time needs the full double
+        self._values = np.full((CAPACITY, len(self.fields)), np.nan,
+                               dtype=np.float32)
+        self._time = np.zeros(CAPACITY, dtype=np.float64)
+        self._next = 0
+        self.count = 0
+
+    def append(self, message, TIME_S: float) -> None:
+        """Store the numeric fields of a parsed message"""
+        row = self._values[self._next]
+        for column, (_, attributes) in enumerate(self._leaves):
+            target = message
+            for attribute in attributes:
+                if not target.HasField(attribute):
+                    row[column] = math.nan
+                    break
+                target = getattr(target, attribute)
+            else:
+                row[column] = target
+        self._time[self._next] = TIME_S
+        self._next = (self._next + 1) % self.CAPACITY
+        self.count = min(self.count + 1, self.CAPACITY)
+
+    def series(self, FIELD: str, START_S: Optional[float] = None,
+               END_S: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Time ordered (time, value) arrays of a field within a time range
+
+        Raises:
+            KeyError: Unknown field
+        """
+        column = self._index[FIELD]
+        if self.count < self.CAPACITY:
+            order = np.arange(self.count)
+        else:
+            order = np.roll(np.arange(self.CAPACITY), -self._next)
+        # Indexing by order copies, nothing returned shares the ring's memory
+        times = self._time[order]
+        values = self._values[order, column].astype(np.float64)
+
+        keep = ~np.isnan(values)
+        if START_S is not None:
+            keep &= times >= START_S
+        if END_S is not None:
+            keep &= times <= END_S
+        times = times[keep]
+        values = values[keep]
+        # Timestamps can go backwards if the source restarts mid session
+        if times.size > 1 and np.any(np.diff(times) < 0):
+            sort = np.argsort(times, kind="stable")
+            times, values = times[sort], values[sort]
+        return times, values
+
+
+def lttb(TIMES: np.ndarray, VALUES: np.ndarray,
+         POINTS: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Largest-Triangle-Three-Buckets downsampling
+
+    Keeps the first and last point and, per bucket, the point forming the
+    largest triangle with the previous pick and the next bucket's average.
+    """
+    size = TIMES.size
+    if POINTS >= size or POINTS < 3:
+        return TIMES, VALUES
+
+    edges = np.linspace(1, size - 1, POINTS - 1).astype(np.int64)
+    picked = np.empty(POINTS, dtype=np.int64)
+    picked[0] = 0
+    picked[-1] = size - 1
+    previous = 0
+    for bucket in range(POINTS - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start = end
+        next_end = edges[bucket + 2] if bucket + 2 < POINTS - 1 else size
+        average_t = TIMES[next_start:next_end].mean()
+        average_v = VALUES[next_start:next_end].mean()
+        areas = np.abs(
+            (TIMES[previous] - average_t) * (VALUES[start:end] - VALUES[previous])
+            - (TIMES[previous] - TIMES[start:end]) * (average_v - VALUES[previous]))
+        previous = start + int(np.argmax(areas))
+        picked[bucket + 1] = previous
+    return TIMES[picked], VALUES[picked]
+
+
+def m4(TIMES: np.ndarray, VALUES: np.ndarray,
+       POINTS: int) -> Tuple[np.ndarray, np.ndarray]:
+    """M4 downsampling. First, last, min and max of POINTS / 4 time buckets
+
+    Draws the same line as the raw data at a pixel width of POINTS / 4.
+    """
+    size = TIMES.size
+    buckets = POINTS // 4
+    if POINTS >= size or buckets < 1:
+        return TIMES, VALUES
+
+    span = TIMES[-1] - TIMES[0]
+    if span <= 0:
+        bucket_of = np.zeros(size, dtype=np.int64)
+    else:
+        bucket_of = np.minimum(
+            ((TIMES - TIMES[0]) / span * buckets).astype(np.int64), buckets - 1)
+    # Buckets are contiguous because time is sorted
+    starts = np.flatnonzero(np.r_[True, bucket_of[1:] != bucket_of[:-1]])
+    ends = np.r_[starts[1:], size] - 1
+    mins = np.minimum.reduceat(VALUES, starts)
+    maxs = np.maximum.reduceat(VALUES, starts)
+
+    picked = [starts, ends]
+    for bucket_start, bucket_end, low, high in zip(starts, ends, mins, maxs):
+        section = VALUES[bucket_start:bucket_end + 1]
+        picked.append([bucket_start + int(np.argmax(section == low)),
+                       bucket_start + int(np.argmax(section == high))])
+    picked = np.unique(np.concatenate(
+        [np.asarray(p, dtype=np.int64).ravel() for p in picked]))
+    return TIMES[picked], VALUES[picked]
+
+
+DOWNSAMPLERS = {
+    "lttb": lttb,
+    "m4": m4,
+}
+
+
+class TelemetryStore:
+    """Column rings for every packet type, keyed by packet ID.
+
+    Args:
+        MESSAGE_CLASSES (dict): packet ID -> protobuf message class
+        CAPACITY (int): Rows kept per packet ID
+    """
+
+    def __init__(self, MESSAGE_CLASSES: Dict[int, type], CAPACITY: int):
+        self._rings = {packet_id: ColumnarRing(message_class, CAPACITY)
+                       for packet_id, message_class in MESSAGE_CLASSES.items()}
+
+    def append(self, PACKET_ID: int, message) -> None:
+        """Store a parsed packet, timed by its meta timestamp
+
+        Packets without one are skipped, same as the live graphs, rather than
+        mixing in the server's receive clock.
+        """
+        ring = self._rings.get(PACKET_ID)
+        if ring is None:
+            return
+        if not (message.HasField("meta")
+                and message.meta.HasField("timestamp_s")):
+            return
+        ring.append(message, message.meta.timestamp_s)
+
+    def series(self, PACKET_ID: int, FIELD: str, START_S: Optional[float] = None,
+               END_S: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Time ordered (time, value) arrays of one field within a time range
+
+        The arrays are copies, so they can be downsampled on another thread
+        while packets keep being appended.
+
+        Raises:
+            KeyError: Unknown packet ID or field
+        """
+        return self._rings[PACKET_ID].series(FIELD, START_S, END_S)
+
+    def query(self, PACKET_ID: int, FIELD: str, START_S: Optional[float] = None,
+              END_S: Optional[float] = None, POINTS: int = 500,
+              METHOD: str = "lttb") -> dict:
+        """Downsampled history of one field
+
+        Raises:
+            KeyError: Unknown packet ID, field or method
+        """
+        times, values = self.series(PACKET_ID, FIELD, START_S, END_S)
+        return summarise(PACKET_ID, FIELD, times, values, POINTS, METHOD)
+
+    def fields(self, PACKET_ID: int) -> List[str]:
+        return self._rings[PACKET_ID].fields
+
+
+def summarise(PACKET_ID: int, FIELD: str, TIMES: np.ndarray,
+              VALUES: np.ndarray, POINTS: int, METHOD: str) -> dict:
+    """Downsample a series from TelemetryStore.series into a query response
+
+    Raises:
+        KeyError: Unknown method
+    """
+    times, values = DOWNSAMPLERS[METHOD](TIMES, VALUES, POINTS)
+    return {
+        "packetId": PACKET_ID,
+        "field": FIELD,
+        "method": METHOD,
+        "total": int(TIMES.size),
+        # Same decimals the live JSON frames show for these float32s
+        "t": [shortest_float(t) for t in times.tolist()],
+        "v": [shortest_float(v) for v in values.tolist()],
+    }
@@ -70,7 +70,12 @@ std::unique_ptr<PacketType> process_packet(const ssize_t BUFFER_BYTE_COUNT,
       // Run sequence related updates
       std::string serialized;
       if (proto_msg.SerializeToString(&serialized)) {
+        // ID and payload go out as one multipart message so subscribers get
+        // both or neither. The 1 byte ID frame is also the subscription topic
+        const int8_t PACKET_ID = PacketType::ID;
+        zmq::message_t id_msg(&PACKET_ID, sizeof(int8_t));
         zmq::message_t msg(serialized.data(), serialized.size());
+        pub_socket.send(id_msg, zmq::send_flags::sndmore);
         pub_socket.send(msg, zmq::send_flags::none);
       } else {
         slogger::error(
@@ -135,10 +140,7 @@ void input_read_loop(std::shared_ptr<LoraInterface> interface,
       if (count >= 1) {
         int8_t packet_id = static_cast<int8_t>(buffer[0]);
 
-        // Send packet ID to receiving ends so they know which proto file to use
-        std::string packet_id_string(1, packet_id);
-        zmq::message_t msg(packet_id_string.data(), sizeof(int8_t));
-        pub_socket.send(msg, zmq::send_flags::none);
+        // The packet ID is published along with the payload in process_packet
 
         // Note that some packet types are observed can be skipped if not meant
         // for GCS
@@ -0,0 +1,224 @@
+"""
+    Load mission CSVs into typed NumPy columns for replay
+
+    Each CSV is parsed once into one array per column. The per type timelines
+    are already in time order, so they're merged rather than sorted together,
+    and a packet's data dict is only built when replay gets to it.
+"""
+import csv
+import io
+import os
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import backend.includes_python.process_logging as slogger
+from backend.replay_system.packet_type import Packet, PacketType
+
+TIMESTAMP_COLUMN = "timestamp_ms"
+
+
+def typed_column(VALUES: Sequence) -> np.ndarray:
+    """Convert one column of CSV strings to the narrowest type that fits
+
+    True/False (any case) becomes bool, anything that parses as a number
+    becomes float64 and everything else is left as strings.
+    """
+    if len(VALUES) == 0:
+        return np.empty(0, dtype=np.float64)
+    distinct = set(VALUES)
+    if {value.lower() for value in distinct} <= {"true", "false"}:
+        trues = {value for value in distinct if value.lower() == "true"}
+        return np.fromiter((value in trues for value in VALUES),
+                           dtype=bool, count=len(VALUES))
+    try:
+        return np.fromiter(map(float, VALUES), dtype=np.float64,
+                           count=len(VALUES))
+    except ValueError:
+        return np.array(VALUES, dtype=np.str_)
+
+
+def _column_kind(VALUE: str) -> str:
+    if VALUE.lower() in ("true", "false"):
+        return "bool"
+    try:
+        float(VALUE)
+        return "float"
+    except ValueError:
+        return "str"
+
+
+def _parse_columns_fast(HEADER: List[str], BODY: str) -> Dict[str, np.ndarray]:
+    """Parse with numpy's C reader, typing columns off the first row
+
+    Raises:
+        ValueError: A later row doesn't fit the types of the first one
+    """
+    first_row = BODY.partition("\n")[0].rstrip("\r").split(",")
+    if len(first_row) != len(HEADER) or '"' in BODY:
+        raise ValueError("Not a plain CSV")
+    kinds = [_column_kind(value) for value in first_row]
+    numeric = [i for i, kind in enumerate(kinds) if kind != "str"]
+    text = [i for i, kind in enumerate(kinds) if kind == "str"]
+
+    columns = {}
+    if numeric:
+        # Flags go through the float parser as 1/0
+        numbers = BODY
+        for word, digit in (("True", "1"), ("TRUE", "1"), ("true", "1"),
+                            ("False", "0"), ("FALSE", "0"), ("false", "0")):
+            numbers = numbers.replace(word, digit)
+        values = np.loadtxt(io.StringIO(numbers), delimiter=",",
+                            usecols=numeric, dtype=np.float64, ndmin=2)
+        for position, i in enumerate(numeric):
+            column = values[:, position]
+            columns[HEADER[i]] = column.astype(bool) if kinds[i] == "bool" else column
+    if text:
+        values = np.loadtxt(io.StringIO(BODY), delimiter=",", usecols=text,
+                            dtype=np.str_, ndmin=2)
+        for position, i in enumerate(text):
+            columns[HEADER[i]] = values[:, position]
+    # Header order
+    return {name: columns[name] for name in HEADER}
+
+
+def _parse_columns(PATH: str, HEADER: List[str], BODY: str) -> Dict[str, np.ndarray]:
+    """Row by row fallback for anything the fast path can't take"""
+    rows = [row for row in csv.reader(io.StringIO(BODY, newline="")) if row]
+    for line, row in enumerate(rows, start=2):
+        if len(row) != len(HEADER):
+            raise ValueError(
+                f"{PATH} line {line} has {len(row)} values, expected {len(HEADER)}")
+    raw_columns = list(zip(*rows)) if rows else [()] * len(HEADER)
+    return {name: typed_column(values)
+            for name, values in zip(HEADER, raw_columns)}
+
+
+@dataclass
+class MissionColumns:
+    """Every row of one packet type, one array per CSV column"""
+    packet_type: PacketType
+    timestamps_ms: np.ndarray
+    columns: Dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.timestamps_ms)
+
+    def row(self, INDEX: int) -> dict:
+        """CSV row as a dict of Python values, like csv.DictReader gives"""
+        return {name: column[INDEX].item()
+                for name, column in self.columns.items()}
+
+
+def load_columns(PATH: str, PACKET_TYPE: PacketType,
+                 MIN_TIMESTAMP_MS: float) -> MissionColumns:
+    """Parse one mission CSV, keeping rows after MIN_TIMESTAMP_MS
+
+    Raises:
+        FileNotFoundError: No CSV at PATH
+        ValueError: No timestamp column, or a row doesn't match the header
+    """
+    # Mission data is saved with a BOM
+    with open(PATH, newline="", encoding="utf-8-sig") as f:
+        header_line = f.readline()
+        body = f.read()
+    header = next(csv.reader([header_line]), [])
+    if TIMESTAMP_COLUMN not in header:
+        raise ValueError(f"{PATH} has no {TIMESTAMP_COLUMN} column")
+    if not body.strip():
+        columns = {name: np.empty(0, dtype=np.float64) for name in header}
+    else:
+        try:
+            columns = _parse_columns_fast(header, body)
+        except ValueError:
+            columns = _parse_columns(PATH, header, body)
+    timestamps_ms = columns[TIMESTAMP_COLUMN].astype(np.float64)
+
+    keep = timestamps_ms > MIN_TIMESTAMP_MS
+    if np.any(np.diff(timestamps_ms) < 0):
+        slogger.warning(f"{PATH} is out of time order, sorting it")
+        keep = np.flatnonzero(keep)
+        keep = keep[np.argsort(timestamps_ms[keep], kind="stable")]
+    return MissionColumns(
+        packet_type=PACKET_TYPE,
+        timestamps_ms=timestamps_ms[keep],
+        columns={name: column[keep] for name, column in columns.items()})
+
+
+def merge_timelines(TIMESTAMPS_MS: List[np.ndarray]
+                    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Merge already sorted timelines into one
+
+    Equal timestamps keep the order of TIMESTAMPS_MS, the same as a stable
+    sort of everything concatenated.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: Merged timestamps, which
+            timeline each entry came from and its index in that timeline
+    """
+    merged = np.empty(0, dtype=np.float64)
+    source = np.empty(0, dtype=np.int8)
+    index = np.empty(0, dtype=np.int64)
+    for timeline, timestamps in enumerate(TIMESTAMPS_MS):
+        if len(timestamps) == 0:
+            continue
+        # Where each new entry lands, after any equal ones already merged
+        new_positions = (np.searchsorted(merged, timestamps, side="right")
+                         + np.arange(len(timestamps)))
+        is_old = np.ones(len(merged) + len(timestamps), dtype=bool)
+        is_old[new_positions] = False
+
+        merged_next = np.empty(len(is_old), dtype=np.float64)
+        merged_next[is_old] = merged
+        merged_next[new_positions] = timestamps
+        source_next = np.empty(len(is_old), dtype=np.int8)
+        source_next[is_old] = source
+        source_next[new_positions] = timeline
+        index_next = np.empty(len(is_old), dtype=np.int64)
+        index_next[is_old] = index
+        index_next[new_positions] = np.arange(len(timestamps))
+        merged, source, index = merged_next, source_next, index_next
+    return merged, source, index
+
+
+class MissionTimeline(Sequence):
+    """Every packet of a mission in time order
+
+    Behaves as a list of Packet for replay_packets, but each Packet is built
+    from the columns when it's indexed rather than up front.
+    """
+
+    def __init__(self, MISSION_COLUMNS: List[MissionColumns]):
+        self._types = MISSION_COLUMNS
+        self.timestamps_ms, self._source, self._index = merge_timelines(
+            [columns.timestamps_ms for columns in MISSION_COLUMNS])
+
+    def __len__(self) -> int:
+        return len(self.timestamps_ms)
+
+    def __getitem__(self, POSITION):
+        if isinstance(POSITION, slice):
+            return [self[i] for i in range(*POSITION.indices(len(self)))]
+        columns = self._types[self._source[POSITION]]
+        return Packet(timestamp_ms=float(self.timestamps_ms[POSITION]),
+                      packet_type=columns.packet_type,
+                      data=columns.row(self._index[POSITION]))
+
+
+def load_mission(MISSION_PATH: str, MIN_TIMESTAMP_MS: float,
+                 PACKET_TYPES: Optional[List[PacketType]] = None
+                 ) -> MissionTimeline:
+    """Load every packet type's CSV in a mission folder
+
+    Missing CSVs are logged and skipped.
+    """
+    loaded = []
+    for packet_type in PACKET_TYPES or list(PacketType):
+        filename = os.path.join(MISSION_PATH, f"{packet_type.name}.csv")
+        try:
+            loaded.append(load_columns(filename, packet_type, MIN_TIMESTAMP_MS))
+        except FileNotFoundError:
+            slogger.error(f'Warning Missing File: {filename}')
+    return MissionTimeline(loaded)
@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from enum import Enum
 
 
@@ -10,3 +11,10 @@ class PacketType(Enum):
     AV_TO_GCS_DATA_2 = 5
     AV_TO_GCS_DATA_3 = 6
     GCS_TO_GSE_STATE_CMD = 7
+
+
+@dataclass
+class Packet:
+    timestamp_ms: float
+    packet_type: PacketType
+    data: dict
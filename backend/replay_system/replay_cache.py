@@ -0,0 +1,190 @@
+"""
+    Precompiled replay cache for missions
+
+    The first replay of a mission runs every row through the packet builders
+    once and saves the ready to write payload bytes with their timestamps.
+    Later replays memory map that instead of parsing and converting the CSVs
+    again. The cache is keyed by a hash of the mission files, the interface
+    type and the code that builds the payloads, so any change to those gets a
+    fresh compile.
+"""
+import hashlib
+import mmap
+import os
+import shutil
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+
+import backend.includes_python.process_logging as slogger
+from backend.replay_system.packet_type import Packet, PacketType
+
+CACHE_DIR = os.path.join("backend", "replay_system", "cache")
+# Bump when the cache layout changes
+CACHE_VERSION = 1
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Changing how rows become bytes makes every cached mission stale
+_ENCODER_SOURCES = [
+    os.path.join(_BACKEND_DIR, "replay_system", "replay_engine.py"),
+    os.path.join(_BACKEND_DIR, "device_emulator.py"),
+    os.path.join(_BACKEND_DIR, "includes_python", "metric.py"),
+    os.path.join(_BACKEND_DIR, "includes_python", "payload_layout.py"),
+]
+_MISSION_FILE_TYPES = (".csv", ".flog")
+
+_TIMESTAMPS_FILE = "timestamps_ms.npy"
+_PACKET_TYPES_FILE = "packet_types.npy"
+_OFFSETS_FILE = "offsets.npy"
+_PAYLOADS_FILE = "payloads.bin"
+_LOCK_FILE = "building.lock"
+
+
+def _hash_file(DIGEST, PATH: str) -> None:
+    DIGEST.update(os.path.basename(PATH).encode("utf-8"))
+    with open(PATH, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            DIGEST.update(chunk)
+
+
+def mission_hash(MISSION_PATH: str, INTERFACE_TYPE) -> str:
+    """Cache key for a mission folder replayed on an interface type
+
+    Args:
+        MISSION_PATH (str): Mission folder of CSVs and/or a flight log
+        INTERFACE_TYPE (InterfaceType): Decides the payload byte format
+
+    Returns:
+        str: output hash
+    """
+    digest = hashlib.sha1(usedforsecurity=False)
+    digest.update(f"{CACHE_VERSION}:{INTERFACE_TYPE.name}".encode("utf-8"))
+    for name in sorted(os.listdir(MISSION_PATH)):
+        if name.endswith(_MISSION_FILE_TYPES):
+            _hash_file(digest, os.path.join(MISSION_PATH, name))
+    for source in _ENCODER_SOURCES:
+        _hash_file(digest, source)
+    return digest.hexdigest()
+
+
+@dataclass
+class CompiledPacket:
+    timestamp_ms: float
+    packet_type: PacketType
+    # Complete device write, a view into the memory mapped cache
+    payload: memoryview
+
+
+class CompiledMission(Sequence):
+    """Payloads of a compiled mission in time order, memory mapped
+
+    Args:
+        CACHE_PATH (str): Folder written by compile_mission()
+        MIN_TIMESTAMP_MS (float): Skip packets at or before this time
+    """
+
+    def __init__(self, CACHE_PATH: str,
+                 MIN_TIMESTAMP_MS: float = float("-inf")):
+        timestamps_ms = np.load(os.path.join(CACHE_PATH, _TIMESTAMPS_FILE),
+                                mmap_mode="r")
+        self._start = int(np.searchsorted(timestamps_ms, MIN_TIMESTAMP_MS,
+                                          side="right"))
+        self.timestamps_ms = timestamps_ms[self._start:]
+        self._packet_types = np.load(
+            os.path.join(CACHE_PATH, _PACKET_TYPES_FILE), mmap_mode="r")
+        self._offsets = np.load(os.path.join(CACHE_PATH, _OFFSETS_FILE),
+                                mmap_mode="r")
+        with open(os.path.join(CACHE_PATH, _PAYLOADS_FILE), "rb") as f:
+            if os.fstat(f.fileno()).st_size:
+                self._payloads = memoryview(
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            else:
+                # Can't map an empty file
+                self._payloads = memoryview(b"")
+
+    def __len__(self) -> int:
+        return len(self.timestamps_ms)
+
+    def __getitem__(self, POSITION):
+        if isinstance(POSITION, slice):
+            return [self[i] for i in range(*POSITION.indices(len(self)))]
+        if POSITION < 0:
+            POSITION += len(self)
+        if not 0 <= POSITION < len(self):
+            raise IndexError("Compiled mission index out of range")
+        i = self._start + POSITION
+        return CompiledPacket(
+            timestamp_ms=float(self.timestamps_ms[POSITION]),
+            packet_type=PacketType(int(self._packet_types[i])),
+            payload=self._payloads[self._offsets[i]:self._offsets[i + 1]])
+
+
+def compile_mission(PACKETS: Iterable[Packet],
+                    BUILD: Callable[[Packet], Optional[object]],
+                    CACHE_PATH: str) -> int:
+    """Build every packet's payload bytes and save them to CACHE_PATH
+
+    Args:
+        PACKETS (Iterable[Packet]): Every packet of the mission in time order
+        BUILD (Callable): Packet to MockPacket, or None to leave it out
+
+    Returns:
+        int: Packets compiled
+    """
+    os.makedirs(CACHE_PATH, exist_ok=True)
+    # Add a lockfile to indicate that the cache is being built
+    lock_path = os.path.join(CACHE_PATH, _LOCK_FILE)
+    open(lock_path, "w").close()
+
+    timestamps_ms = []
+    packet_types = []
+    offsets = [0]
+    with open(os.path.join(CACHE_PATH, _PAYLOADS_FILE), "wb") as f:
+        for packet in PACKETS:
+            item = BUILD(packet)
+            if item is None:
+                continue
+            payload = item.get_payload_bytes()
+            f.write(payload)
+            timestamps_ms.append(packet.timestamp_ms)
+            packet_types.append(packet.packet_type.value)
+            offsets.append(offsets[-1] + len(payload))
+    np.save(os.path.join(CACHE_PATH, _TIMESTAMPS_FILE),
+            np.array(timestamps_ms, dtype=np.float64))
+    np.save(os.path.join(CACHE_PATH, _PACKET_TYPES_FILE),
+            np.array(packet_types, dtype=np.int8))
+    np.save(os.path.join(CACHE_PATH, _OFFSETS_FILE),
+            np.array(offsets, dtype=np.int64))
+    os.remove(lock_path)
+    return len(timestamps_ms)
+
+
+def load_compiled_mission(MISSION_PATH: str, MIN_TIMESTAMP_MS: float,
+                          INTERFACE_TYPE,
+                          LOAD_PACKETS: Callable[[], Iterable[Packet]],
+                          BUILD: Callable[[Packet], Optional[object]]
+                          ) -> CompiledMission:
+    """Compiled mission from the cache, compiling it first if needed
+
+    Args:
+        MISSION_PATH (str): Mission folder, hashed for the cache key
+        MIN_TIMESTAMP_MS (float): Skip packets at or before this time
+        INTERFACE_TYPE (InterfaceType): Interface the payloads are built for
+        LOAD_PACKETS (Callable): Loads every packet of the mission, only
+            called on a cache miss
+        BUILD (Callable): Packet to MockPacket, see compile_mission()
+    """
+    cache_path = os.path.join(
+        CACHE_DIR, mission_hash(MISSION_PATH, INTERFACE_TYPE))
+    if os.path.isdir(cache_path) and not os.path.isfile(
+            os.path.join(cache_path, _LOCK_FILE)):
+        slogger.info("Loading compiled mission from cache...")
+    else:
+        if os.path.exists(cache_path):
+            slogger.info("Cache was incomplete, removing it...")
+            shutil.rmtree(cache_path)
+        slogger.info("Compiling mission for replay...")
+        count = compile_mission(LOAD_PACKETS(), BUILD, cache_path)
+        slogger.info(f"Compiled {count} packets into {cache_path}")
+    return CompiledMission(cache_path, MIN_TIMESTAMP_MS)
@@ -0,0 +1,209 @@
+"""
+    Runtime controls for a running replay
+
+    A ZMQ REP socket takes JSON requests and answers each with the replay
+    state, so a mission can be paused, resumed, seeked or looped without
+    reloading it. Requests look like
+        {"command": "pause"}
+        {"command": "resume"}
+        {"command": "seek", "timestamp_ms": 1400000}
+        {"command": "loop", "start_ms": 1400000, "end_ms": 1500000}
+        {"command": "loop"}      clears the loop range
+        {"command": "status"}
+    backend/tools/replay_control.py sends them from the command line.
+"""
+import json
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import zmq
+
+import backend.includes_python.process_logging as slogger
+
+
+def packet_timestamps(PACKETS: Sequence) -> np.ndarray:
+    """Timestamp index of a replay sequence
+
+    Loaded missions and compiled caches already keep their timestamps as an
+    array, plain lists of packets get one built
+    """
+    timestamps_ms = getattr(PACKETS, "timestamps_ms", None)
+    if timestamps_ms is not None:
+        return np.asarray(timestamps_ms, dtype=np.float64)
+    return np.fromiter((packet.timestamp_ms for packet in PACKETS),
+                       dtype=np.float64, count=len(PACKETS))
+
+
+class ReplayControl:
+    """Pause, seek and loop state for replay_packets
+
+    Seeking uses a binary search over the packet timestamps, so it's
+    O(log n) however long the mission is.
+
+    Args:
+        TIMESTAMPS_MS (np.ndarray): Timestamp of every packet, in time order
+        ADDRESS (str, optional): ZMQ address to bind the REP socket to. With
+            no address the state can only be changed through handle()
+    """
+
+    def __init__(self, TIMESTAMPS_MS: np.ndarray, ADDRESS: Optional[str] = None):
+        self._timestamps_ms = np.asarray(TIMESTAMPS_MS, dtype=np.float64)
+        self.paused = False
+        self.loop_range: Optional[Tuple[float, float]] = None
+        # Index of the next packet to send, kept up to date by the replay
+        self.position = 0
+        self._seek_position: Optional[int] = None
+        self._socket = None
+        if ADDRESS:
+            self._context = zmq.Context.instance()
+            self._socket = self._context.socket(zmq.REP)
+            self._socket.setsockopt(zmq.LINGER, 0)
+            self._socket.bind(ADDRESS)
+            slogger.info(f"Replay control listening on {ADDRESS}")
+
+    def index_of(self, TIMESTAMP_MS: float) -> int:
+        """Index of the first packet at or after TIMESTAMP_MS"""
+        return int(np.searchsorted(self._timestamps_ms, TIMESTAMP_MS,
+                                   side="left"))
+
+    def poll(self) -> bool:
+        """Answer every request waiting on the socket
+
+        Returns:
+            bool: True if a request changed the replay position or pause
+                state, so any wait in progress should be abandoned
+        """
+        if self._socket is None:
+            return False
+        changed = False
+        while True:
+            try:
+                message = self._socket.recv(zmq.NOBLOCK)
+            except zmq.Again:
+                return changed
+            try:
+                request = json.loads(message)
+                if not isinstance(request, dict):
+                    raise ValueError("Request must be a JSON object")
+                reply, request_changed = self.handle(request)
+                changed = changed or request_changed
+            except (ValueError, KeyError, TypeError) as e:
+                reply = {"ok": False, "error": str(e)}
+            self._socket.send_string(json.dumps(reply))
+
+    def handle(self, REQUEST: dict) -> Tuple[dict, bool]:
+        """Apply one request
+
+        Raises:
+            ValueError: Unknown command or bad arguments
+
+        Returns:
+            Tuple[dict, bool]: Reply, and whether the replay has to react
+        """
+        command = REQUEST.get("command")
+        changed = False
+        match command:
+            case "pause":
+                changed = not self.paused
+                self.paused = True
+            case "resume":
+                changed = self.paused
+                self.paused = False
+            case "seek":
+                self._seek_to(self.index_of(float(REQUEST["timestamp_ms"])))
+                changed = True
+            case "loop":
+                if REQUEST.get("start_ms") is None:
+                    self.loop_range = None
+                else:
+                    start_ms = float(REQUEST["start_ms"])
+                    end_ms = float(REQUEST["end_ms"])
+                    if end_ms <= start_ms:
+                        raise ValueError("Loop end must be after its start")
+                    # One packet on repeat has nothing to pace it by and
+                    # would be sent as fast as the loop can go
+                    count = self._count_between(start_ms, end_ms)
+                    if count < 2:
+                        raise ValueError(
+                            f"Loop range needs at least two packets, "
+                            f"{start_ms:g}-{end_ms:g} ms has {count}")
+                    self.loop_range = (start_ms, end_ms)
+                    # Jump into the range if we're outside it
+                    if self.restart_position(self.position) is not None or \
+                            self._current_ms() < start_ms:
+                        self._seek_to(self.index_of(start_ms))
+                        changed = True
+            case "status":
+                pass
+            case _:
+                raise ValueError(f"Unknown replay command: {command}")
+        if changed:
+            slogger.info(f"Replay control: {command} {self._describe()}")
+        return self.status(), changed
+
+    def _count_between(self, START_MS: float, END_MS: float) -> int:
+        """Packets timestamped from START_MS to END_MS inclusive"""
+        return int(np.searchsorted(self._timestamps_ms, END_MS, side="right")) \
+            - self.index_of(START_MS)
+
+    def _seek_to(self, POSITION: int) -> None:
+        self._seek_position = POSITION
+        # Report where the replay is headed straight away
+        self.position = POSITION
+
+    def _current_ms(self) -> float:
+        if self.position < len(self._timestamps_ms):
+            return float(self._timestamps_ms[self.position])
+        return float("inf")
+
+    def _describe(self) -> str:
+        return json.dumps({key: value for key, value in self.status().items()
+                           if key != "ok"})
+
+    def status(self) -> dict:
+        current_ms = self._current_ms()
+        return {
+            "ok": True,
+            "paused": self.paused,
+            "position": self.position,
+            "packets": len(self._timestamps_ms),
+            "timestamp_ms": None if current_ms == float("inf") else current_ms,
+            "loop": list(self.loop_range) if self.loop_range else None,
+        }
+
+    def take_seek(self) -> Optional[int]:
+        """Position to jump to if a seek is pending, clearing it"""
+        position = self._seek_position
+        self._seek_position = None
+        return position
+
+    def restart_position(self, POSITION: int) -> Optional[int]:
+        """Where to jump back to if POSITION has run past the loop range"""
+        if self.loop_range is None:
+            return None
+        start_ms, end_ms = self.loop_range
+        if POSITION >= len(self._timestamps_ms) or \
+                self._timestamps_ms[POSITION] > end_ms:
+            return self.index_of(start_ms)
+        return None
+
+    def loop_gap_ms(self, LAST_MS: float) -> float:
+        """Recorded time to wait before restarting the loop range
+
+        The loop period is the range's length, so after the last packet of
+        a pass comes the rest of the range, then the stretch before its
+        first packet
+
+        Args:
+            LAST_MS (float): Timestamp of the last packet sent
+        """
+        if self.loop_range is None:
+            return 0.0
+        start_ms, end_ms = self.loop_range
+        first_ms = float(self._timestamps_ms[self.index_of(start_ms)])
+        return max(0.0, end_ms - LAST_MS) + (first_ms - start_ms)
+
+    def close(self) -> None:
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
@@ -4,17 +4,24 @@
 
 """
 from enum import Enum
-from dataclasses import dataclass
 import sys
 import os
-import csv
-from typing import List
+from typing import List, Optional, Union
 import time
 import config.config as config
 from backend.device_emulator import AVtoGCSData1, AVtoGCSData2, AVtoGCSData3, GSEtoGCSData1, GSEtoGCSData2, GCStoAVStateCMD, GCStoGSEStateCMD, MockPacket
 import backend.includes_python.process_logging as slogger
 import backend.includes_python.service_helper as service_helper
-from backend.replay_system.packet_type import PacketType
+import backend.includes_python.csv_layout as csv_layout
+from backend.includes_python.perf_stats import RateCounter
+from backend.includes_python.deadline_scheduler import DeadlineScheduler
+from backend.includes_python.flight_log import FlightLogReader, SESSION_FILE_NAME
+from backend.includes_python.packet_subscription import DeliveredCounter
+# Packet is re-exported for the simulation replay
+from backend.replay_system.packet_type import Packet, PacketType
+from backend.replay_system.mission_loader import MissionTimeline, load_mission
+import backend.replay_system.replay_cache as replay_cache
+from backend.replay_system.replay_control import ReplayControl, packet_timestamps
 import configparser
 import argparse
 
@@ -23,116 +30,224 @@ cfg.read("config/replay.ini")
 timeout_cfg = cfg["Timeout"]
 MIN_TIMESTAMP_MS = float(timeout_cfg["min_timeout_ms"])
 SLEEP_BUFFER_MS = float(timeout_cfg["sleep_buffer_error"])
+CONTROL_SOCKET = cfg.get("Control", "control_socket", fallback="")
+# How often runtime control commands are checked while waiting or paused
+CONTROL_POLL_S = 0.05
+# Throughput report period for accelerated replays
+STATUS_INTERVAL_S = 10
 
 
-@dataclass
-class Packet:
-    timestamp_ms: float
-    packet_type: PacketType
-    data: dict
+def process_csv_packets(min_timestamp_ms: int, mission_path: str) -> MissionTimeline:
+    """Read all the csv files into one time ordered timeline
 
+    Packets are built from typed columns as replay reaches them, see
+    mission_loader
+    """
+    return load_mission(mission_path, min_timestamp_ms)
 
-def process_csv_packets(min_timestamp_ms: int, mission_path: str) -> List[Packet]:
-    """Read and sort all the csv files"""
+
+def process_flight_log_packets(min_timestamp_ms: int, flight_log_path: str) -> List[Packet]:
+    """Read a binary flight log into the same rows the CSVs would give"""
     packets = []
-    for packet_type in PacketType:
-
-        filename = os.path.join(mission_path, f"{packet_type.name}.csv")
-        try:
-            with open(filename, 'r', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    timestamp_ms = float(row['timestamp_ms'])
-                    if timestamp_ms > min_timestamp_ms:
-                        packet = Packet(
-                            timestamp_ms=timestamp_ms,
-                            packet_type=packet_type,
-                            data=row
-                        )
-                        packets.append(packet)
-        except FileNotFoundError:
-            slogger.error(f'Warning Missing File: {filename}')
+    with FlightLogReader(flight_log_path) as reader:
+        for packet_id, time_s, payload in reader.frames(START_S=min_timestamp_ms / 1000):
+            timestamp_ms = time_s * 1000
+            name = csv_layout.PACKET_NAMES.get(packet_id)
+            if name is None or timestamp_ms <= min_timestamp_ms:
+                continue
+            message = csv_layout.MESSAGE_CLASSES[name].FromString(payload)
+            # Unset fields get proto defaults, the handlers expect every key
+            data = dict(zip(csv_layout.CSV_FILES_WITH_HEADERS[name],
+                            csv_layout.message_to_row(name, message, DEFAULTS=True)))
+            packets.append(Packet(timestamp_ms=timestamp_ms,
+                                  packet_type=PacketType[name],
+                                  data=data))
 
     return sorted(packets, key=lambda x: x.timestamp_ms)
 
 
-def replay_packets(packets: List[Packet], min_timestamp_ms: int) -> None:
+def replay_packets(packets: List[Packet], min_timestamp_ms: int,
+                   speed: float = 1.0, afap: bool = False,
+                   control: Optional[ReplayControl] = None,
+                   min_gap_s: float = 0.0,
+                   delivered: Optional[DeliveredCounter] = None) -> None:
+    """Send packets at their recorded times
+
+    Args:
+        packets (List[Packet]): Packets in time order
+        min_timestamp_ms (int): Recorded time that maps to the start of replay
+        speed (float): Replay clock multiplier, 10 sends a 40 minute mission
+            in 4 minutes with the same relative spacing
+        afap (bool): Ignore the recorded times and send as fast as possible,
+            keeping only the order
+        control (ReplayControl, optional): Runtime pause/seek/loop commands,
+            checked between packets and while waiting for one
+        min_gap_s (float): Shortest gap between packets in accelerated and
+            as fast as possible replays. The middleware takes each read as
+            one packet, recorded packets a couple of ms apart merge once sped
+            up
+        delivered (DeliveredCounter, optional): Counts what the middleware
+            publishes, reported next to the send rate
+    """
     if not packets:
         return
 
-    # first_timestamp = packets[0].timestamp_ms
-    start_time = time.time() - (min_timestamp_ms / 1000)
-    # last_status_time = start_time
+    real_time = speed == 1.0 and not afap
+    if not real_time and min_gap_s > 0:
+        slogger.info(f"Packets are sent at least {min_gap_s * 1000:g} ms "
+                     f"apart, at most {1 / min_gap_s:.0f} packets/s")
+    timestamps_ms = packet_timestamps(packets)
+    # Every packet is due at an absolute offset from the start, so sleep
+    # overshoot doesn't build up over the mission
+    if control is None:
+        should_stop = service_helper.time_to_stop
+        max_sleep_s = SLEEP_BUFFER_MS / 1000
+    else:
+        def should_stop():
+            return service_helper.time_to_stop() or control.poll()
+        # Commands are only read between sleeps
+        max_sleep_s = min(SLEEP_BUFFER_MS / 1000, CONTROL_POLL_S)
+    scheduler = DeadlineScheduler(MAX_SLEEP_S=max_sleep_s,
+                                  SHOULD_STOP=should_stop)
+    # Recorded time lined up with the scheduler start, moved on seek/resume
+    origin_ms = min_timestamp_ms
+    start_time = time.time()
+    sent = RateCounter()
+    last_status_time = start_time
+    if delivered is not None:
+        delivered.reset()
+        delivered_start = delivered.total
+    # Scheduler time of the last send, the next is no earlier than min_gap_s on
+    last_send_s = float("-inf")
 
     if service_helper.time_to_stop():
         return
-    for packet in packets:
+    position = 0
+    while True:
         if service_helper.time_to_stop():
             break
-        # Find when the packet should be sent
-        target_time = start_time + (packet.timestamp_ms) / 1000.0
-        time_to_wait = target_time - time.time()
-        if time_to_wait >= 3.0:
-            slogger.warning(
-                f"Time until next packet: {round(time_to_wait,3)} seconds")
-        # slogger.debug(f"Time to wait: {time_to_wait} for packet: {packet.packet_type} at time: {packet.timestamp_ms}")
-        if time_to_wait > 0:
-            remaining_time = time_to_wait
-            while remaining_time > 0:
-                chunk = min(SLEEP_BUFFER_MS / 1000, time_to_wait)
-                time.sleep(chunk)
-                remaining_time -= chunk
-                if service_helper.time_to_stop():
-                    break
+        if control is not None:
+            control.poll()
+            # Recorded time to wait before the next packet after a jump
+            lead_ms = 0.0
+            jump = control.take_seek()
+            if jump is None:
+                jump = control.restart_position(position)
+                if jump is not None and position > 0:
+                    # Looping, keep the range's period rather than sending
+                    # its first packet straight after its last
+                    lead_ms = control.loop_gap_ms(timestamps_ms[position - 1])
+            if jump is not None:
+                position = jump
+            rebase = jump is not None
+            control.position = position
+            if control.paused:
+                while control.paused and not service_helper.time_to_stop():
+                    time.sleep(CONTROL_POLL_S)
+                    control.poll()
+                rebase = True
+                lead_ms = 0.0
+                # Seeks sent while paused
+                jump = control.take_seek()
+                if jump is not None:
+                    position = jump
+                    control.position = position
+            if rebase and position < len(packets):
+                # Carry on from this packet, straight away unless looping
+                origin_ms = timestamps_ms[position] - lead_ms
+                scheduler.start(RESET_STATS=False)
+                last_send_s = float("-inf")
+        if position >= len(packets):
+            break
+
+        packet = packets[position]
+        if afap:
+            due_s = max(0.0, last_send_s + min_gap_s)
+        else:
+            # Find when the packet should be sent
+            due_s = (timestamps_ms[position] - origin_ms) / 1000.0 / speed
+            if not real_time:
+                due_s = max(due_s, last_send_s + min_gap_s)
+            time_to_wait = scheduler.time_until(due_s)
+            if time_to_wait >= 3.0:
+                slogger.warning(
+                    f"Time until next packet: {round(time_to_wait,3)} seconds")
+            # slogger.debug(f"Time to wait: {time_to_wait} for packet: {packet.packet_type} at time: {packet.timestamp_ms}")
+        if (not afap or min_gap_s > 0) and not scheduler.wait_until(due_s):
+            # Stopping, or a control command needs handling first
+            continue
 
         if service_helper.time_to_stop():
             break
 
-        # @TODO Progress Checkers
-        # sent_time = time.time() + (MIN_TIMESTAMP_MS /1000) - start_time
-
-        # current_time = time.time()
-        # if current_time - last_status_time >= 60:
-        #     if service_helper.time_to_stop():
-        #         break
-        #     elapsed = current_time - start_time
-        #     packets_remaining = len(packets) - packets.index(packet) - 1
-        #     slogger.debug(
-        #         f"Status update: Elapsed {elapsed:.1f}s | "
-        #         f"Packets remaining: {packets_remaining} | "
-        #         f"Current packet: {packet.packet_type} @ {packet.timestamp_ms}ms"
-        #     )
-        #     last_status_time = current_time
-
         send_packet(packet)
-
-
-def send_packet(packet: Packet) -> None:
+        last_send_s = scheduler.elapsed()
+        sent.add()
+        position += 1
+
+        current_time = time.time()
+        if not real_time and current_time - last_status_time >= STATUS_INTERVAL_S:
+            rates = f"{sent.rate():.0f} packets/s"
+            if delivered is not None:
+                rates += f" sent, {delivered.rate():.0f} packets/s delivered"
+                delivered.reset()
+            slogger.info(
+                f"Replay status: {rates} | "
+                f"Packets remaining: {len(packets) - position} | "
+                f"Current packet: {packet.packet_type.name} @ {packet.timestamp_ms:.0f}ms")
+            sent.reset()
+            last_status_time = current_time
+
+    elapsed = time.time() - start_time
+    mode = "as fast as possible" if afap else f"{speed:g}x speed"
+    summary = (f"Sent {sent.total} packets in {elapsed:.1f} s at {mode}, "
+               f"{sent.total / elapsed if elapsed > 0 else 0:.0f} packets/s")
+    if delivered is not None:
+        # Give the middleware a moment to publish the last few
+        time.sleep(0.2)
+        summary += (f", middleware published "
+                    f"{delivered.total - delivered_start} of them")
+    slogger.info(summary)
+    if not afap or min_gap_s > 0:
+        slogger.info(f"Replay timing: {scheduler.summary()}")
+
+
+def send_packet(packet: Union[Packet, replay_cache.CompiledPacket]) -> None:
     """Send packet based on the appropriate handler"""
     if service_helper.time_to_stop():
         return
-    time.sleep(0.01)
-    handle_packets(packet)
+    if isinstance(packet, replay_cache.CompiledPacket):
+        MockPacket.write_bytes(packet.payload)
+    else:
+        handle_packets(packet)
 
 
 def handle_packets(packet: Packet):
+    item = build_mock_packet(packet)
+    if item is None or service_helper.time_to_stop():
+        return
+    item.write_payload()
+
+
+def build_mock_packet(packet: Packet) -> Optional[MockPacket]:
+    """Build the emulated radio packet for a row, without sending it"""
     match packet.packet_type:
         case PacketType.AV_TO_GCS_DATA_1:
-            _handle_av_to_gcs_data_1(packet)
+            return _build_av_to_gcs_data_1(packet)
         case PacketType.AV_TO_GCS_DATA_2:
-            _handle_av_to_gcs_data_2(packet)
+            return _build_av_to_gcs_data_2(packet)
         case PacketType.AV_TO_GCS_DATA_3:
-            _handle_av_to_gcs_data_3(packet)
+            return _build_av_to_gcs_data_3(packet)
         case PacketType.GCS_TO_AV_STATE_CMD:
-            _handle_gcs_to_av_state(packet)
+            return _build_gcs_to_av_state(packet)
         case PacketType.GSE_TO_GCS_DATA_1:
-            _handle_gse_to_gcs_data_1(packet)
+            return _build_gse_to_gcs_data_1(packet)
         case PacketType.GSE_TO_GCS_DATA_2:
-            _handle_gse_to_gcs_data_2(packet)
+            return _build_gse_to_gcs_data_2(packet)
         case PacketType.GSE_TO_GCS_DATA_3:
-            _handle_gse_to_gcs_data_3(packet)
+            return _build_gse_to_gcs_data_3(packet)
         case PacketType.GCS_TO_GSE_STATE_CMD:
-            _handle_gcs_to_gse_state(packet)
+            return _build_gcs_to_gse_state(packet)
         case _:
             _unknown_packet_type
 
@@ -143,7 +258,7 @@ def _unknown_packet_type(packet: Packet) -> None:
     raise ValueError
 
 
-def _handle_av_to_gcs_data_1(packet: Packet) -> None:
+def _build_av_to_gcs_data_1(packet: Packet) -> Optional[MockPacket]:
     data = packet.data
 
     def _gyro_capper(packet: Packet, axis: str) -> Packet:
@@ -166,9 +281,6 @@ def _handle_av_to_gcs_data_1(packet: Packet) -> None:
     packet = _gyro_capper(packet, "y")
     packet = _gyro_capper(packet, "z")
 
-    if service_helper.time_to_stop():
-        return
-
     # Getting the flight state so its easier to convert into bits
     flight_state = int(data["FlightState"])
     item = AVtoGCSData1(
@@ -206,13 +318,11 @@ def _handle_av_to_gcs_data_1(packet: Packet) -> None:
         MAIN_SECONDARY_TEST_RESULTS=bool(data["main_secondary_test_results"]),
         MOVE_TO_BROADCAST=bool(data["broadcast_flag"])
     )
-    item.write_payload()
+    return item
 
 
-def _handle_av_to_gcs_data_2(packet: Packet) -> None:
+def _build_av_to_gcs_data_2(packet: Packet) -> Optional[MockPacket]:
     data = packet.data
-    if service_helper.time_to_stop():
-        return
     # Get flight state
     flight_state = int(data["FlightState"])
     item = AVtoGCSData2(
@@ -234,17 +344,15 @@ def _handle_av_to_gcs_data_2(packet: Packet) -> None:
         QY=float(data['qy']),
         QZ=float(data['qz']),
     )
-    item.write_payload()
+    return item
 
 
-def _handle_av_to_gcs_data_3(packet: Packet) -> None:
+def _build_av_to_gcs_data_3(packet: Packet) -> Optional[MockPacket]:
     slogger.error("AV to GCS 3 not implemented")
 
 
-def _handle_gse_to_gcs_data_1(packet: Packet) -> None:
+def _build_gse_to_gcs_data_1(packet: Packet) -> Optional[MockPacket]:
     data = packet.data
-    if service_helper.time_to_stop():
-        return
     item = GSEtoGCSData1(
         RSSI=float(data["rssi"]),
         SNR=float(data["snr"]),
@@ -281,13 +389,11 @@ def _handle_gse_to_gcs_data_1(packet: Packet) -> None:
         TRANSDUCER_2_ERROR=bool(data["transducer_2_error"]),
         TRANSDUCER_1_ERROR=bool(data["transducer_1_error"])
     )
-    item.write_payload()
+    return item
 
 
-def _handle_gse_to_gcs_data_2(packet: Packet) -> None:
+def _build_gse_to_gcs_data_2(packet: Packet) -> Optional[MockPacket]:
     data = packet.data
-    if service_helper.time_to_stop():
-        return
     item = GSEtoGCSData2(
         RSSI=float(data["rssi"]),
         SNR=float(data["snr"]),
@@ -325,18 +431,18 @@ def _handle_gse_to_gcs_data_2(packet: Packet) -> None:
         TRANSDUCER_2_ERROR=bool(data["transducer_2_error"]),
         TRANSDUCER_1_ERROR=bool(data["transducer_1_error"])
     )
-    item.write_payload()
+    return item
 
 
-def _handle_gse_to_gcs_data_3(packet: Packet) -> None:
+def _build_gse_to_gcs_data_3(packet: Packet) -> Optional[MockPacket]:
     slogger.error("GSE to GCS 3 not implemented")
 
 
-def _handle_gcs_to_av_state(packet: Packet) -> None:
+def _build_gcs_to_av_state(packet: Packet) -> Optional[MockPacket]:
     slogger.error("GCS to AV State not implemented")
 
 
-def _handle_gcs_to_gse_state(packet: Packet) -> None:
+def _build_gcs_to_gse_state(packet: Packet) -> Optional[MockPacket]:
     slogger.error("GCS to GSE state not implemented")
 
 
@@ -366,10 +472,27 @@ def main():
     parser.add_argument('--mission', help="Check the mission directory names")
     parser.add_argument(
         '--simulation', choices=['TEST', 'legacy', 'FAIL', 'DEMO'])
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="Replay clock multiplier, e.g. 10 for 10x real time")
+    parser.add_argument('--afap', action='store_true',
+                        help="Send as fast as possible, keeping only the order")
+    parser.add_argument('--socket-path',
+                        help="Middleware socket name, to report how many packets it publishes")
     args = parser.parse_args()
 
     # mission_path = get_mission_path()
+    control = None
+    delivered = None
     try:
+        if args.speed <= 0:
+            raise ValueError(f"Replay speed must be above 0, got {args.speed}")
+
+        # Payloads are built for the interface type, so before loading
+        MockPacket.initialize_settings(
+            config.load_config()[
+                'emulation'], FAKE_DEVICE_NAME=args.device_rocket
+        )
+
         if args.mode == 'mission':
             if not args.mission:
                 raise ValueError("No mission has been provided")
@@ -381,8 +504,19 @@ def main():
                 raise NotImplementedError("Test has not been implemented")
             slogger.info(f"Starting mission replay for {args.mission}")
 
-            processed_packets = process_csv_packets(
-                MIN_TIMESTAMP_MS, mission_path)
+            def load_mission_packets():
+                # Everything, the cache is trimmed to MIN_TIMESTAMP_MS on load
+                # Event viewer session folders carry a flight log, prefer it
+                flight_log_path = os.path.join(mission_path, SESSION_FILE_NAME)
+                if os.path.exists(flight_log_path):
+                    slogger.info(f"Reading flight log {flight_log_path}")
+                    return process_flight_log_packets(
+                        float("-inf"), flight_log_path)
+                return process_csv_packets(float("-inf"), mission_path)
+
+            processed_packets = replay_cache.load_compiled_mission(
+                mission_path, MIN_TIMESTAMP_MS, MockPacket._INTERFACE_TYPE,
+                load_mission_packets, build_mock_packet)
         else:
             from backend.simulation.run_simulation import get_replay_sim_data
             if not args.simulation:
@@ -395,28 +529,36 @@ def main():
             processed_packets = get_replay_sim_data()
             slogger.info(f"Starting simulation replay for {args.simulation}")
 
-        if processed_packets is None:
+        if processed_packets is None or len(processed_packets) == 0:
             raise ValueError(
                 "No packets have been received, replay data is empty")
 
-        MockPacket.initialize_settings(
-            config.load_config()[
-                'emulation'], FAKE_DEVICE_NAME=args.device_rocket
-        )
-
         # Will need to valid timeout before the gaps between packets may be extremely large
         # When replaying the packets the delay will cause an error when trying to shut down
         valid_timeout = validate_timeout_skip(
             processed_packets, MIN_TIMESTAMP_MS)
+        if CONTROL_SOCKET:
+            control = ReplayControl(
+                packet_timestamps(processed_packets), CONTROL_SOCKET)
+        if args.socket_path:
+            delivered = DeliveredCounter(
+                f"ipc:///tmp/{args.socket_path}_pub.sock").start()
+        # The device writer keeps this gap anyway, scheduling it keeps the
+        # replay timing honest
+        min_gap_s = MockPacket._DEVICE_WRITER.MIN_GAP_S
         if (args.simulation == "DEMO"):
             while not service_helper.time_to_stop():
                 slogger.warning(
                     "STARTING UP DEMO MODE, THIS WILL RUN UNTIL STOPPED")
-                replay_packets(processed_packets, valid_timeout)
+                replay_packets(processed_packets, valid_timeout,
+                               args.speed, args.afap, control,
+                               min_gap_s, delivered)
                 slogger.info("FINISHED SENDING PACKETS FOR DEMO")
         else:
             slogger.warning("Running the replay a single time")
-            replay_packets(processed_packets, valid_timeout)
+            replay_packets(processed_packets, valid_timeout,
+                           args.speed, args.afap, control,
+                           min_gap_s, delivered)
             slogger.info("FINISHED SENDING PACKETS")
     except ValueError as ve:
         slogger.error(
@@ -435,6 +577,12 @@ def main():
         slogger.error(f"Something has gone wrong: {str(e)}")
         raise
 
+    finally:
+        if control is not None:
+            control.close()
+        if delivered is not None:
+            delivered.stop()
+
 
 if __name__ == "__main__":
     main()
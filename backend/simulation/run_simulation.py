@@ -7,9 +7,9 @@ import os
 import math
 import sys
 import pandas as pd
-import time
 import backend.includes_python.process_logging as slogger
 import backend.includes_python.service_helper as service_helper
+from backend.includes_python.deadline_scheduler import DeadlineScheduler
 import config.config as config
 import configparser
 from backend.replay_system.replay_engine import Packet
@@ -193,23 +193,14 @@ def run_emulator(flight_data: pd.DataFrame, DEVICE_NAME: str):
     flight_data = post_process_simulation_data(flight_data)
 
     # Send the data to the mock packet
-    first_packet = True
-    START_TIME = time.monotonic()
-
-    def _time_until_next_packet_s(PACKET_TIME_S):
-        return PACKET_TIME_S - (time.monotonic() - START_TIME)
+    # Sleeps most of each gap and only spins the last couple of ms, rather
+    # than busy waiting all of it
+    scheduler = DeadlineScheduler(SHOULD_STOP=service_helper.time_to_stop)
 
     for packet in flight_data:
         PACKET_TIME_S = packet['# Time (s)']
-        if (not first_packet):
-            time_until_next_packet_s = _time_until_next_packet_s(PACKET_TIME_S)
-            if time_until_next_packet_s > 0.6:
-                time.sleep(time_until_next_packet_s*0.8)  # sleep off 80% of it
-            while _time_until_next_packet_s(PACKET_TIME_S) > 0:
-                pass  # Busy wait to avoid sub 20-50ms sleep inaccuracies
-
-        else:
-            first_packet = False
+        if not scheduler.wait_until(PACKET_TIME_S):
+            break
         if service_helper.time_to_stop():
             break
         qw = packet[" e0"]
@@ -235,6 +226,7 @@ def run_emulator(flight_data: pd.DataFrame, DEVICE_NAME: str):
             packet[" e3"],
             qm,
         )
+    slogger.info(f"Simulation timing: {scheduler.summary()}")
 
 
 def simulation_to_replay_data(flight_data: pd.DataFrame):
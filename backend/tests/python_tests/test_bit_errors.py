@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from backend.includes_python.bit_errors import BitErrorModel
+
+
+def _payloads(COUNT=200, SIZE=33):
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, SIZE, dtype=np.uint8).tobytes()
+            for _ in range(COUNT)]
+
+
+def _flipped_bits(A, B):
+    diff = np.frombuffer(A, np.uint8) ^ np.frombuffer(B, np.uint8)
+    return int(np.unpackbits(diff).sum())
+
+
+def test_seed_repeats_the_same_errors():
+    payloads = _payloads()
+    first = BitErrorModel(0.01, 0.1, 16, SEED=42).corrupt_many(payloads)
+    again = BitErrorModel(0.01, 0.1, 16, SEED=42).corrupt_many(payloads)
+    other = BitErrorModel(0.01, 0.1, 16, SEED=43).corrupt_many(payloads)
+    assert first == again
+    assert first != other
+    assert [len(p) for p in first] == [len(p) for p in payloads]
+
+
+def test_bit_error_rate():
+    payloads = _payloads(1000)
+    model = BitErrorModel(BIT_ERROR_RATE=0.01, SEED=1)
+    corrupted = model.corrupt_many(payloads)
+    flipped = sum(_flipped_bits(a, b) for a, b in zip(payloads, corrupted))
+    assert flipped == model.bits_flipped
+    # 264000 bits at 1%
+    assert 2400 < flipped < 2880
+    assert BitErrorModel(SEED=1).corrupt_many(payloads) == payloads
+
+
+def test_bursts_stay_within_their_length():
+    payloads = _payloads(300, SIZE=10)
+    model = BitErrorModel(BURST_RATE=1.0, BURST_BITS=8, SEED=3)
+    for before, after in zip(payloads, model.corrupt_many(payloads)):
+        diff = np.unpackbits(np.frombuffer(before, np.uint8)
+                             ^ np.frombuffer(after, np.uint8),
+                             bitorder="little")
+        hits = np.flatnonzero(diff)
+        if len(hits):
+            assert hits[-1] - hits[0] < 8
+    assert model.payloads_corrupted > 250
+    assert model.corrupt_many([b"", b"\x00"])[0] == b""
+
+
+def test_corrupt_into_stays_inside_spans():
+    model = BitErrorModel(BIT_ERROR_RATE=0.2, SEED=9)
+    original = bytes(_payloads(1, SIZE=40)[0])
+    buffer = bytearray(original)
+    flipped = model.corrupt_into(memoryview(buffer), [(0, 1), (9, 30)])
+    assert buffer[1:9] == original[1:9] and buffer[30:] == original[30:]
+    assert _flipped_bits(bytes(buffer), original) == flipped > 0
+    assert model.payloads_corrupted == 1
+
+
+def test_from_config_and_validation():
+    model = BitErrorModel.from_config({
+        "corruption_bit_error_rate": "0.001", "corruption_burst_rate": "0.5",
+        "corruption_burst_bits": "12", "corruption_seed": "7"})
+    assert (model.BIT_ERROR_RATE, model.BURST_RATE, model.BURST_BITS,
+            model.seed) == (0.001, 0.5, 12, 7)
+    assert BitErrorModel.from_config({"corruption_seed": ""}).seed is not None
+    with pytest.raises(ValueError):
+        BitErrorModel(BIT_ERROR_RATE=1.5)
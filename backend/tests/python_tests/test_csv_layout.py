@@ -0,0 +1,46 @@
+import backend.includes_python.csv_layout as csv_layout
+import backend.proto.generated.AV_TO_GCS_DATA_1_pb2 as AV_TO_GCS_DATA_1_pb
+
+
+def test_csv_headers_line_up_with_proto_fields():
+    renamed = {"timestamp_s_server_side": "timestamp_s",
+               "FlightState": "flightState", "nav_status": "navigation_status"}
+    for name in csv_layout.MESSAGE_CLASSES:
+        for header, path, _ in csv_layout.field_map(name):
+            assert renamed.get(header, header) == path[-1]
+
+
+def test_row_plan_keeps_columns_in_place():
+    packet = AV_TO_GCS_DATA_1_pb.AV_TO_GCS_DATA_1()
+    packet.meta.snr = 9.5
+    packet.state_flags.GPS_fix_flag = False
+    packet.altitude = 1234.5
+    packet.broadcast_flag = True
+    plan = csv_layout.row_plan("AV_TO_GCS_DATA_1")
+
+    row = dict(zip(plan.headers, plan.row(packet)))
+    assert len(plan.row(packet)) == len(plan.headers)
+    assert row["rssi"] == ""
+    assert row["snr"] == 9.5
+    assert row["FlightState"] == ""
+    assert row["GPS_fix_flag"] is False
+    assert row["accel_low_x"] == ""
+    assert row["altitude"] == 1234.5
+    assert row["broadcast_flag"] is True
+    assert plan.row(AV_TO_GCS_DATA_1_pb.AV_TO_GCS_DATA_1()) == [""] * len(plan.headers)
+
+    defaults = dict(zip(plan.headers, plan.row_with_defaults(packet)))
+    assert defaults["rssi"] == 0.0 and defaults["FlightState"] == 0
+    assert defaults["altitude"] == 1234.5
+
+
+def test_row_round_trip():
+    packet = AV_TO_GCS_DATA_1_pb.AV_TO_GCS_DATA_1()
+    packet.meta.total_packet_count_av = 4096
+    packet.flightState = 4
+    packet.gyro_z = -0.25
+    row = csv_layout.message_to_row("AV_TO_GCS_DATA_1", packet)
+    strings = {header: str(value) for header, value
+               in zip(csv_layout.CSV_FILES_WITH_HEADERS["AV_TO_GCS_DATA_1"], row)}
+
+    assert csv_layout.row_to_message("AV_TO_GCS_DATA_1", strings) == packet
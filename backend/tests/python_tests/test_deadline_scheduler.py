@@ -0,0 +1,29 @@
+import time
+from backend.includes_python.deadline_scheduler import DeadlineScheduler
+
+
+def test_deadlines_are_absolute():
+    scheduler = DeadlineScheduler(SPIN_S=0.002)
+    start = time.monotonic()
+    scheduler.start(start)
+    for i in range(1, 11):
+        assert scheduler.wait_until(i * 0.005)
+        # Measured from the start, not from the previous wait
+        assert time.monotonic() - start >= i * 0.005
+    assert time.monotonic() - start < 0.1
+    assert scheduler.deadlines == 10
+    assert scheduler.lateness.percentile(50) < 0.005
+
+
+def test_passed_deadline_counts_as_late():
+    scheduler = DeadlineScheduler()
+    scheduler.start(time.monotonic() - 1.0)
+    assert scheduler.wait_until(0.5)
+    assert scheduler.lateness.max_s >= 0.5
+
+
+def test_stop_cuts_wait_short():
+    scheduler = DeadlineScheduler(MAX_SLEEP_S=0.01, SHOULD_STOP=lambda: True)
+    start = time.monotonic()
+    assert not scheduler.wait_until(10)
+    assert time.monotonic() - start < 0.1
@@ -0,0 +1,114 @@
+import re
+import numpy as np
+import pytest
+import backend.device_emulator as device_emulator
+from backend.device_emulator import MockPacket
+from backend.includes_python.bit_errors import BitErrorModel
+from cli.start_middleware import InterfaceType
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    monkeypatch.setattr(MockPacket, "_INITIALISED", True)
+    monkeypatch.setattr(MockPacket, "_INTERFACE_TYPE", InterfaceType.TEST,
+                        raising=False)
+    monkeypatch.setattr(MockPacket, "_NOISE_COEFFICIENT", 0.0, raising=False)
+    monkeypatch.setattr(MockPacket, "_PACKET_LOSS", 0.0, raising=False)
+
+
+@pytest.mark.parametrize("EXPERIMENTAL", [False, True])
+def test_block_matches_single_ticks(settings, EXPERIMENTAL):
+    T = np.linspace(0, 45, 97)
+    block = device_emulator.encode_sinusoid_block(T, EXPERIMENTAL)
+    assert len(block) == 5 * len(T)
+
+    single = []
+    for t in T.tolist():
+        for packet in device_emulator.get_sinusoid_packet_rows(
+                t, EXPERIMENTAL)[0]:
+            single.append((t, packet.ORIGIN_DEVICE,
+                           bytes(packet.get_payload_bytes())))
+    assert block == single
+
+
+def test_wave_peaks_stay_in_sensor_range(settings):
+    # sin() is exactly 1 here, 32 g * 1024 is one past the int16 range
+    T = np.array([1.25])
+    columns = dict(device_emulator.sinusoid_columns(T, False))
+    accel = columns[device_emulator.AVtoGCSData1]["ACCEL_HIGH_Z"]
+    assert accel.tolist() == [32767]
+    device_emulator.encode_sinusoid_block(T, False)
+    # Negated waves mustn't flip their trough to 32768
+    T = np.array([5 / 12])
+    columns = dict(device_emulator.sinusoid_columns(T, False))
+    accel = columns[device_emulator.AVtoGCSData1]["ACCEL_HIGH_Y"]
+    assert accel.tolist() == [32767]
+    device_emulator.encode_sinusoid_block(T, False)
+
+
+def test_corruption_spares_radio_metadata(settings, monkeypatch):
+    written = []
+
+    class _Writer:
+        def write(self, PAYLOAD):
+            written.append(bytes(PAYLOAD))
+
+    monkeypatch.setattr(MockPacket, "_DEVICE_WRITER", _Writer())
+    monkeypatch.setattr(MockPacket, "_CORRUPTION", None)
+    packets = device_emulator.get_sinusoid_packet_rows(1.0, False)[0]
+    clean = [bytes(packet.get_payload_bytes()) for packet in packets]
+
+    MockPacket.enable_corruption(BitErrorModel(BIT_ERROR_RATE=0.1, SEED=5))
+    for packet in packets:
+        packet.write_payload()
+    assert len(written) == len(clean)
+    for corrupted, original in zip(written, clean):
+        # ID and payload hit, RSSI and SNR as the modem measured them
+        assert corrupted[1:9] == original[1:9]
+        assert corrupted[:1] + corrupted[9:] != original[:1] + original[9:]
+
+
+def test_uart_framing_survives_corruption(settings, monkeypatch):
+    monkeypatch.setattr(MockPacket, "_INTERFACE_TYPE", InterfaceType.TEST_UART)
+    monkeypatch.setattr(MockPacket, "_CORRUPTION", None)
+    packets = device_emulator.get_sinusoid_packet_rows(1.0, False)[0]
+    clean = [bytes(packet.get_payload_bytes()) for packet in packets]
+
+    MockPacket.enable_corruption(BitErrorModel(
+        BIT_ERROR_RATE=0.1, BURST_RATE=1.0, SEED=5))
+    framing = re.compile(rb'\+TEST: LEN:(\d+), RSSI:(-?\d+), SNR:(-?\d+)\r\n'
+                         rb'\+TEST: RX\n"([0-9a-fA-F]*)"\r\n')
+    for packet, original in zip(packets, clean):
+        corrupted = bytes(packet.get_payload_bytes())
+        match = framing.fullmatch(corrupted)
+        assert match is not None
+        expected = framing.fullmatch(original)
+        assert match.groups()[:3] == expected.groups()[:3]
+        assert len(match[4]) == len(expected[4])
+        assert match[4] != expected[4]
+
+
+@pytest.mark.parametrize("INTERFACE_TYPE",
+                         [InterfaceType.TEST, InterfaceType.TEST_UART])
+def test_encode_into_reused_buffer(settings, monkeypatch, INTERFACE_TYPE):
+    monkeypatch.setattr(MockPacket, "_INTERFACE_TYPE", INTERFACE_TYPE)
+    buffer = bytearray(3 + device_emulator.AVtoGCSData1.buffer_size())
+    for rssi, snr in ((-46.4, 10), (-120.0, -7.6), (-5, 9.5)):
+        packet = device_emulator.AVtoGCSData1(RSSI=rssi, SNR=snr, ALTITUDE=rssi)
+        size = packet.encode_into(buffer, 3)
+        assert buffer[3:3 + size] == packet.get_payload_bytes()
+
+    with pytest.raises(ValueError, match="needs"):
+        device_emulator.AVtoGCSData1().encode_into(bytearray(10))
+
+
+@pytest.mark.parametrize("INTERFACE_TYPE",
+                         [InterfaceType.TEST, InterfaceType.TEST_UART])
+def test_block_into_buffer(settings, monkeypatch, INTERFACE_TYPE):
+    monkeypatch.setattr(MockPacket, "_INTERFACE_TYPE", INTERFACE_TYPE)
+    T = np.linspace(0, 10, 21)
+    buffer = bytearray(device_emulator.sinusoid_block_size(len(T), True))
+    block = device_emulator.encode_sinusoid_block(T, True, buffer)
+
+    assert [(t, device, bytes(payload)) for t, device, payload in block] == \
+        device_emulator.encode_sinusoid_block(T, True)
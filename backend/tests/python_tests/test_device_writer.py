@@ -0,0 +1,65 @@
+import os
+import threading
+import time
+import pytest
+from backend.includes_python.device_writer import DeviceWriter
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "openpty"),
+                                reason="Needs a PTY")
+
+
+@pytest.fixture
+def pty():
+    import tty
+    master, slave = os.openpty()
+    # socat's PTYs are raw, no newline translation
+    tty.setraw(slave)
+    yield master, os.ttyname(slave)
+    os.close(master)
+    os.close(slave)
+
+
+def _read(MASTER, SIZE):
+    data = bytearray()
+    while len(data) < SIZE:
+        data.extend(os.read(MASTER, SIZE - len(data)))
+    return bytes(data)
+
+
+def test_large_write_goes_out_whole(pty):
+    master, path = pty
+    writer = DeviceWriter(path)
+    # More than the PTY buffers, so the write is only partly taken at first
+    payload = bytes(range(256)) * 100
+    received = []
+    reader = threading.Thread(
+        target=lambda: received.append(_read(master, len(payload))))
+    reader.start()
+    writer.write(payload)
+    reader.join(5)
+    writer.close()
+    assert received == [payload]
+
+
+def test_writes_are_spaced(pty):
+    master, path = pty
+    writer = DeviceWriter(path, MIN_GAP_S=0.02)
+    start = time.monotonic()
+    for payload in (b"one", b"two", b"six"):
+        writer.write(payload)
+    elapsed = time.monotonic() - start
+    writer.close()
+    assert elapsed >= 0.04
+    assert _read(master, 9) == b"onetwosix"
+
+
+def test_reopens_lost_device(pty):
+    master, path = pty
+    writer = DeviceWriter(path)
+    writer.write(b"one")
+    # Descriptor going bad under us, like socat restarting
+    os.close(writer._fd)
+    writer.write(memoryview(b"two"))
+    writer.close()
+    assert writer.reconnects == 1
+    assert _read(master, 6) == b"onetwo"
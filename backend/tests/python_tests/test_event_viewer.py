@@ -0,0 +1,48 @@
+import csv
+import datetime
+import os
+import threading
+import time
+from backend.event_viewer import GSE_TO_GCS_DATA_2, Packet, decode_packet
+from backend.includes_python.flight_log import SESSION_FILE_NAME, FlightLogReader
+from backend.includes_python.log_writer import FlushPolicy
+from backend.includes_python.pipeline import Stage
+import backend.proto.generated.GSE_TO_GCS_DATA_2_pb2 as GSE_TO_GCS_DATA_2_pb
+
+
+def test_csv_rows_keep_the_receive_time_behind_a_backed_up_decode():
+    Packet.setup(datetime.datetime(2025, 5, 4, 12, 0, 0), True,
+                 FlushPolicy(FLUSH_ROWS=1000, FLUSH_INTERVAL_S=100,
+                             FSYNC_INTERVAL_S=100),
+                 FLIGHT_LOG=True)
+    handlers = {7: (GSE_TO_GCS_DATA_2(), GSE_TO_GCS_DATA_2_pb.GSE_TO_GCS_DATA_2)}
+    release = threading.Event()
+
+    def decode(ITEM):
+        if ITEM is None:
+            release.wait()
+            return
+        decode_packet(handlers, True, ITEM)
+
+    decoder = Stage("decode", decode)
+    payload = GSE_TO_GCS_DATA_2_pb.GSE_TO_GCS_DATA_2(
+        internal_temp=21.5).SerializeToString()
+    # The frame waits in the queue behind a stalled decode
+    decoder.submit(None)
+    received_s = Packet.log_time_s()
+    decoder.submit((7, received_s, payload))
+    time.sleep(0.2)
+    release.set()
+    decoder.close()
+    session_folder = Packet._session_log_folder
+    Packet.close_logs()
+
+    with open(os.path.join(session_folder, "GSE_TO_GCS_DATA_2.csv")) as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 1
+    assert float(rows[0]["timestamp_ms_log_time"]) == received_s * 1000
+    assert Packet.log_time_s() - received_s >= 0.2
+    with FlightLogReader(os.path.join(session_folder, SESSION_FILE_NAME)) as reader:
+        [(packet_id, time_s, _)] = list(reader.frames())
+    assert packet_id == 7
+    assert time_s * 1000 == float(rows[0]["timestamp_ms_log_time"])
@@ -0,0 +1,79 @@
+import os
+import pytest
+from backend.includes_python.flight_log import (
+    FlightLogReader, FlightLogWriter, csv_to_flight_log, flight_log_to_csv)
+from backend.includes_python.log_writer import FlushPolicy
+import backend.proto.generated.AV_TO_GCS_DATA_1_pb2 as AV_TO_GCS_DATA_1_pb
+import backend.proto.generated.GSE_TO_GCS_DATA_2_pb2 as GSE_TO_GCS_DATA_2_pb
+
+_POLICY = FlushPolicy(FLUSH_ROWS=1000, FLUSH_INTERVAL_S=100,
+                      FSYNC_INTERVAL_S=100)
+
+
+def _write_log(path, frames, INDEX_INTERVAL=4):
+    writer = FlightLogWriter(str(path), _POLICY, INDEX_INTERVAL,
+                             START_UNIX_S=1746316800.0)
+    for packet_id, time_s, payload in frames:
+        writer.write_frame(packet_id, time_s, payload)
+    return writer
+
+
+def test_round_trip_and_seek(tmp_path):
+    frames = [(3 + i % 5, i * 0.5, bytes([i]) * i) for i in range(30)]
+    _write_log(tmp_path / "log.flog", frames).close()
+
+    with FlightLogReader(str(tmp_path / "log.flog")) as reader:
+        assert reader.START_UNIX_S == 1746316800.0
+        assert list(reader.frames()) == frames
+        # One index entry per block of 4 frames
+        assert [time_s for time_s, _ in reader.index()] == \
+            [i * 0.5 for i in range(0, 30, 4)]
+        assert list(reader.frames(START_S=9.2)) == frames[19:]
+        assert list(reader.frames(START_S=100)) == []
+
+
+def test_reads_log_cut_short(tmp_path):
+    frames = [(3, i * 0.1, b"\x08\x01" * 10) for i in range(10)]
+    writer = _write_log(tmp_path / "log.flog", frames)
+    # Power cut halfway through the last frame, no index or trailer
+    writer.flush()
+    size = os.path.getsize(tmp_path / "log.flog")
+    with open(tmp_path / "log.flog", "rb") as f:
+        data = f.read(size - 5)
+    with open(tmp_path / "cut.flog", "wb") as f:
+        f.write(data)
+    writer.close()
+
+    with FlightLogReader(str(tmp_path / "cut.flog")) as reader:
+        assert list(reader.frames()) == frames[:-1]
+        assert list(reader.frames(START_S=0.45)) == frames[5:-1]
+
+
+def test_rejects_other_files(tmp_path):
+    (tmp_path / "log.csv").write_text("timestamp_ms,rssi\n")
+    with pytest.raises(ValueError):
+        FlightLogReader(str(tmp_path / "log.csv"))
+
+
+def test_csv_conversion_round_trip(tmp_path):
+    av = AV_TO_GCS_DATA_1_pb.AV_TO_GCS_DATA_1()
+    av.meta.rssi = -71.5
+    av.flightState = 3
+    av.state_flags.GPS_fix_flag = True
+    av.altitude = 1234.5
+    gse = GSE_TO_GCS_DATA_2_pb.GSE_TO_GCS_DATA_2()
+    gse.gas_bottle_weight_1 = -3
+    gse.error_flags.load_cell_2_error = True
+    frames = [(3, 1.25, av.SerializeToString()),
+              (7, 2.5, gse.SerializeToString())]
+    _write_log(tmp_path / "log.flog", frames).close()
+
+    assert flight_log_to_csv(str(tmp_path / "log.flog"), str(tmp_path / "csv")) == 2
+    with open(tmp_path / "csv" / "AV_TO_GCS_DATA_1.csv") as f:
+        header, row = f.read().splitlines()
+    assert header.startswith("timestamp_ms_log_time,rssi,snr,")
+    assert row.startswith("1250.0,-71.5,,,,,3,,,True,")
+
+    assert csv_to_flight_log(str(tmp_path / "csv"), str(tmp_path / "back.flog")) == 2
+    with FlightLogReader(str(tmp_path / "back.flog")) as reader:
+        assert list(reader.frames()) == frames
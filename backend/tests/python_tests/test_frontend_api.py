@@ -0,0 +1,145 @@
+import asyncio
+import base64
+import json
+from google.protobuf import descriptor_pb2
+import backend.frontend_api as frontend_api
+
+
+def test_client_stream_drops_oldest_frame():
+    stream = frontend_api.ClientStream(QUEUE_SIZE=2)
+    for frame in ["a", "b", "c"]:
+        stream.offer(frame)
+
+    assert stream.dropped == 1
+    assert stream.queue.get_nowait() == "b"
+    assert stream.queue.get_nowait() == "c"
+
+
+def test_broadcaster_fans_out_to_every_client():
+    broadcaster = frontend_api.TelemetryBroadcaster("ipc:///tmp/unused", 4)
+    first = broadcaster.register()
+    second = broadcaster.register()
+    broadcaster.publish("frame")
+    broadcaster.unregister(second)
+    broadcaster.publish("frame_2")
+
+    assert first.queue.qsize() == 2
+    assert second.queue.qsize() == 1
+
+
+def test_binary_clients_get_raw_payload():
+    broadcaster = frontend_api.TelemetryBroadcaster("ipc:///tmp/unused", 4)
+    binary = broadcaster.register(BINARY=True)
+    packet = frontend_api.PACKET_HANDLERS[3](altitude=120.0)
+    payload = packet.SerializeToString()
+    broadcaster._handle_packet(3, payload, 0.0)
+
+    frame = binary.queue.get_nowait()
+    assert frame.text is None
+    assert binary.frame_data(frame) == bytes([3]) + payload
+
+    text = broadcaster.register()
+    broadcaster._handle_packet(3, payload, 0.0)
+    frame = text.queue.get_nowait()
+    assert json.loads(text.frame_data(frame))["data"]["altitude"] == 120.0
+    assert binary.frame_data(binary.queue.get_nowait()) == frame.binary
+
+
+def test_schema_message_describes_every_packet():
+    schema = json.loads(frontend_api.SCHEMA_MESSAGE)["data"]
+    descriptor_set = descriptor_pb2.FileDescriptorSet.FromString(
+        base64.b64decode(schema["fileDescriptorSet"]))
+    messages = {f"{file.package}.{message.name}"
+                for file in descriptor_set.file for message in file.message_type}
+
+    for packet_id, message_class in frontend_api.PACKET_HANDLERS.items():
+        assert schema["packets"][str(packet_id)] == message_class.DESCRIPTOR.full_name
+        assert message_class.DESCRIPTOR.full_name in messages
+
+
+def test_rate_limited_client_gets_latest_per_packet_id():
+    async def run():
+        stream = frontend_api.ClientStream(QUEUE_SIZE=4, MAX_FPS=50)
+        for i in range(5):
+            stream.offer(frontend_api.TelemetryFrame(3, f"av_{i}", None, 0.0))
+        stream.offer(frontend_api.TelemetryFrame(6, "gse_0", None, 0.0))
+        stream.offer(frontend_api.TelemetryFrame(6, "gse_1", None, 0.0))
+        first = await stream.next_frames()
+
+        stream.offer(frontend_api.TelemetryFrame(3, "av_5", None, 0.0))
+        start = asyncio.get_running_loop().time()
+        second = await stream.next_frames()
+        waited = asyncio.get_running_loop().time() - start
+        return stream, first, second, waited
+
+    stream, first, second, waited = asyncio.run(run())
+    assert [frame.text for frame in first] == ["av_4", "gse_1"]
+    assert [frame.text for frame in second] == ["av_5"]
+    assert stream.coalesced == 5
+    # Second release waits out the rest of the 20 ms frame window
+    assert waited > 0.01
+
+
+def test_batched_client_gets_json_array():
+    async def run():
+        stream = frontend_api.ClientStream(QUEUE_SIZE=8, BATCH_WINDOW_S=0.01)
+        stream.offer(frontend_api.TelemetryFrame(3, '{"id": 3}', None, 0.0))
+        release = asyncio.create_task(stream.next_frames())
+        await asyncio.sleep(0)
+        # Arrives inside the window that opened with the first frame
+        stream.offer(frontend_api.TelemetryFrame(6, '{"id": 6}', None, 0.0))
+        return stream.wire_messages(await release)
+
+    messages = asyncio.run(run())
+    assert len(messages) == 1
+    assert [packet["id"] for packet in json.loads(messages[0])] == [3, 6]
+
+
+def test_late_joiner_gets_last_values_and_history():
+    broadcaster = frontend_api.TelemetryBroadcaster(
+        "ipc:///tmp/unused", 4, HISTORY_SIZE=3)
+    gse = frontend_api.PACKET_HANDLERS[7](wind_speed=4.0).SerializeToString()
+    broadcaster._handle_packet(7, gse, 1.0)
+    for i in range(4):
+        av = frontend_api.PACKET_HANDLERS[3](altitude=i).SerializeToString()
+        broadcaster._handle_packet(3, av, 2.0 + i)
+
+    stream = broadcaster.register()
+    frames = stream.initial_frames
+    for frame in frames:
+        frame.build(BINARY=False)
+    packets = [json.loads(frame.text) for frame in frames]
+
+    # GSE packet fell out of the history but is still the latest of its ID
+    assert [packet["id"] for packet in packets] == [7, 3, 3, 3]
+    assert [packet["data"]["altitude"] for packet in packets[1:]] == [1, 2, 3]
+
+
+def test_history_query_is_downsampled_off_the_loop(monkeypatch):
+    broadcaster = frontend_api.TelemetryBroadcaster(
+        "ipc:///tmp/unused", 4, STORE_ROWS=1000)
+    monkeypatch.setattr(frontend_api, "broadcaster", broadcaster)
+
+    def append(START, STOP):
+        for i in range(START, STOP):
+            av = frontend_api.PACKET_HANDLERS[3](altitude=i)
+            av.meta.timestamp_s = i / 10
+            broadcaster._handle_packet(3, av.SerializeToString(), 0.0)
+
+    async def run():
+        append(0, 500)
+        query = asyncio.create_task(frontend_api.history_response(
+            {"packetId": 3, "field": "altitude", "points": 50,
+             "requestId": 1}))
+        # The query has copied its slice and is waiting on its thread, live
+        # packets keep landing meanwhile
+        await asyncio.sleep(0)
+        append(500, 600)
+        return json.loads(await query)
+
+    response = asyncio.run(run())
+    assert response["id"] == "history"
+    assert response["data"]["requestId"] == 1
+    assert response["data"]["total"] == 500
+    assert len(response["data"]["v"]) == 50
+    assert response["data"]["v"][-1] == 499
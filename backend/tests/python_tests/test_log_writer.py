@@ -0,0 +1,112 @@
+import threading
+from backend.includes_python.log_writer import (
+    BackgroundLogWriter, BufferedCsvFile, CsvLogSet, FlushPolicy)
+
+
+def _lines(path) -> list:
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+def test_flushes_on_row_count(tmp_path):
+    path = tmp_path / "log.csv"
+    log_file = BufferedCsvFile(str(path), ["a", "b"], FlushPolicy(
+        FLUSH_ROWS=3, FLUSH_INTERVAL_S=100, FSYNC_INTERVAL_S=100))
+    assert _lines(path) == ["a,b"]
+
+    log_file.write_row([1, 2], NOW=0.0)
+    log_file.write_row([3, 4], NOW=0.0)
+    assert _lines(path) == ["a,b"]
+    log_file.write_row([5, 6], NOW=0.0)
+    assert _lines(path) == ["a,b", "1,2", "3,4", "5,6"]
+    log_file.close()
+
+
+def test_flushes_and_syncs_on_time(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr("os.fsync", synced.append)
+    path = tmp_path / "log.csv"
+    log_file = BufferedCsvFile(str(path), ["a"], FlushPolicy(
+        FLUSH_ROWS=100, FLUSH_INTERVAL_S=0.2, FSYNC_INTERVAL_S=1.0))
+    synced.clear()
+
+    log_file.write_row([1], NOW=10.0)
+    log_file.poll(NOW=10.1)
+    assert _lines(path) == ["a"]
+    log_file.poll(NOW=10.25)
+    assert _lines(path) == ["a", "1"]
+    assert synced == []
+
+    log_file.write_row([2], NOW=10.5)
+    log_file.poll(NOW=10.9)
+    assert synced == []
+    # Sync deadline follows the oldest unsynced row, not the latest
+    log_file.poll(NOW=11.0)
+    assert len(synced) == 1
+    assert _lines(path) == ["a", "1", "2"]
+
+    log_file.poll(NOW=20.0)
+    assert len(synced) == 1
+    log_file.close()
+
+
+def test_log_set_close_flushes(tmp_path):
+    logs = CsvLogSet(str(tmp_path), {"ONE": ["x"], "TWO": ["y", "z"]},
+                     FlushPolicy(FLUSH_ROWS=100, FLUSH_INTERVAL_S=100,
+                                 FSYNC_INTERVAL_S=100),
+                     TIME_COLUMN="timestamp_ms_log_time")
+    assert "ONE" in logs and "THREE" not in logs
+    logs.write_row("TWO", [1.5, 2, True])
+    assert _lines(tmp_path / "TWO.csv") == ["timestamp_ms_log_time,y,z"]
+
+    logs.close()
+    assert _lines(tmp_path / "TWO.csv") == [
+        "timestamp_ms_log_time,y,z", "1.5,2,True"]
+    assert _lines(tmp_path / "ONE.csv") == ["timestamp_ms_log_time,x"]
+
+
+def test_background_writer_writes_everything_on_close(tmp_path):
+    logs = CsvLogSet(str(tmp_path), {"ONE": ["x"]}, FlushPolicy())
+    writer = BackgroundLogWriter(logs, QUEUE_SIZE=1000)
+    for i in range(500):
+        assert writer.write_row("ONE", [i])
+    writer.close()
+
+    assert _lines(tmp_path / "ONE.csv") == ["x"] + [str(i) for i in range(500)]
+    assert "500 processed" in writer.stats_summary()
+
+
+class _StalledLogs:
+    """Log set stuck on a slow card until released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.rows = []
+
+    def __contains__(self, NAME):
+        return True
+
+    def write_row(self, NAME, ROW):
+        self.release.wait()
+        self.rows.append(ROW)
+
+    def poll(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_background_writer_drops_instead_of_blocking():
+    logs = _StalledLogs()
+    writer = BackgroundLogWriter(logs, QUEUE_SIZE=4, POLL_INTERVAL_S=0.01)
+    results = [writer.write_row("ONE", [i]) for i in range(20)]
+
+    # One row may already be stuck in the writer, the rest fill the queue
+    assert results.count(True) in (4, 5)
+    assert writer.dropped_total == results.count(False)
+    assert "dropped" in writer.stats_summary()
+
+    logs.release.set()
+    writer.close()
+    assert logs.rows == [[i] for i, ok in enumerate(results) if ok]
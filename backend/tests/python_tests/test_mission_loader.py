@@ -0,0 +1,49 @@
+import numpy as np
+from backend.replay_system.mission_loader import load_mission, merge_timelines
+from backend.replay_system.packet_type import PacketType
+
+
+def test_merge_matches_stable_sort():
+    rng = np.random.default_rng(7)
+    timelines = [np.sort(rng.integers(0, 50, size)).astype(float)
+                 for size in (40, 0, 25, 60)]
+    merged, source, index = merge_timelines(timelines)
+
+    everything = np.concatenate(timelines)
+    order = np.argsort(everything, kind="stable")
+    assert np.array_equal(merged, everything[order])
+    offsets = np.cumsum([0] + [len(t) for t in timelines])
+    assert np.array_equal(offsets[source] + index, order)
+
+
+def test_load_mission_types_and_order(tmp_path):
+    # Mission data is saved with a BOM
+    (tmp_path / "AV_TO_GCS_DATA_2.csv").write_text(
+        "﻿timestamp_ms,rssi,GPS_fix_flag,nav_status\n"
+        "5.0,-70.5,False,NA\n"
+        "20.0,-71,TRUE,FIX\n"
+        "35.5,-72,True,NA\n", encoding="utf-8")
+    # Out of order, quoted, and flags in a column of numbers
+    (tmp_path / "GSE_TO_GCS_DATA_1.csv").write_text(
+        'timestamp_ms,rssi,ignition_fired\n'
+        '35.5,"-60",False\n'
+        '20.0,-61,1\n'
+        '1.0,-62,0\n')
+    (tmp_path / "GSE_TO_GCS_DATA_3.csv").write_text("timestamp_ms,unused,,\n")
+
+    timeline = load_mission(str(tmp_path), 2.0)
+    packets = list(timeline)
+    assert [(p.timestamp_ms, p.packet_type) for p in packets] == [
+        (5.0, PacketType.AV_TO_GCS_DATA_2),
+        (20.0, PacketType.GSE_TO_GCS_DATA_1),
+        (20.0, PacketType.AV_TO_GCS_DATA_2),
+        (35.5, PacketType.GSE_TO_GCS_DATA_1),
+        (35.5, PacketType.AV_TO_GCS_DATA_2),
+    ]
+    assert packets[2].data == {"timestamp_ms": 20.0, "rssi": -71.0,
+                               "GPS_fix_flag": True, "nav_status": "FIX"}
+    assert packets[3].data["rssi"] == -60.0
+    # Mixed column falls back to strings, like csv.DictReader gave
+    assert packets[3].data["ignition_fired"] == "False"
+    assert timeline[-1] == packets[-1]
+    assert len(timeline[1:3]) == 2
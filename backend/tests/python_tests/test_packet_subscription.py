@@ -0,0 +1,67 @@
+import pytest
+import zmq
+import time
+from backend.includes_python.packet_subscription import (
+    DeliveredCounter, packet_ids_from_args, subscribe)
+
+
+def test_only_subscribed_ids_are_received():
+    context = zmq.Context()
+    pub = context.socket(zmq.PUB)
+    sub = context.socket(zmq.SUB)
+    try:
+        pub.bind("inproc://packet_subscription")
+        sub.connect("inproc://packet_subscription")
+        assert subscribe(sub, [7, 6, 6]) == [6, 7]
+        # Subscriptions reach the publisher asynchronously
+        while not sub.poll(10):
+            pub.send_multipart([bytes([6]), b"sync"])
+        while sub.poll(10):
+            sub.recv_multipart()
+
+        for packet_id in range(3, 8):
+            pub.send_multipart([bytes([packet_id]), bytes([packet_id]) * 4])
+        received = []
+        while sub.poll(50):
+            received.append(sub.recv_multipart())
+        assert received == [[b"\x06", b"\x06" * 4], [b"\x07", b"\x07" * 4]]
+    finally:
+        pub.close(0)
+        sub.close(0)
+        context.term()
+
+
+def test_packet_ids_from_args():
+    assert packet_ids_from_args(["--socket-path", "x"], [7, 3, 5]) == [3, 5, 7]
+    assert packet_ids_from_args(["--packet-ids", "7,6"], range(3, 8)) == [6, 7]
+    with pytest.raises(ValueError):
+        packet_ids_from_args(["--packet-ids", "2"], range(3, 8))
+    with pytest.raises(ValueError):
+        packet_ids_from_args(["--packet-ids", "six"], range(3, 8))
+    with pytest.raises(ValueError):
+        subscribe(None, [])
+
+
+def test_delivered_counter_counts_published_packets():
+    context = zmq.Context()
+    pub = context.socket(zmq.PUB)
+    pub.bind("inproc://delivered")
+    counter = DeliveredCounter("inproc://delivered", context).start()
+    try:
+        # Wait for the subscription to reach the publisher
+        while counter.total == 0:
+            pub.send_multipart([b"\x06", b"sync"])
+            time.sleep(0.01)
+        time.sleep(0.2)
+        before = counter.total
+        for packet_id in range(3, 8):
+            pub.send_multipart([bytes([packet_id]), b"payload"])
+        deadline = time.monotonic() + 5
+        while counter.total < before + 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert counter.total == before + 5
+        assert counter.rate() > 0
+    finally:
+        counter.stop()
+        pub.close(0)
+        context.term()
@@ -0,0 +1,114 @@
+import inspect
+import random
+import pytest
+import backend.device_emulator as device_emulator
+from backend.device_emulator import MockPacket
+from backend.includes_python.metric import Metric
+from backend.includes_python.payload_layout import (
+    Const, Flags, Float32, Int16, PayloadLayout, Padding)
+from cli.start_middleware import InterfaceType
+
+PACKET_TYPES = [
+    device_emulator.GCStoGSEStateCMD,
+    device_emulator.GCStoAVStateCMD,
+    device_emulator.GCStoGSEManualControl,
+    device_emulator.AVtoGCSData1,
+    device_emulator.AVtoGCSData2,
+    device_emulator.AVtoGCSData3,
+    device_emulator.GSEtoGCSData1,
+    device_emulator.GSEtoGCSData2,
+]
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    monkeypatch.setattr(MockPacket, "_INITIALISED", True)
+    monkeypatch.setattr(MockPacket, "_INTERFACE_TYPE", InterfaceType.TEST,
+                        raising=False)
+    monkeypatch.setattr(MockPacket, "_VALIDATE_PAYLOADS", False)
+
+
+def _random_arguments(packet_class, rng: random.Random) -> dict:
+    arguments = {}
+    for name, parameter in inspect.signature(
+            packet_class.__init__).parameters.items():
+        default = parameter.default
+        if default is inspect.Parameter.empty:
+            continue
+        if name == "FLIGHT_STATE_":
+            arguments[name] = rng.randint(0, 0b111)
+        elif name == "NAV_STATUS":
+            arguments[name] = rng.choice(Metric.POSSIBLE_NAV_VALUES)
+        elif isinstance(default, bool):
+            arguments[name] = rng.random() < 0.5
+        elif name.startswith("GAS_BOTTLE_WEIGHT"):
+            arguments[name] = rng.randint(0, 65_535)
+        elif name.startswith(("ACCEL", "GYRO")):
+            arguments[name] = rng.randint(-32_768, 32_767)
+        elif name in ("QW", "QX", "QY", "QZ"):
+            arguments[name] = rng.uniform(-1, 1)
+        else:
+            arguments[name] = rng.uniform(-1e5, 1e5)
+    return arguments
+
+
+@pytest.mark.parametrize("packet_class", PACKET_TYPES,
+                         ids=lambda packet_class: packet_class.__name__)
+def test_layout_matches_metric_encoders(settings, packet_class):
+    rng = random.Random(packet_class.ID)
+    for i in range(200):
+        packet = packet_class(
+            **({} if i == 0 else _random_arguments(packet_class, rng)))
+        for external in (False, True):
+            assert bytes(packet.get_payload_bytes(EXTERNAL=external)) == \
+                packet.metric_payload_bytes(EXTERNAL=external)
+
+
+def test_flags_pack_bits_most_significant_first():
+    layout = PayloadLayout([
+        Flags(("STATE", 3), "A", (0b10, 2), "B", "C"),
+        Flags(("STATE", 3), "A", (0b10, 2), "B", "C", INVERTED=True),
+    ])
+    values = {"STATE": 0b101, "A": True, "B": False, "C": True}
+    assert layout.pack(values) == bytes([0b10111001, 0b01000110])
+
+
+def test_byte_order_runs(settings):
+    # The TEST header is big endian, the AV_TO_GCS_DATA_2 body little endian
+    assert len(device_emulator.AVtoGCSData2.TEST_LAYOUT.structs) == 2
+    assert len(device_emulator.AVtoGCSData2.EXTERNAL_LAYOUT.structs) == 1
+    assert len(device_emulator.AVtoGCSData1.TEST_LAYOUT.structs) == 1
+
+    layout = PayloadLayout([Const(7), Float32("X", LITTLE_ENDIAN=True)])
+    assert layout.pack({"X": 1.0}) == b"\x07\x00\x00\x80\x3f"
+
+
+def test_pack_into_reused_buffer():
+    layout = PayloadLayout([Int16("A"), Padding(2), Int16("B")])
+    buffer = bytearray(b"\xff" * (layout.size + 2))
+    assert layout.pack_into(buffer, 2, {"A": -2, "B": 258}) == 6
+    # Pad bytes are cleared even when the buffer held something else
+    assert buffer == b"\xff\xff\xff\xfe\x00\x00\x01\x02"
+
+
+def test_out_of_range_raises_metric_error(settings):
+    packet = device_emulator.AVtoGCSData1(ACCEL_LOW_X=40_000)
+    with pytest.raises(ValueError, match="16-bit signed range"):
+        packet.get_payload_bytes()
+
+
+def test_debug_mode_runs_metric_checks(settings, monkeypatch):
+    # struct packs NaN happily, only the Metric checks refuse it
+    packet = device_emulator.GSEtoGCSData1(TRANSDUCER1=float("nan"))
+    packet.get_payload_bytes()
+
+    monkeypatch.setattr(MockPacket, "_VALIDATE_PAYLOADS", True)
+    with pytest.raises(ValueError, match="32-bit float"):
+        packet.get_payload_bytes()
+    device_emulator.GSEtoGCSData1().get_payload_bytes()
+
+
+def test_uart_length_counts_bytes(settings, monkeypatch):
+    monkeypatch.setattr(MockPacket, "_INTERFACE_TYPE", InterfaceType.TEST_UART)
+    payload = device_emulator.AVtoGCSData1(RSSI=-46, SNR=10).get_payload_bytes()
+    assert payload.startswith(b"+TEST: LEN:32, RSSI:-46, SNR:10\r\n")
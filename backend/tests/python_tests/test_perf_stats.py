@@ -0,0 +1,25 @@
+import pytest
+from backend.includes_python.perf_stats import LatencyStats, RateCounter
+
+
+def test_rate_counter_window():
+    counter = RateCounter()
+    counter.reset(NOW=10.0)
+    counter.add(50)
+    counter.add()
+
+    assert counter.rate(NOW=12.0) == pytest.approx(25.5)
+    counter.reset(NOW=12.0)
+    assert counter.count() == 0
+    assert counter.total == 51
+
+
+def test_latency_percentiles():
+    stats = LatencyStats(MAX_SAMPLES=100)
+    assert stats.percentile(99) == 0.0
+    for i in range(1, 101):
+        stats.add(i / 1000)
+
+    assert stats.percentile(50) == pytest.approx(0.050, abs=0.001)
+    assert stats.percentile(99) == pytest.approx(0.099, abs=0.001)
+    assert stats.max_s == pytest.approx(0.1)
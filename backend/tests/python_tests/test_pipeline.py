@@ -0,0 +1,47 @@
+import threading
+from backend.includes_python.pipeline import Stage
+
+
+def test_stage_processes_in_order_and_reports():
+    seen = []
+    stage = Stage("decode", seen.append, QUEUE_SIZE=100)
+    for i in range(50):
+        assert stage.submit(i)
+    stage.close()
+
+    assert seen == list(range(50))
+    summary = stage.stats_summary()
+    assert summary.startswith("decode: 50 processed")
+    assert "0 dropped" in summary
+    assert stage.stats_summary() is None
+
+
+def test_stage_survives_handler_errors(capsys):
+    seen = []
+
+    def handler(item):
+        if item == 1:
+            raise ValueError("bad packet")
+        seen.append(item)
+
+    stage = Stage("decode", handler)
+    for i in range(3):
+        stage.submit(i)
+    stage.close()
+
+    assert seen == [0, 2]
+    assert "<ERROR>:decode failed: bad packet" in capsys.readouterr().out
+
+
+def test_stage_drops_when_full_and_stops_cleanly():
+    release = threading.Event()
+    stopped = []
+    stage = Stage("persist", lambda _: release.wait(), QUEUE_SIZE=2,
+                  ON_STOP=lambda: stopped.append(True))
+    results = [stage.submit(i) for i in range(10)]
+
+    assert results.count(False) >= 7
+    assert stage.dropped_total == results.count(False)
+    release.set()
+    stage.close()
+    assert stopped == [True]
@@ -0,0 +1,53 @@
+import json
+import math
+from google.protobuf.json_format import MessageToDict
+import backend.frontend_api as frontend_api
+from backend.includes_python.proto_json import ProtoJsonEncoder
+import backend.proto.generated.AV_TO_GCS_DATA_1_pb2 as AV_TO_GCS_DATA_1_pb
+import backend.proto.generated.AV_TO_GCS_DATA_2_pb2 as AV_TO_GCS_DATA_2_pb
+import backend.proto.generated.GSE_TO_GCS_DATA_2_pb2 as GSE_TO_GCS_DATA_2_pb
+
+
+def _av_1() -> AV_TO_GCS_DATA_1_pb.AV_TO_GCS_DATA_1:
+    packet = AV_TO_GCS_DATA_1_pb.AV_TO_GCS_DATA_1()
+    packet.meta.rssi = -71.3
+    packet.meta.timestamp_s = 12.345
+    packet.meta.total_packet_count_av = 4096
+    packet.flightState = 3
+    packet.state_flags.GPS_fix_flag = True
+    packet.accel_low_x = 0.1
+    packet.gyro_z = float("nan")
+    packet.altitude = 1234.5
+    packet.velocity = -80.25
+    packet.broadcast_flag = False
+    return packet
+
+
+def test_encoder_matches_message_to_dict():
+    gse = GSE_TO_GCS_DATA_2_pb.GSE_TO_GCS_DATA_2()
+    gse.state_flags.SetInParent()
+    gse.gas_bottle_weight_1 = -3
+    gse.wind_speed = 3.4e38
+    gse.error_flags.load_cell_2_error = True
+    av_2 = AV_TO_GCS_DATA_2_pb.AV_TO_GCS_DATA_2()
+    av_2.navigation_status = 'GPS "3D" fix'
+    av_2.GPS_latitude = -37.80833
+
+    for packet in (_av_1(), gse, av_2):
+        encoder = ProtoJsonEncoder(type(packet))
+        assert encoder.encode(packet) == json.dumps(MessageToDict(packet))
+
+
+def test_encoder_appends_mach_number():
+    packet = _av_1()
+    data = json.loads(frontend_api.JSON_ENCODERS[3].encode(packet))
+
+    assert data["flightState"] == "COAST"
+    assert data["meta"]["totalPacketCountAv"] == "4096"
+    assert math.isclose(data["mach_number"], frontend_api.Mach.mach_from_alt_estimate(
+        VELOCITY_M=-80.25, ALTITUDE_M=1234.5))
+    assert list(data)[-1] == "mach_number"
+
+    packet.ClearField("velocity")
+    data = json.loads(frontend_api.JSON_ENCODERS[3].encode(packet))
+    assert "mach_number" not in data
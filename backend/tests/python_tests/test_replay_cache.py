@@ -0,0 +1,68 @@
+import os
+from cli.start_middleware import InterfaceType
+import backend.replay_system.replay_cache as replay_cache
+from backend.replay_system.packet_type import Packet, PacketType
+
+
+class _Item:
+    def __init__(self, PAYLOAD):
+        self.PAYLOAD = PAYLOAD
+
+    def get_payload_bytes(self):
+        return self.PAYLOAD
+
+
+def _build(packet):
+    if packet.packet_type == PacketType.GSE_TO_GCS_DATA_3:
+        return None
+    return _Item(bytes([packet.packet_type.value]) * int(packet.timestamp_ms))
+
+
+def _packets():
+    return [Packet(1.0, PacketType.AV_TO_GCS_DATA_1, {}),
+            Packet(2.0, PacketType.GSE_TO_GCS_DATA_3, {}),
+            Packet(3.0, PacketType.GSE_TO_GCS_DATA_2, {}),
+            Packet(4.0, PacketType.AV_TO_GCS_DATA_2, {})]
+
+
+def test_compile_and_load(tmp_path, monkeypatch):
+    monkeypatch.setattr(replay_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    (tmp_path / "mission").mkdir()
+    (tmp_path / "mission" / "AV_TO_GCS_DATA_1.csv").write_text("timestamp_ms\n1\n")
+    loads = []
+
+    def load():
+        loads.append(1)
+        return _packets()
+
+    for _ in range(2):
+        mission = replay_cache.load_compiled_mission(
+            str(tmp_path / "mission"), 1.0, InterfaceType.TEST, load, _build)
+        assert [(p.timestamp_ms, p.packet_type, bytes(p.payload))
+                for p in mission] == [
+            (3.0, PacketType.GSE_TO_GCS_DATA_2, b"\x02" * 3),
+            (4.0, PacketType.AV_TO_GCS_DATA_2, b"\x05" * 4)]
+    # Second run came from the cache
+    assert len(loads) == 1
+    assert bytes(mission[-1].payload) == b"\x05" * 4
+
+
+def test_cache_key_and_incomplete_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(replay_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    mission_path = tmp_path / "mission"
+    mission_path.mkdir()
+    (mission_path / "GSE_TO_GCS_DATA_2.csv").write_text("timestamp_ms\n1\n")
+    key = replay_cache.mission_hash(str(mission_path), InterfaceType.TEST)
+    assert key != replay_cache.mission_hash(
+        str(mission_path), InterfaceType.TEST_UART)
+    (mission_path / "GSE_TO_GCS_DATA_2.csv").write_text("timestamp_ms\n2\n")
+    assert key != replay_cache.mission_hash(str(mission_path), InterfaceType.TEST)
+
+    # Interrupted compile leaves its lock file behind
+    key = replay_cache.mission_hash(str(mission_path), InterfaceType.TEST)
+    os.makedirs(tmp_path / "cache" / key)
+    (tmp_path / "cache" / key / "building.lock").write_text("")
+    mission = replay_cache.load_compiled_mission(
+        str(mission_path), 0.0, InterfaceType.TEST, _packets, _build)
+    assert len(mission) == 3
+    assert not os.path.exists(tmp_path / "cache" / key / "building.lock")
@@ -0,0 +1,75 @@
+import json
+import numpy as np
+import pytest
+import zmq
+from backend.replay_system.replay_control import ReplayControl, packet_timestamps
+from backend.replay_system.packet_type import Packet, PacketType
+
+
+def test_seek_and_loop_positions():
+    control = ReplayControl(np.array([1.0, 2.0, 2.0, 5.0, 9.0]))
+    assert control.index_of(2.0) == 1
+    assert control.index_of(6.0) == 4
+    assert control.index_of(10.0) == 5
+
+    reply, changed = control.handle({"command": "seek", "timestamp_ms": 4})
+    assert changed and reply["ok"]
+    assert control.status()["timestamp_ms"] == 5.0
+    assert control.take_seek() == 3
+    assert control.take_seek() is None
+
+    control.position = 0
+
+    control.handle({"command": "loop", "start_ms": 2, "end_ms": 5})
+    # Position 0 is before the range, so it jumps in
+    assert control.take_seek() == 1
+    assert control.restart_position(3) is None
+    assert control.restart_position(4) == 1
+    control.handle({"command": "loop"})
+    assert control.restart_position(5) is None
+
+    with pytest.raises(ValueError):
+        control.handle({"command": "loop", "start_ms": 5, "end_ms": 2})
+    with pytest.raises(ValueError):
+        control.handle({"command": "rewind"})
+
+
+def test_loop_needs_two_packets_and_keeps_its_period():
+    control = ReplayControl(np.array([1.0, 2.0, 2.0, 5.0, 9.0]))
+    for start_ms, end_ms in ((3, 4), (5, 8), (9, 20)):
+        with pytest.raises(ValueError, match="two packets"):
+            control.handle({"command": "loop", "start_ms": start_ms,
+                            "end_ms": end_ms})
+    assert control.loop_range is None
+
+    control.handle({"command": "loop", "start_ms": 1.5, "end_ms": 6})
+    # 1 ms left after the packet at 5, then 0.5 ms before the one at 2
+    assert control.loop_gap_ms(5.0) == 1.5
+
+
+def test_packet_timestamps():
+    packets = [Packet(t, PacketType.AV_TO_GCS_DATA_1, {}) for t in (3, 4)]
+    assert packet_timestamps(packets).tolist() == [3.0, 4.0]
+
+
+def test_socket_round_trip():
+    address = "inproc://test_replay_control"
+    control = ReplayControl(np.array([1.0, 2.0]), address)
+    client = zmq.Context.instance().socket(zmq.REQ)
+    client.connect(address)
+    try:
+        changed = []
+
+        def request(REQUEST):
+            client.send_string(json.dumps(REQUEST))
+            while not client.poll(10):
+                changed.append(control.poll())
+            return json.loads(client.recv())
+
+        reply = request({"command": "pause"})
+        assert reply["ok"] and reply["paused"] and any(changed)
+        reply = request({"command": "seek"})
+        assert not reply["ok"] and "timestamp_ms" in reply["error"]
+    finally:
+        client.close()
+        control.close()
@@ -0,0 +1,101 @@
+import time
+import backend.replay_system.replay_engine as replay_engine
+from backend.replay_system.packet_type import Packet, PacketType
+from backend.replay_system.replay_control import ReplayControl, packet_timestamps
+
+
+def _record_sends(monkeypatch):
+    sent = []
+    monkeypatch.setattr(
+        replay_engine, "send_packet",
+        lambda packet: sent.append((time.monotonic(), packet)))
+    return sent
+
+
+def _packets(*TIMESTAMPS_MS):
+    return [Packet(t, PacketType.AV_TO_GCS_DATA_1, {"n": i})
+            for i, t in enumerate(TIMESTAMPS_MS)]
+
+
+def test_afap_keeps_order_without_waiting(monkeypatch):
+    sent = _record_sends(monkeypatch)
+    packets = _packets(1000, 600_000, 3_600_000)
+    start = time.monotonic()
+    replay_engine.replay_packets(packets, 1000, afap=True)
+
+    assert time.monotonic() - start < 0.5
+    assert [packet for _, packet in sent] == packets
+
+
+def test_speed_scales_spacing(monkeypatch):
+    sent = _record_sends(monkeypatch)
+    start = time.monotonic()
+    replay_engine.replay_packets(_packets(1000, 1500, 2000), 1000, speed=10)
+
+    offsets = [t - start for t, _ in sent]
+    # 0, 500 and 1000 ms of mission time at 10x
+    assert offsets[1] >= 0.05 and offsets[2] >= 0.1
+    assert offsets[2] < 0.5
+
+
+def test_min_gap_spaces_fast_replays(monkeypatch):
+    sent = _record_sends(monkeypatch)
+    # 2 ms apart when recorded, well under the gap once sped up
+    packets = _packets(1000, 1002, 1004, 1006)
+    replay_engine.replay_packets(packets, 1000, afap=True, min_gap_s=0.01)
+    replay_engine.replay_packets(packets, 1000, speed=10, min_gap_s=0.01)
+
+    times = [t for t, _ in sent]
+    for run in (times[:4], times[4:]):
+        assert all(b - a >= 0.01 for a, b in zip(run, run[1:]))
+
+
+def test_control_seek_and_loop(monkeypatch):
+    packets = _packets(1000, 2000, 3000, 4000, 5000)
+    control = ReplayControl(packet_timestamps(packets))
+    sent = []
+
+    def send(packet):
+        sent.append(packet.data["n"])
+        # Let the loop run twice then carry on to the end
+        if len(sent) == 5:
+            control.handle({"command": "loop"})
+    monkeypatch.setattr(replay_engine, "send_packet", send)
+
+    control.handle({"command": "seek", "timestamp_ms": 2000})
+    control.handle({"command": "loop", "start_ms": 2000, "end_ms": 3000})
+    replay_engine.replay_packets(packets, 1000, afap=True, control=control)
+
+    assert sent == [1, 2, 1, 2, 1, 2, 3, 4]
+
+
+def test_control_loop_waits_out_the_range(monkeypatch):
+    packets = _packets(1000, 1100)
+    control = ReplayControl(packet_timestamps(packets))
+    sent = []
+
+    def send(packet):
+        sent.append((time.monotonic(), packet.data["n"]))
+        if len(sent) == 4:
+            control.handle({"command": "loop"})
+    monkeypatch.setattr(replay_engine, "send_packet", send)
+
+    control.handle({"command": "loop", "start_ms": 1000, "end_ms": 1300})
+    replay_engine.replay_packets(packets, 1000, control=control)
+
+    assert [n for _, n in sent] == [0, 1, 0, 1]
+    # Restarts a whole 300 ms range after the previous pass began
+    assert 0.29 <= sent[2][0] - sent[0][0] < 0.5
+
+
+def test_control_seek_rebases_clock(monkeypatch):
+    sent = _record_sends(monkeypatch)
+    packets = _packets(1000, 1100, 600_000, 600_100)
+    control = ReplayControl(packet_timestamps(packets))
+    control.handle({"command": "seek", "timestamp_ms": 600_000})
+    start = time.monotonic()
+    replay_engine.replay_packets(packets, 1000, control=control)
+
+    # Jumped ten minutes in, then kept the 100 ms spacing
+    assert [packet.data["n"] for _, packet in sent] == [2, 3]
+    assert 0.09 <= sent[1][0] - start < 1.0
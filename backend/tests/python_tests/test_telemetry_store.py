@@ -0,0 +1,49 @@
+import math
+import numpy as np
+import backend.proto.generated.AV_TO_GCS_DATA_1_pb2 as AV_TO_GCS_DATA_1_pb
+from backend.includes_python.telemetry_store import TelemetryStore, lttb, m4
+
+
+def _store_with_ramp(ROWS: int, CAPACITY: int) -> TelemetryStore:
+    store = TelemetryStore({3: AV_TO_GCS_DATA_1_pb.AV_TO_GCS_DATA_1}, CAPACITY)
+    for i in range(ROWS):
+        packet = AV_TO_GCS_DATA_1_pb.AV_TO_GCS_DATA_1(altitude=i)
+        packet.meta.timestamp_s = i / 10
+        if i % 2:
+            packet.meta.rssi = -50
+        store.append(3, packet)
+    return store
+
+
+def test_store_ring_and_time_range():
+    store = _store_with_ramp(ROWS=150, CAPACITY=100)
+    result = store.query(3, "altitude", POINTS=1000)
+    # Oldest 50 rows were overwritten
+    assert math.isclose(result["t"][0], 5.0)
+    assert result["v"] == list(range(50, 150))
+
+    result = store.query(3, "altitude", START_S=10.0, END_S=12.0, POINTS=1000)
+    assert result["v"] == list(range(100, 121))
+
+    # Missing values are skipped rather than graphed as zero
+    assert store.query(3, "meta.rssi", POINTS=1000)["total"] == 50
+
+
+def test_downsamplers_keep_shape():
+    times = np.arange(10000, dtype=np.float64)
+    values = np.sin(times / 500)
+    values[4321] = 5.0
+
+    for downsample in (lttb, m4):
+        t, v = downsample(times, values, 200)
+        assert len(t) <= 200
+        assert t[0] == 0 and t[-1] == 9999
+        assert np.all(np.diff(t) > 0)
+        # Spikes survive both methods
+        assert 5.0 in v
+
+
+def test_store_skips_packets_without_a_timestamp():
+    store = _store_with_ramp(ROWS=10, CAPACITY=100)
+    store.append(3, AV_TO_GCS_DATA_1_pb.AV_TO_GCS_DATA_1(altitude=99))
+    assert store.query(3, "altitude", POINTS=1000)["v"] == list(range(10))
@@ -0,0 +1,87 @@
+# Micro-benchmark for the event viewer's protobuf -> CSV row extraction.
+# Compares the old recursive ListFields walk against the precompiled row plans
+# over every packet of a replay mission.
+# Run from repo root: PYTHONPATH=. python backend/tools/benchmark_csv_rows.py [mission]
+import csv
+import os
+import sys
+import timeit
+
+import backend.includes_python.csv_layout as csv_layout
+
+MISSION_PATH = os.path.join("backend", "replay_system", "mission_data")
+REPEATS = 5
+
+
+def _is_repeated(field) -> bool:
+    # FieldDescriptor.label is gone in protobuf 7
+    if hasattr(field, "is_repeated"):
+        return field.is_repeated
+    return field.label == field.LABEL_REPEATED
+
+
+def extract_proto_values(proto) -> list:
+    """What event_viewer._log_to_csv did before the row plans"""
+    values = []
+    for field, value in proto.ListFields():
+        if _is_repeated(field):
+            for item in value:
+                if field.type == field.TYPE_MESSAGE:
+                    values.extend(extract_proto_values(item))
+                else:
+                    values.append(item)
+        else:
+            if field.type == field.TYPE_MESSAGE:
+                values.extend(extract_proto_values(value))
+            else:
+                values.append(value)
+    return values
+
+
+def load_mission(MISSION: str) -> dict:
+    """Packet name -> parsed messages of every row in the mission CSVs"""
+    messages = {}
+    for name in csv_layout.MESSAGE_CLASSES:
+        path = os.path.join(MISSION_PATH, MISSION, f"{name}.csv")
+        if not os.path.exists(path):
+            continue
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            messages[name] = [csv_layout.row_to_message(name, row)
+                              for row in csv.DictReader(f)]
+    return messages
+
+
+def main():
+    mission = sys.argv[1] if len(sys.argv) > 1 else "20250504"
+    messages = load_mission(mission)
+    print(f"{'packet':<20}{'rows':>8}{'recursive us':>14}{'plan us':>10}"
+          f"{'speedup':>10}{'short rows':>12}")
+    total_reference_s = total_plan_s = 0.0
+    for name, packets in messages.items():
+        if not packets:
+            continue
+        plan = csv_layout.row_plan(name)
+        width = len(plan.headers)
+        # Rows that no longer line up with the headers
+        short_rows = sum(len(extract_proto_values(p)) != width for p in packets)
+        assert all(len(plan.row(p)) == width for p in packets)
+
+        reference_s = min(timeit.repeat(
+            lambda: [extract_proto_values(p) for p in packets],
+            number=1, repeat=REPEATS))
+        plan_s = min(timeit.repeat(
+            lambda: [plan.row(p) for p in packets],
+            number=1, repeat=REPEATS))
+        total_reference_s += reference_s
+        total_plan_s += plan_s
+        print(f"{name:<20}{len(packets):>8}"
+              f"{reference_s / len(packets) * 1e6:>14.2f}"
+              f"{plan_s / len(packets) * 1e6:>10.2f}"
+              f"{reference_s / plan_s:>9.1f}x{short_rows:>12}")
+    print(f"{'total ms':<28}{total_reference_s * 1e3:>14.1f}"
+          f"{total_plan_s * 1e3:>10.1f}"
+          f"{total_reference_s / total_plan_s:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# Micro-benchmark for building emulator payloads.
+# Compares the Metric fragment encoders against the precompiled struct layouts,
+# through get_payload_bytes() and encoding into one reused buffer, for the
+# TEST and TEST_UART interface formats.
+# Run from repo root: PYTHONPATH=. python backend/tools/benchmark_payload_layout.py
+import timeit
+
+import backend.device_emulator as device_emulator
+from backend.device_emulator import MockPacket
+from cli.start_middleware import InterfaceType
+
+ITERATIONS = 20000
+
+PACKET_TYPES = [
+    device_emulator.GCStoAVStateCMD,
+    device_emulator.GCStoGSEStateCMD,
+    device_emulator.AVtoGCSData1,
+    device_emulator.AVtoGCSData2,
+    device_emulator.AVtoGCSData3,
+    device_emulator.GSEtoGCSData1,
+    device_emulator.GSEtoGCSData2,
+]
+
+
+def reference_uart(packet) -> bytes:
+    """What get_payload_bytes() did for TEST_UART before encode_into()"""
+    data = packet.metric_payload_bytes(EXTERNAL=True)
+    return (f"+TEST: LEN:{len(data)}, RSSI:{int(round(packet.RSSI))}, "
+            f"SNR:{int(round(packet.SNR))}\r\n+TEST: RX\n"
+            f'"{data.hex()}"\r\n').encode('ascii')
+
+
+def reference_test(packet) -> bytes:
+    return packet.metric_payload_bytes()
+
+
+def main():
+    MockPacket.initialize_settings(
+        {"noise_coefficient": 0.0, "packet_loss": 0.0})
+    for interface_type, reference in ((InterfaceType.TEST, reference_test),
+                                      (InterfaceType.TEST_UART, reference_uart)):
+        MockPacket._INTERFACE_TYPE = interface_type
+        print(f"\n{interface_type.name}")
+        benchmark(reference)
+
+
+def benchmark(reference):
+    print(f"{'packet':<18}{'fragments us':>14}{'layout us':>11}"
+          f"{'reused us':>11}{'speedup':>10}")
+    for packet_class in PACKET_TYPES:
+        packet = packet_class()
+        buffer = bytearray(packet.buffer_size())
+        assert reference(packet) == packet.get_payload_bytes(), \
+            "Encoders disagree"
+
+        reference_s = timeit.timeit(
+            lambda: reference(packet), number=ITERATIONS)
+        layout_s = timeit.timeit(
+            packet.get_payload_bytes, number=ITERATIONS)
+        reused_s = timeit.timeit(
+            lambda: packet.encode_into(buffer), number=ITERATIONS)
+        print(f"{packet_class.__name__:<18}"
+              f"{reference_s / ITERATIONS * 1e6:>14.2f}"
+              f"{layout_s / ITERATIONS * 1e6:>11.2f}"
+              f"{reused_s / ITERATIONS * 1e6:>11.2f}"
+              f"{reference_s / reused_s:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
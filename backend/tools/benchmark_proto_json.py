@@ -0,0 +1,69 @@
+# Micro-benchmark for the websocket JSON encoding in frontend_api.
+# Compares json.dumps(MessageToDict()) against the precompiled encoders.
+# Run from repo root: PYTHONPATH=. python backend/tools/benchmark_proto_json.py
+import json
+import random
+import timeit
+
+from google.protobuf.descriptor import FieldDescriptor
+from google.protobuf.json_format import MessageToDict
+
+import backend.frontend_api as frontend_api
+
+ITERATIONS = 20000
+
+
+def fill_message(message) -> None:
+    """Set every field to something plausible, like a full radio packet"""
+    for field in message.DESCRIPTOR.fields:
+        if field.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+            fill_message(getattr(message, field.name))
+        elif field.cpp_type == FieldDescriptor.CPPTYPE_FLOAT:
+            setattr(message, field.name, random.uniform(-500, 5000))
+        elif field.cpp_type == FieldDescriptor.CPPTYPE_BOOL:
+            setattr(message, field.name, random.random() < 0.5)
+        elif field.cpp_type == FieldDescriptor.CPPTYPE_ENUM:
+            setattr(message, field.name, random.choice(
+                field.enum_type.values).number)
+        elif field.cpp_type == FieldDescriptor.CPPTYPE_STRING:
+            setattr(message, field.name, "GPS LOCK")
+        else:
+            setattr(message, field.name, random.randint(0, 100000))
+
+
+def reference_encode(packet_id: int, message) -> str:
+    """What frontend_api did before the precompiled encoders"""
+    data = MessageToDict(message)
+    if packet_id == 3:
+        data["mach_number"] = frontend_api.Mach.mach_from_alt_estimate(
+            VELOCITY_M=data["velocity"], ALTITUDE_M=data["altitude"])
+    return json.dumps({"id": packet_id, "data": data})
+
+
+def fast_encode(packet_id: int, message) -> str:
+    data = frontend_api.JSON_ENCODERS[packet_id].encode(message)
+    return f'{{"id": {packet_id}, "data": {data}}}'
+
+
+def main():
+    random.seed(0)
+    print(f"{'packet':<20}{'MessageToDict us':>18}{'precompiled us':>16}"
+          f"{'speedup':>10}")
+    for packet_id, message_class in frontend_api.PACKET_HANDLERS.items():
+        message = message_class()
+        fill_message(message)
+        assert reference_encode(packet_id, message) == \
+            fast_encode(packet_id, message), "Encoders disagree"
+
+        reference_s = timeit.timeit(
+            lambda: reference_encode(packet_id, message), number=ITERATIONS)
+        fast_s = timeit.timeit(
+            lambda: fast_encode(packet_id, message), number=ITERATIONS)
+        print(f"{message_class.DESCRIPTOR.name:<20}"
+              f"{reference_s / ITERATIONS * 1e6:>18.2f}"
+              f"{fast_s / ITERATIONS * 1e6:>16.2f}"
+              f"{reference_s / fast_s:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
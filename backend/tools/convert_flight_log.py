@@ -0,0 +1,36 @@
+# Convert between binary flight logs and the event viewer CSV layout.
+# Run from repo root, e.g.
+#   PYTHONPATH=. python backend/tools/convert_flight_log.py to-csv logs/<session>/flight_log.flog out_dir
+#   PYTHONPATH=. python backend/tools/convert_flight_log.py from-csv backend/replay_system/mission_data/20250504 mission.flog
+import argparse
+import time
+
+from backend.includes_python.flight_log import csv_to_flight_log, flight_log_to_csv
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert between flight logs (.flog) and CSV directories")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    to_csv = subparsers.add_parser(
+        "to-csv", help="Write a flight log out as one CSV per packet type")
+    to_csv.add_argument("flight_log")
+    to_csv.add_argument("csv_dir")
+    from_csv = subparsers.add_parser(
+        "from-csv", help="Pack event viewer logs or mission data into a flight log")
+    from_csv.add_argument("csv_dir")
+    from_csv.add_argument("flight_log")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "to-csv":
+        count = flight_log_to_csv(args.flight_log, args.csv_dir)
+        print(f"Wrote {count} rows to {args.csv_dir}", end="")
+    else:
+        count = csv_to_flight_log(args.csv_dir, args.flight_log)
+        print(f"Wrote {count} frames to {args.flight_log}", end="")
+    print(f" in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
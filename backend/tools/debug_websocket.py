@@ -1,17 +1,52 @@
 import asyncio
+import base64
+import sys
 import websockets
 import json
+from google.protobuf import descriptor_pb2, descriptor_pool, message_factory
+from google.protobuf.json_format import MessageToDict
 
+# Pass --binary to use the protobuf subprotocol instead of JSON frames
+BINARY_SUBPROTOCOL = "gcs.protobuf.v1"
 
-async def pretty_print_json(uri):
+
+def load_schema(SCHEMA: dict) -> dict:
+    """Build packet ID -> message class from the server's schema message"""
+    descriptor_set = descriptor_pb2.FileDescriptorSet.FromString(
+        base64.b64decode(SCHEMA["fileDescriptorSet"]))
+    pool = descriptor_pool.DescriptorPool()
+    for file_proto in descriptor_set.file:
+        pool.Add(file_proto)
+    return {
+        int(packet_id): message_factory.GetMessageClass(
+            pool.FindMessageTypeByName(name))
+        for packet_id, name in SCHEMA["packets"].items()
+    }
+
+
+async def pretty_print_json(uri, BINARY=False):
+    subprotocols = [BINARY_SUBPROTOCOL] if BINARY else None
     while True:
         try:
-            async with websockets.connect(uri) as websocket:
+            async with websockets.connect(uri, subprotocols=subprotocols) as websocket:
                 print(f"Connected to {uri}")
+                packet_classes = {}
                 while True:
                     message = await websocket.recv()
+                    if isinstance(message, bytes):
+                        packet_id = message[0]
+                        if packet_id not in packet_classes:
+                            print(f"No schema for packet ID {packet_id}")
+                            continue
+                        packet = packet_classes[packet_id].FromString(
+                            message[1:])
+                        print(f"{packet_id} ({len(message)} bytes):")
+                        print(json.dumps(MessageToDict(packet), indent=4))
+                        continue
                     try:
                         json_data = json.loads(message)
+                        if json_data.get("id") == "schema":
+                            packet_classes = load_schema(json_data["data"])
                         print(json.dumps(json_data, indent=4))
                     except json.JSONDecodeError:
                         print("Non-JSON message received:")
@@ -22,4 +57,4 @@ async def pretty_print_json(uri):
 
 if __name__ == "__main__":
     uri = "ws://localhost:1887"
-    asyncio.run(pretty_print_json(uri))
+    asyncio.run(pretty_print_json(uri, BINARY='--binary' in sys.argv))
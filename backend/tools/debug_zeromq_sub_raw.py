@@ -4,6 +4,7 @@ from datetime import datetime
 import signal
 import hashlib
 import backend.includes_python.ansci as ansci
+import backend.includes_python.packet_subscription as packet_subscription
 import backend.proto.generated.AV_TO_GCS_DATA_2_pb2 as AV_TO_GCS_DATA_2_pb
 
 # Subscribes to the ZeroMQ PUB socket and prints received messages in hex and ASCII format
@@ -33,7 +34,7 @@ def signal_handler(sig, frame):
     exit(0)
 
 
-def main(socket_path):
+def main(socket_path, packet_ids=None):
     context = zmq.Context()
     sub_socket = context.socket(zmq.SUB)
 
@@ -47,49 +48,36 @@ def main(socket_path):
         print(f"Connection error: {e}")
         return
 
-    sub_socket.setsockopt_string(zmq.SUBSCRIBE, '')
+    if packet_ids:
+        packet_subscription.subscribe(sub_socket, packet_ids)
+    else:
+        # Everything, including IDs the other services don't know about
+        sub_socket.setsockopt_string(zmq.SUBSCRIBE, '')
 
     signal.signal(signal.SIGINT, signal_handler)
 
     print("Listening for messages...")
 
-    last_item = "UNINITIALISED"
-
     while True:
         try:
-            message = sub_socket.recv(flags=zmq.NOBLOCK)
-            if len(message) == 0:
-                if last_item != "DATA" and last_item != "UNINITIALISED":
-                    match last_item:
-                        case "ID":
-                            print(ansci.FG_RED +
-                                  f"MISSING:DATA ^^" + ansci.RESET)
-                        case "DATA":
-                            print(ansci.FG_RED +
-                                  f"MISSING:ID ^^" + ansci.RESET)
-                        case "NOTHING":
-                            print(ansci.FG_RED +
-                                  f"MISSING:?? ^^" + ansci.RESET)
-                last_item = "NOTHING"
-                color = ansci.BG_RED
-            elif len(message) == 1:
-                if last_item != "DATA" and last_item != "UNINITIALISED":
-                    print(ansci.FG_RED + "LOST DATA ^^" + ansci.RESET)
-                last_item = "ID"
-                color = ansci.BG_BLUE
-            else:
-                if last_item != "ID" and last_item != "UNINITIALISED":
-                    print(ansci.FG_RED + "LOST ID ^^" + ansci.RESET)
-                last_item = "DATA"
-                color = ansci.BG_GREEN
-
+            # The middleware publishes the packet ID and payload as one
+            # multipart message
+            parts = sub_socket.recv_multipart(flags=zmq.NOBLOCK)
             timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-            hex_data = format_hex(message)
-            sha_data = get_sha(message)
+            if len(parts) != 2 or len(parts[0]) != 1:
+                print(ansci.FG_RED +
+                      f"[{timestamp}] MALFORMED: {len(parts)} parts" + ansci.RESET)
+                for part in parts:
+                    print(f"({get_sha(part)}) {format_hex(part)}")
+                continue
+
+            packet_id = parts[0][0]
+            message = parts[1]
             print(
-                f"[{timestamp}] {color}Received {len(message)} bytes:{ansci.RESET}")
-            print(f"({sha_data}) {hex_data}")
-            if len(message) > 1:
+                f"[{timestamp}] {ansci.BG_BLUE}ID {packet_id}{ansci.RESET} "
+                f"{ansci.BG_GREEN}Received {len(message)} bytes:{ansci.RESET}")
+            print(f"({get_sha(message)}) {format_hex(message)}")
+            if packet_id == 4:
                 try:
                     data = AV_TO_GCS_DATA_2_pb.AV_TO_GCS_DATA_2()
                     data.ParseFromString(message)
@@ -107,6 +95,9 @@ if __name__ == "__main__":
     parser.add_argument("socket_path",
                         help="Base socket path name used in the C++ program (without _pub.sock)",
                         default="gcs_rocket")
+    parser.add_argument("--packet-ids",
+                        help="Comma separated packet IDs to subscribe to, default all",
+                        type=lambda ids: [int(i) for i in ids.split(",")])
     args = parser.parse_args()
 
-    main(args.socket_path)
+    main(args.socket_path, args.packet_ids)
@@ -0,0 +1,63 @@
+import argparse
+import configparser
+import json
+import zmq
+
+# Sends pause/resume/seek/loop commands to a running replay and prints its state
+# Run from the repo root, e.g. python backend/tools/replay_control.py seek 1400000
+
+
+def default_address():
+    cfg = configparser.ConfigParser()
+    cfg.read("config/replay.ini")
+    return cfg.get("Control", "control_socket", fallback="")
+
+
+def build_request(args):
+    match args.command:
+        case "seek":
+            return {"command": "seek", "timestamp_ms": args.timestamp_ms}
+        case "loop":
+            if args.range == ["off"]:
+                return {"command": "loop"}
+            if len(args.range) != 2:
+                raise SystemExit("loop takes START_MS END_MS, or off")
+            start_ms, end_ms = (float(value) for value in args.range)
+            return {"command": "loop", "start_ms": start_ms, "end_ms": end_ms}
+        case _:
+            return {"command": args.command}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Control a running replay")
+    parser.add_argument('--address', default=default_address(),
+                        help="Replay control socket, defaults to config/replay.ini")
+    parser.add_argument('--timeout-ms', type=int, default=2000)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("pause")
+    commands.add_parser("resume")
+    commands.add_parser("status")
+    seek = commands.add_parser("seek", help="Jump to a recorded time")
+    seek.add_argument("timestamp_ms", type=float)
+    loop = commands.add_parser("loop", help="Loop START_MS END_MS, or off")
+    loop.add_argument("range", nargs="+")
+    args = parser.parse_args()
+    if not args.address:
+        raise SystemExit("No replay control socket configured")
+
+    context = zmq.Context()
+    socket = context.socket(zmq.REQ)
+    socket.setsockopt(zmq.LINGER, 0)
+    socket.connect(args.address)
+    try:
+        socket.send_string(json.dumps(build_request(args)))
+        if not socket.poll(args.timeout_ms):
+            raise SystemExit(f"No reply from replay on {args.address}")
+        print(json.dumps(json.loads(socket.recv()), indent=2))
+    finally:
+        socket.close()
+        context.term()
+
+
+if __name__ == "__main__":
+    main()
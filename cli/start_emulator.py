@@ -1,4 +1,5 @@
 import logging
+from typing import Optional
 import cli.proccess as process
 import cli.start_middleware as start_middleware
 
@@ -6,7 +7,9 @@ import cli.start_middleware as start_middleware
 def start_fake_serial_device_emulator(logger: logging.Logger, DEVICE: str,
                                       INTERFACE_TYPE: start_middleware.InterfaceType,
                                       experimental: bool,
-                                      corruption: bool) -> None:
+                                      corruption: bool,
+                                      stress_rate: Optional[float] = None,
+                                      SOCKET_PATH: Optional[str] = None) -> None:
     SERVICE_NAME = "device emulator"
     try:
 
@@ -21,6 +24,12 @@ def start_fake_serial_device_emulator(logger: logging.Logger, DEVICE: str,
         if corruption:
             EMULATOR_COMMAND.append("--corruption")
 
+        if stress_rate:
+            EMULATOR_COMMAND.extend(["--rate", str(stress_rate)])
+            # Lets the stress test report what the middleware publishes
+            if SOCKET_PATH:
+                EMULATOR_COMMAND.extend(["--socket-path", SOCKET_PATH])
+
         logger.debug(
             f"Starting {SERVICE_NAME} module with: {EMULATOR_COMMAND} with interface type: {INTERFACE_TYPE}")
 
@@ -38,7 +38,9 @@ def get_mission_path(mission: Optional[str]) -> str:
     return mission
 
 
-def start_replay_system(logger: logging.Logger, DEVICE: str, MISSION: Optional[str] = None, SIMULATION: Optional[str] = None):
+def start_replay_system(logger: logging.Logger, DEVICE: str, MISSION: Optional[str] = None, SIMULATION: Optional[str] = None,
+                        SPEED: float = 1.0, AFAP: bool = False,
+                        SOCKET_PATH: Optional[str] = None):
     """Starts the replay system either in simulation mode or mission mode
 
     Args:
@@ -46,6 +48,10 @@ def start_replay_system(logger: logging.Logger, DEVICE: str, MISSION: Optional[s
         DEVICE: device
         MISSION: Mission directory name
         SIMULATION: Simuation type
+        SPEED: Replay clock multiplier
+        AFAP: Send as fast as possible, ignoring the recorded times
+        SOCKET_PATH: Middleware socket name, lets the replay report how many
+            packets the middleware published
     """
     SERVICE_NAME = "replay system"
     try:
@@ -64,6 +70,12 @@ def start_replay_system(logger: logging.Logger, DEVICE: str, MISSION: Optional[s
         elif SIMULATION:
             REPLAY_COMMAND.extend(
                 ["--mode", "simulation", "--simulation", SIMULATION])
+        if AFAP:
+            REPLAY_COMMAND.append("--afap")
+        elif SPEED != 1.0:
+            REPLAY_COMMAND.extend(["--speed", str(SPEED)])
+        if SOCKET_PATH:
+            REPLAY_COMMAND.extend(["--socket-path", SOCKET_PATH])
 
         logger.debug(
             f"Starting {SERVICE_NAME} module with: {REPLAY_COMMAND}"
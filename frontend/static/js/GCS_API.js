@@ -272,6 +272,11 @@ function API_socketConnect() {
         logMessage("Successfully connected", "ws");
         clearTimeout(reconnectTimeout);
         reconnectInterval = initialReconnectInterval;
+
+        // Fill the graphs with what was missed
+        if (typeof graphRequestHistory === "function") {
+            graphRequestHistory();
+        }
     };
 
     // Socket received message
@@ -319,11 +324,29 @@ API_socketConnect();
 function API_OnMessage(event) {
     if (logIncomingMessages) console.log('Message from server:', event.data);
 
-    let apiLatest, apiData;
+    let apiMessage;
     try {
-        // Handle incoming data
-        apiLatest = JSON.parse(event.data);
+        apiMessage = JSON.parse(event.data);
+    } catch (error) {
+        console.error("Data processing error:", error);
+        return;
+    }
 
+    if (apiMessage?.id === "history") {
+        // Reply to apiRequestHistory
+        apiHandleHistory(apiMessage.data);
+    } else if (Array.isArray(apiMessage)) {
+        // Batched frames arrive as an array of packets
+        apiMessage.forEach(API_HandlePacket);
+    } else {
+        API_HandlePacket(apiMessage);
+    }
+}
+
+// Handle a single packet from the API socket
+function API_HandlePacket(apiLatest) {
+    let apiData;
+    try {
         // Flag data for errors
         checkErrorConditions(apiLatest.data);
 
@@ -734,3 +757,39 @@ function apiSendCameraSwitch() {
         console.warn('WebSocket not open. ReadyState:', apiSocket.readyState);
     }
 }
+
+// Pending history queries, keyed by request ID
+const historyCallbacks = {};
+var historyRequestId = 0;
+
+function apiRequestHistory(packetId, field, callback, options = {}) {
+    // Ask the server for a downsampled time series of one field
+    // options: start, end (meta.timestampS seconds), points, method ("lttb" or "m4")
+    // callback receives {t: [...], v: [...], total, ...} or {error: "..."}
+    const requestId = ++historyRequestId;
+    const packet = JSON.stringify({
+        id: "history",
+        data: {
+            requestId: requestId,
+            packetId: packetId,
+            field: field,
+            ...options,
+        }
+    });
+
+    if (apiSocket.readyState === WebSocket.OPEN) {
+        historyCallbacks[requestId] = callback;
+        apiSocket.send(packet);
+    } else {
+        console.warn('WebSocket not open. ReadyState:', apiSocket.readyState);
+    }
+}
+
+function apiHandleHistory(data) {
+    // Hand a history reply to whoever asked for it
+    const callback = historyCallbacks[data?.requestId];
+    if (callback == undefined) return;
+    delete historyCallbacks[data.requestId];
+    if (data.error) console.warn("History request failed:", data.error);
+    callback(data);
+}
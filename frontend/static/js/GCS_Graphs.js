@@ -9,6 +9,8 @@
 const MAX_TIME = 20; // Seconds of graph shown, TODO: load config
 const GRAPH_GAP_SIZE = 4; // Max time between data points where line is drawn
 const GRAPH_TICKS_Y = 8;
+const GRAPH_MAX_POINTS = 5000; // Per line, in case packets come in faster than the graphs render
+const GRAPH_HISTORY_POINTS = 200; // Per line, loaded from the server on connect
 
 // DEFINE CHARTS
 const LINE_COLOURS = [
@@ -75,6 +77,30 @@ const GRAPH_AUX_GASBOTTLES = {
     ylabel: "Mass (kg)",
 };
 
+// Server history to fill each graph line with on connect
+// Acceleration history is the high range sensor only, live values switch to the low range one near zero
+const GRAPH_HISTORY = [
+    { graph: GRAPH_AV_ACCEL, line: 0, packetId: 3, field: "accelHighX" },
+    { graph: GRAPH_AV_ACCEL, line: 1, packetId: 3, field: "accelHighY" },
+    { graph: GRAPH_AV_ACCEL, line: 2, packetId: 3, field: "accelHighZ" },
+    { graph: GRAPH_AV_GYRO, line: 0, packetId: 3, field: "gyroX" },
+    { graph: GRAPH_AV_GYRO, line: 1, packetId: 3, field: "gyroY" },
+    { graph: GRAPH_AV_GYRO, line: 2, packetId: 3, field: "gyroZ" },
+    { graph: GRAPH_AV_VELOCITY, line: 0, packetId: 3, field: "velocity" },
+    { graph: GRAPH_POS_ALT, line: 0, packetId: 3, field: "altitude", convert: metresToFeet },
+    { graph: GRAPH_AUX_TRANSDUCERS, line: 0, packetId: 6, field: "transducer1" },
+    { graph: GRAPH_AUX_TRANSDUCERS, line: 1, packetId: 6, field: "transducer2" },
+    { graph: GRAPH_AUX_TRANSDUCERS, line: 2, packetId: 6, field: "transducer3" },
+    { graph: GRAPH_AUX_THERMOCOUPLES, line: 0, packetId: 6, field: "thermocouple1" },
+    { graph: GRAPH_AUX_THERMOCOUPLES, line: 1, packetId: 6, field: "thermocouple2" },
+    { graph: GRAPH_AUX_THERMOCOUPLES, line: 2, packetId: 6, field: "thermocouple3" },
+    { graph: GRAPH_AUX_THERMOCOUPLES, line: 3, packetId: 6, field: "thermocouple4" },
+    { graph: GRAPH_AUX_INTERNALTEMP, line: 0, packetId: 7, field: "internalTemp" },
+    { graph: GRAPH_AUX_GASBOTTLES, line: 0, packetId: 7, field: "gasBottleWeight1" },
+    { graph: GRAPH_AUX_GASBOTTLES, line: 1, packetId: 7, field: "gasBottleWeight2" },
+];
+var graphHistoryPending = false;
+
 const symbolCircle = d3.symbol()
     .type(d3.symbolCircle)
     .size(10);
@@ -376,9 +402,49 @@ function graphAddValue(graph, line, timestamp, value) {
     }
     data.splice(index, 0, point);
 
+    // Rendering trims the data to the graph window, but doesn't run while the page is hidden
+    const windowStart = data[data.length - 1].x - MAX_TIME - GRAPH_GAP_SIZE;
+    let stale = 0;
+    while (stale < data.length && data[stale].x < windowStart) {
+        stale++;
+    }
+    stale = Math.max(stale, data.length - GRAPH_MAX_POINTS);
+    if (stale > 0) data.splice(0, stale);
+
     //graph.lines[line].data.push({ x: timestamp, y: value});
 }
 
+function graphRequestHistory() {
+    // Fill the graphs with the server's recent history, so they aren't empty after a (re)connect
+    if (typeof apiRequestHistory !== "function" || graphHistoryPending) return;
+    graphHistoryPending = true;
+    graphAwaitHistory();
+}
+
+function graphAwaitHistory() {
+    // The first packet after connecting says how recent the history needs to be
+    if (timestampApiConnect == undefined) {
+        setTimeout(graphAwaitHistory, 100);
+        return;
+    }
+    graphHistoryPending = false;
+    const start = timestampApi - MAX_TIME - GRAPH_GAP_SIZE;
+
+    GRAPH_HISTORY.forEach((history) => {
+        apiRequestHistory(history.packetId, history.field, (data) => {
+            if (data.error || !data.t || !history.graph?.lines) return;
+            // Live packets already cover the rest
+            const lineData = history.graph.lines[history.line].data;
+            const firstLive = lineData.length ? lineData[0].x : Infinity;
+            data.t.forEach((timestamp, i) => {
+                if (timestamp >= firstLive) return;
+                const value = history.convert ? history.convert(data.v[i]) : data.v[i];
+                graphAddValue(history.graph, history.line, timestamp, value);
+            });
+        }, { start: start, points: GRAPH_HISTORY_POINTS });
+    });
+}
+
 window.addEventListener("DOMContentLoaded", function () {
     // Build D3 chart
     graphCreateLine(GRAPH_AV_ACCEL, 3);
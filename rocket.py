@@ -105,7 +105,11 @@ def cli_decorator_factory(SELECTOR: DecoratorSelector):
         click.option('--mission', type=_MISSION_CHOICES,
                      help="Select what mission to replay (required for mission mode)"),
         click.option('-s', '--simulation', type=_SIMULATION_CHOICES,
-                     help="Select simulation type (required for simulation mode)")
+                     help="Select simulation type (required for simulation mode)"),
+        click.option('--speed', type=click.FloatRange(min=0, min_open=True),
+                     default=1.0, help="Replay speed multiplier, e.g. 10 for 10x real time"),
+        click.option('--afap', is_flag=True,
+                     help="Replay as fast as possible, keeping only packet order")
     ]
 
     OPTIONS_ALL_DEV = OPTIONS_SIM + OPTIONS_GSE_ONLY + [
@@ -118,7 +122,9 @@ def cli_decorator_factory(SELECTOR: DecoratorSelector):
         click.option('--experimental', is_flag=True,
                      help="Simulate ALL values over all possible domains"),
         click.option('--corruption', is_flag=True,
-                     help="Simulate heavy bit corruption"),
+                     help="Flip bits in the emulated packets, see corruption_* in config.ini"),
+        click.option('--stress-rate', type=click.FloatRange(min=0, min_open=True),
+                     help="Emulate at a fixed packets/s instead, e.g. 2000 to stress the middleware"),
     ]
 
     if SELECTOR == DecoratorSelector.ALL_DEV:
@@ -182,8 +188,11 @@ def start_services(COMMAND: Command,
                    replay_mode: Optional[str] = None,
                    MISSION_ARG: Optional[str] = None,
                    SIMULATION_ARG: Optional[str] = None,
+                   replay_speed: float = 1.0,
+                   replay_afap: bool = False,
                    experimental: bool = False,
-                   corruption: bool = False):
+                   corruption: bool = False,
+                   stress_rate: Optional[float] = None):
     """Starts all services required for the given command.
 
     Args:
@@ -198,8 +207,11 @@ def start_services(COMMAND: Command,
         replay_mode (Optional[str], optional): _description_. Defaults to None.
         MISSION_ARG (Optional[str], optional): _description_. Defaults to None.
         SIMULATION_ARG (Optional[str], optional): _description_. Defaults to None.
+        replay_speed (float, optional): Replay clock multiplier. Defaults to 1.0.
+        replay_afap (bool, optional): Replay as fast as possible. Defaults to False.
         experimental (bool, optional): Simulate all possible values over the entire domain. Defaults to False.
         corruption (bool, optional): Corrupt data packets to simulate heavy bit corruption. Defaults to False.
+        stress_rate (Optional[float], optional): Emulator packets/s for stress testing. Defaults to None.
 
     Raises:
         NotImplementedError: _description_
@@ -275,16 +287,20 @@ def start_services(COMMAND: Command,
         start_fake_serial_device_emulator(logger, devices[1],
                                           INTERFACE_TYPE,
                                           experimental=experimental,
-                                          corruption=corruption)
+                                          corruption=corruption,
+                                          stress_rate=stress_rate,
+                                          SOCKET_PATH="gcs_rocket")
     elif COMMAND == Command.SIMULATION:
         start_simulator(logger, devices[1])
     elif COMMAND == Command.REPLAY:
         if replay_mode == "mission":
             start_replay_system(
-                logger, devices[1], MISSION=MISSION_ARG, SIMULATION=None)
+                logger, devices[1], MISSION=MISSION_ARG, SIMULATION=None,
+                SPEED=replay_speed, AFAP=replay_afap, SOCKET_PATH="gcs_rocket")
         else:
             start_replay_system(
-                logger, devices[1], MISSION=None, SIMULATION=SIMULATION_ARG)
+                logger, devices[1], MISSION=None, SIMULATION=SIMULATION_ARG,
+                SPEED=replay_speed, AFAP=replay_afap, SOCKET_PATH="gcs_rocket")
 
     # 5. Start the event viewer
     start_event_viewer(logger, "gcs_rocket", file_logging_enabled=logpkt)
@@ -346,7 +362,7 @@ def run(gse_only):
 
 @click.command()
 @cli_decorator_factory(DecoratorSelector.ALL_DEV)
-def dev(docker, interface, nobuild, logpkt, nopendant, gse_only, frontend, experimental, corruption):
+def dev(docker, interface, nobuild, logpkt, nopendant, gse_only, frontend, experimental, corruption, stress_rate):
     """Start software in development mode"""
     start_services(Command.DEV,
                    DOCKER=docker,
@@ -358,6 +374,7 @@ def dev(docker, interface, nobuild, logpkt, nopendant, gse_only, frontend, exper
                    frontend=frontend,
                    experimental=experimental,
                    corruption=corruption,
+                   stress_rate=stress_rate,
                    )
 
 
@@ -378,7 +395,7 @@ def simulation(docker, nobuild, logpkt):
 
 @click.command()
 @cli_decorator_factory(DecoratorSelector.REPLAY)
-def replay(docker, nobuild, logpkt, mode, mission, simulation):
+def replay(docker, nobuild, logpkt, mode, mission, simulation, speed, afap):
     """Start software in simulation mode"""
     if not mode:
         raise click.UsageError("--mode is required for the replay engine")
@@ -411,7 +428,9 @@ def replay(docker, nobuild, logpkt, mode, mission, simulation):
                    frontend=True,
                    replay_mode=mode,
                    MISSION_ARG=mission,
-                   SIMULATION_ARG=simulation
+                   SIMULATION_ARG=simulation,
+                   replay_speed=speed,
+                   replay_afap=afap
                    )
 
 